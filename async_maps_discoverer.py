@@ -0,0 +1,438 @@
+"""
+Asyncio variant of the Google Places discovery engine
+
+Text Search, Place Details and email-scrape fetches run as coroutines on a single
+shared event loop, so one process can hold hundreds of in-flight requests without
+a thread per request. Business dicts are identical to MapsDiscoverer's output.
+"""
+import asyncio
+import contextvars
+import threading
+from typing import List, Dict, Optional, Set, Tuple
+import httpx
+import cassette
+import config
+import http_client
+import metrics
+import rate_limiter
+import response_cache
+from place_index import CellPlaces
+from quota_manager import BUCKET_SKUS
+from structured_logging import get_logger
+from run_control import POLL_INTERVAL, RunCancelled, RunController
+from maps_discoverer import (
+    MapsDiscoverer,
+    MAX_TEXT_SEARCH_PAGES,
+    PLACES_DETAILS_URL,
+    PLACES_NEW_SKU,
+    PLACES_NEW_TEXT_SEARCH_URL,
+    PLACES_TEXT_SEARCH_URL,
+)
+
+
+log = get_logger("places")
+
+
+class AsyncEngine:
+    """Owns the background event loop and the shared async HTTP client"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._run_loop,
+            daemon=True,
+            name="AsyncDiscoveryLoop"
+        )
+        self._client: Optional[httpx.AsyncClient] = None
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Shared client, created lazily on the engine loop"""
+        if self._client is None:
+            total = sum(config.UPSTREAM_CONCURRENCY.values())
+            limits = httpx.Limits(max_connections=total, max_keepalive_connections=total)
+            self._client = httpx.AsyncClient(
+                headers={
+                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+                    'Accept-Language': 'en-US,en;q=0.9',
+                },
+                transport=cassette.async_transport(
+                    httpx.AsyncHTTPTransport(limits=limits, http2=http_client.http2_enabled())
+                ),
+                follow_redirects=True,
+            )
+        return self._client
+
+    def semaphore(self, upstream: str) -> asyncio.Semaphore:
+        """Per-upstream in-flight limit, sized from config.UPSTREAM_CONCURRENCY"""
+        semaphore = self._semaphores.get(upstream)
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(max(1, config.UPSTREAM_CONCURRENCY.get(upstream, 1)))
+            self._semaphores[upstream] = semaphore
+        return semaphore
+
+    def run(self, coro, timeout: Optional[float] = None):
+        """
+        Run a coroutine on the engine loop from synchronous code and wait for it
+
+        Safe to call from many threads at once: every caller's requests share the
+        same loop, client and upstream limits.
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        return future.result(timeout)
+
+
+_engine: Optional[AsyncEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_async_engine() -> AsyncEngine:
+    """Get the process-wide async engine (started on first use)"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = AsyncEngine()
+        return _engine
+
+
+class AsyncMapsDiscoverer(MapsDiscoverer):
+    """MapsDiscoverer whose Places API calls are coroutines"""
+
+    def __init__(
+        self,
+        country: str,
+        engine: Optional[AsyncEngine] = None,
+        controller: Optional[RunController] = None
+    ):
+        super().__init__(country, controller=controller)
+        self.engine = engine or get_async_engine()
+    
+    def run(self, coro):
+        """Run a coroutine on the engine loop and wait for it (a run stop cancels it)"""
+        if self.controller:
+            return self.controller.run_coroutine(coro, self.engine.loop)
+        return self.engine.run(coro)
+
+    async def _blocking(self, func, *args):
+        """
+        Run a blocking call (SQLite quota, cache or place index) in the loop's executor
+
+        Keeps the event loop free for every other in-flight request; the call
+        sees this task's context (metric labels).
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, contextvars.copy_context().run, func, *args)
+
+    async def _request(
+        self,
+        upstream: str,
+        bucket: str,
+        url: str,
+        params: Optional[Dict] = None,
+        timeout: float = 15,
+        method: str = "GET",
+        sku: Optional[str] = None,
+        **kwargs
+    ) -> httpx.Response:
+        """
+        Request through the shared client, paced by a rate-limit bucket and holding an upstream slot
+
+        Places calls are counted against `sku` (default: the bucket's SKU);
+        further keyword arguments (json, headers) go to the client.
+        """
+        # Hold new requests while the run is paused
+        while self.controller and self.controller.paused:
+            await asyncio.sleep(POLL_INTERVAL)
+        if self.controller and self.controller.stopped:
+            raise RunCancelled()
+        
+        wait = 0.0
+        if upstream == "places":
+            # Budget slowdown adds to the rate-limit wait; an exhausted budget parks the run
+            wait = await self._blocking(self._reserve_quota, sku or BUCKET_SKUS[bucket])
+            self._count_api_call()
+        wait += rate_limiter.get_bucket(bucket).reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        async with self.engine.semaphore(upstream):
+            return await self.engine.client.request(method, url, params=params, timeout=timeout, **kwargs)
+
+    async def search_with_places_api(
+        self,
+        category: str,
+        city: str,
+        api_key: str,
+        max_results: int = 20,
+        skip_place_ids: Optional[Set[str]] = None,
+        cell_places: Optional[CellPlaces] = None
+    ) -> List[Dict]:
+        """
+        Async Text Search; Place Details for all results are fetched concurrently
+
+        Further pages are requested via next_page_token. A page's Place Details
+        start as soon as it arrives, so they run while the next token waits out
+        its activation delay (config.PLACES_NEXT_PAGE_DELAY). With the Places
+        API (New) (config.PLACES_PROVIDER = "new") results carry phone and
+        website, so only email lookups run and tokens need no delay. A recent
+        identical search is replayed from the text_search response cache.
+        With config.SEARCH_MODE = "tiles" the city is searched tile by tile
+        (MapsDiscoverer.iter_tile_search_pages).
+
+        Args:
+            category: Business category
+            city: City name
+            api_key: Google Places API key
+            max_results: Maximum results (max 60, 20 per page)
+            skip_place_ids: place_ids to drop before any Place Details call
+            cell_places: Run-wide place_id index of the searching cell (see place_index.py)
+
+        Returns:
+            List of business dictionaries (same fields as MapsDiscoverer)
+        """
+        if not api_key:
+            log.error("Error: Google Places API key not provided")
+            return []
+
+        # Runs as its own task on the engine loop: label this cell's Place Details and email fetches
+        metrics.set_labels(country=self.country, category=category)
+        candidates = []
+        detail_tasks = []
+        try:
+            if config.SEARCH_MODE == "tiles":
+                candidates, detail_tasks = await self._tile_search(category, city, api_key, skip_place_ids, cell_places)
+                return await self._finish_search(candidates, detail_tasks, category, city)
+
+            query, params = self._text_search_params(category, city, api_key)
+            new_api = config.PLACES_PROVIDER == "new"
+            cache_key = self._text_search_cache_key(query, params)
+            cached_pages = await self._blocking(self._cached_text_search, cache_key, query, max_results)
+            fetched_pages = []
+            next_page_token = None
+            position = 0
+            for page in range(1, MAX_TEXT_SEARCH_PAGES + 1):
+                try:
+                    if cached_pages is not None:
+                        # A cached page's token has expired; later pages come from the cache too
+                        if page > len(cached_pages):
+                            break
+                        data = cached_pages[page - 1]
+                    elif new_api:
+                        data = await self._places_new_page(query, api_key, next_page_token, page)
+                    else:
+                        data = await self._text_search_page(params, query, page)
+                except httpx.HTTPError as e:
+                    if page == 1:
+                        raise
+                    # Keep the pages already found
+                    log.error(f"      Network error in Places API: {e}", category=category, city=city)
+                    self._count_search_error()
+                    break
+                fetched_pages.append(data)
+
+                if new_api:
+                    results = [self._legacy_place(place) for place in self._parse_places_new_response(data, query)]
+                    next_page_token = data.get("nextPageToken") if results else None
+                else:
+                    results = self._parse_text_search_response(data, query)
+                    next_page_token = data.get("next_page_token") if results else None
+                for place in results[:max_results - position]:
+                    position += 1
+                    if cell_places is None:
+                        business = self._build_business(place, position, skip_place_ids)
+                    else:
+                        # Claiming the place writes to the run's SQLite place index
+                        business = await self._blocking(self._build_business, place, position, skip_place_ids, cell_places)
+                    if business:
+                        candidates.append((position, business))
+                        # Details start now and overlap the next page's token delay
+                        detail_tasks.append(asyncio.ensure_future(self._contact_details(business, api_key)))
+
+                if not next_page_token or position >= max_results:
+                    if cached_pages is None:
+                        await self._blocking(self._store_text_search, cache_key, fetched_pages, position, not next_page_token)
+                    break
+                if cached_pages is None and not new_api:
+                    # Per the docs, a Legacy page request carries only the token (and key)
+                    params = {"pagetoken": next_page_token, "key": api_key}
+                    await asyncio.sleep(config.PLACES_NEXT_PAGE_DELAY)
+
+            return await self._finish_search(candidates, detail_tasks, category, city)
+
+        except RunCancelled:
+            return []
+        except httpx.HTTPError as e:
+            log.error(f"      Network error in Places API: {e}", category=category, city=city)
+            self._count_search_error()
+            return []
+        except Exception as e:
+            log.error(f"      Unexpected error in Places API: {e}", exc_info=True, category=category, city=city)
+            self._count_search_error()
+            return []
+        finally:
+            for task in detail_tasks:
+                task.cancel()
+
+    async def _finish_search(
+        self,
+        candidates: List[Tuple[int, Dict]],
+        detail_tasks: List[asyncio.Future],
+        category: str,
+        city: str
+    ) -> List[Dict]:
+        """Wait for the candidates' contact details and return the businesses in search order"""
+        if not candidates:
+            return []
+
+        # gather() keeps result order, so output order matches the sync discoverer
+        all_details = await asyncio.gather(*detail_tasks, return_exceptions=True)
+
+        businesses = []
+        for (idx, business), details in zip(candidates, all_details):
+            if isinstance(details, RunCancelled):
+                continue  # Stopped or parked: the place is looked up again on resume
+            if isinstance(details, Exception):
+                log.warning(f"      [{idx}] Error processing place: {details}", place_id=business.get("place_id"))
+                details = None
+            self.apply_details(business, details)
+            businesses.append(business)
+            log.business(
+                "      [%d] ✓ %s (Rating: %s, Reviews: %s)",
+                idx, business["name"], business.get("rating", "N/A"), business.get("review_count", 0),
+                place_id=business.get("place_id"), category=category, city=city
+            )
+
+        log.info(f"      Successfully processed {len(businesses)} businesses", category=category, city=city, businesses=len(businesses))
+        return businesses
+
+    async def _tile_search(
+        self,
+        category: str,
+        city: str,
+        api_key: str,
+        skip_place_ids: Optional[Set[str]],
+        cell_places: Optional[CellPlaces]
+    ) -> Tuple[List[Tuple[int, Dict]], List[asyncio.Future]]:
+        """
+        Tiling search (config.SEARCH_MODE = "tiles"): candidates and their contact detail tasks
+
+        Tiles are searched by MapsDiscoverer.iter_tile_search_pages in a worker
+        thread, a page at a time; each page's details start on the loop as soon
+        as it arrives.
+        """
+        loop = asyncio.get_running_loop()
+        # The worker thread keeps this task's metric labels
+        context = contextvars.copy_context()
+        pages = self.iter_tile_search_pages(category, city, api_key, skip_place_ids=skip_place_ids, cell_places=cell_places)
+        candidates = []
+        detail_tasks = []
+        try:
+            while True:
+                page = await loop.run_in_executor(None, context.run, next, pages, None)
+                if page is None:
+                    break
+                for business in page:
+                    candidates.append((len(candidates) + 1, business))
+                    detail_tasks.append(asyncio.ensure_future(self._contact_details(business, api_key)))
+        except BaseException:
+            for task in detail_tasks:
+                task.cancel()
+            raise
+        finally:
+            try:
+                pages.close()
+            except ValueError:
+                pass  # Cancelled while the thread is still in a page; it ends with the run's stop
+        return candidates, detail_tasks
+
+    async def _text_search_page(self, params: Dict, query: str, page: int) -> Dict:
+        """One Text Search page; a token used a moment too early (INVALID_REQUEST) is retried"""
+        for attempt in range(config.PLACES_NEXT_PAGE_RETRIES + 1):
+            log.info(f"      API Request: {query}{f' (page {page})' if page > 1 else ''}", query=query, page=page)
+            with metrics.stage("text_search"):
+                response = await self._request("places", "places_text_search", PLACES_TEXT_SEARCH_URL, params=params)
+                response.raise_for_status()
+                data = response.json()
+
+            if page == 1 or data.get("status") != "INVALID_REQUEST" or attempt == config.PLACES_NEXT_PAGE_RETRIES:
+                return data
+            await asyncio.sleep(config.PLACES_NEXT_PAGE_DELAY / 2)
+
+    async def _places_new_page(self, query: str, api_key: str, page_token: Optional[str], page: int) -> Dict:
+        """One Places API (New) Text Search page"""
+        log.info(f"      API Request: {query}{f' (page {page})' if page > 1 else ''}", query=query, page=page)
+        with metrics.stage("text_search"):
+            response = await self._request(
+                "places",
+                "places_text_search",
+                PLACES_NEW_TEXT_SEARCH_URL,
+                method="POST",
+                sku=PLACES_NEW_SKU,
+                json=self._places_new_body(query, page_token),
+                headers=self._places_new_headers(api_key)
+            )
+            # Client errors come back as a JSON error object (see _parse_places_new_response)
+            if response.is_server_error:
+                response.raise_for_status()
+            return response.json()
+
+    async def _contact_details(self, business: Dict, api_key: str) -> Optional[Dict]:
+        """Async phone, website and email: from the search result when it has them, else Place Details"""
+        if not self.has_contact_details(business):
+            return await self._get_place_details(business["place_id"], api_key)
+        website = business["website"]
+        return {
+            "phone": business["phone"],
+            "website": website,
+            "email": await self._fetch_email(website) if website else "",
+        }
+
+    async def _get_place_details(self, place_id: str, api_key: str) -> Optional[Dict]:
+        """Async Place Details + email scrape (None if unavailable; served from the cache while fresh)"""
+        cache = response_cache.get_cache("place_details")
+        cached = await self._blocking(cache.get, place_id)
+        if cached is not None:
+            return dict(cached)
+
+        try:
+            with metrics.stage("place_details"):
+                response = await self._request(
+                    "places",
+                    "place_details",
+                    PLACES_DETAILS_URL,
+                    params=self._place_details_params(place_id, api_key)
+                )
+                response.raise_for_status()
+                data = response.json()
+
+            details = self._parse_place_details_response(data)
+            if not details:
+                return None
+
+            details["email"] = await self._fetch_email(details["website"]) if details.get("website") else ""
+            await self._blocking(cache.put, place_id, details)
+            return details
+
+        except RunCancelled:
+            raise
+        except Exception:
+            # Details are optional - silently fail
+            return None
+
+    async def _fetch_email(self, website: str) -> str:
+        """Scrape the first email address from a business website ("" if none)"""
+        try:
+            with metrics.stage("email_fetch"):
+                response = await self._request("websites", "websites", website, timeout=5)
+                response.raise_for_status()
+            return self.website_analyzer.extract_email(response.text) or ""
+        except RunCancelled:
+            raise
+        except Exception:
+            # Silently fail - email extraction is optional
+            return ""
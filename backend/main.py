@@ -5,10 +5,11 @@ Provides REST API for the Next.js frontend
 from fastapi import FastAPI, HTTPException, APIRouter
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 from pydantic import BaseModel
 from typing import List, Optional, Dict
+import logging
 import sys
 import os
 
@@ -39,45 +40,63 @@ except Exception as e:
     print(f"⚠ Traceback: {traceback.format_exc()}")
     list_all_countries = None
 
-# Lazy import of LeadDiscoveryApp - import only when needed to avoid startup failures
+# Lazy import of RunRegistry - import only when needed to avoid startup failures
 # This allows the FastAPI app to start even if main.py has import issues
-LeadDiscoveryApp = None
+RunRegistry = None
 
-def _lazy_import_discovery_app():
-    """Lazy import of LeadDiscoveryApp and related modules"""
-    global LeadDiscoveryApp
-    if LeadDiscoveryApp is None:
+def _lazy_import_run_registry():
+    """Lazy import of RunRegistry and related modules"""
+    global RunRegistry
+    if RunRegistry is None:
         try:
-            from main import LeadDiscoveryApp
+            from run_registry import RunRegistry
         except Exception as e:
             print(f"⚠ Error: Failed to import discovery modules: {e}")
             raise
-    return LeadDiscoveryApp
+    return RunRegistry
 
-# Global app instance
-discovery_app = None
-current_leads: List[Dict] = []
+# Global registry of discovery runs (several runs can execute in parallel)
+run_registry = None
+
+NOT_INITIALIZED = "Discovery app not initialized. Please check credentials.json and Google Sheets configuration."
 
 
 class DiscoveryRequest(BaseModel):
     country: str
     city: str
     categories: Optional[List[str]] = None
+    concurrency: Optional[int] = None  # Cells in parallel (default: config.CELL_CONCURRENCY; worker count for "queue"/"sharded")
+    scheduler: Optional[str] = None  # "cells", "pipeline", "queue" or "sharded" (default: config.DISCOVERY_SCHEDULER)
+    cell_order: Optional[str] = None  # "yield" or "category" (default: config.CELL_ORDER)
+
+
+def _all_leads() -> List[Dict]:
+    """Leads of every run still in the registry, oldest run first"""
+    if not run_registry:
+        return []
+    leads: List[Dict] = []
+    for entry in reversed(run_registry.list()):
+        leads.extend(entry.leads)
+    return leads
 
 
-def on_lead_found(lead: Dict):
-    """Callback when a lead is found - store in memory"""
-    current_leads.append(lead)
+def _get_run_or_404(run_id: str):
+    if not run_registry:
+        raise HTTPException(status_code=503, detail=NOT_INITIALIZED)
+    entry = run_registry.get(run_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail=f"Run not found: {run_id}")
+    return entry
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup/shutdown events"""
     # Startup
-    global discovery_app
+    global run_registry
     try:
-        LeadDiscoveryAppClass = _lazy_import_discovery_app()
-        discovery_app = LeadDiscoveryAppClass(lead_callback=on_lead_found)
+        RunRegistryClass = _lazy_import_run_registry()
+        run_registry = RunRegistryClass()
         print("✓ Discovery app initialized successfully")
         print("✓ Discovery processes will continue running even if web server receives shutdown signals")
     except Exception as e:
@@ -91,7 +110,7 @@ async def lifespan(app: FastAPI):
             print(f"⚠ Credentials provided as JSON (length: {len(creds_path)} chars)")
         else:
             print(f"⚠ Credentials path: {creds_path}")
-        discovery_app = None
+        run_registry = None
     
     yield
     
@@ -99,7 +118,7 @@ async def lifespan(app: FastAPI):
     # Discovery threads are non-daemon and will continue running
     # They will only stop when explicitly requested via stop() method
     print("⚠ Web server shutting down, but discovery threads will continue if running")
-    print("⚠ To stop discovery, use the /api/stop endpoint before shutting down")
+    print("⚠ To stop discovery, use the /api/stop (all runs) or /api/runs/{run_id}/stop endpoint before shutting down")
 
 
 app = FastAPI(title="Lead Discovery API", version="1.0.0", lifespan=lifespan)
@@ -107,18 +126,38 @@ app = FastAPI(title="Lead Discovery API", version="1.0.0", lifespan=lifespan)
 # Create API router to ensure API routes are matched before catch-all
 api_router = APIRouter(prefix="/api")
 
+_api_log = None
+
+
+def _api_logger():
+    """Structured logger for request logging (created on first request)"""
+    global _api_log
+    if _api_log is None:
+        from structured_logging import get_logger
+        _api_log = get_logger("api")
+    return _api_log
+
+
 # Add middleware to log all requests for debugging
+# Successful GETs (the frontend polls status every few seconds) are logged at DEBUG;
+# raise the "api" component's level with LOG_LEVELS=api=DEBUG to see them
 @app.middleware("http")
 async def log_requests(request, call_next):
-    print(f"📥 Request: {request.method} {request.url.path}")
+    log = _api_logger()
     try:
         response = await call_next(request)
-        print(f"📤 Response: {request.method} {request.url.path} -> {response.status_code}")
+        level = logging.DEBUG if request.method == "GET" and response.status_code < 400 else logging.INFO
+        log.log(
+            level,
+            f"📤 Response: {request.method} {request.url.path} -> {response.status_code}",
+            method=request.method, path=request.url.path, status=response.status_code
+        )
         return response
     except Exception as e:
-        import traceback
-        print(f"⚠⚠⚠ Exception in middleware for {request.method} {request.url.path}: {str(e)}")
-        print(f"⚠ Traceback: {traceback.format_exc()}")
+        log.error(
+            f"⚠⚠⚠ Exception in middleware for {request.method} {request.url.path}: {str(e)}",
+            exc_info=True, method=request.method, path=request.url.path
+        )
         # For API routes, return JSON error instead of raising
         if request.url.path.startswith("/api/"):
             from fastapi.responses import JSONResponse
@@ -170,10 +209,10 @@ async def test():
 
 @api_router.get("/status")
 async def get_status():
-    """Get current discovery status"""
+    """Get the status of the most recently started run"""
     try:
-        print(f"✓ /api/status called - discovery_app is {'initialized' if discovery_app else 'None'}")
-        if not discovery_app:
+        print(f"✓ /api/status called - run_registry is {'initialized' if run_registry else 'None'}")
+        if not run_registry:
             # Return a status indicating the app is not initialized
             # This should return 200 OK with initialized: false, NOT 503
             status_response = {
@@ -188,8 +227,19 @@ async def get_status():
             print(f"✓ Returning status: {status_response}")
             return status_response
         
-        status = discovery_app.get_status()
+        latest = run_registry.latest()
+        if latest:
+            status = latest.status()
+        else:
+            status = {
+                "is_running": False,
+                "run_id": None,
+                "current_country": None,
+                "current_city": None,
+                "current_category": None,
+            }
         status["initialized"] = True
+        status["active_runs"] = run_registry.active_count()
         print(f"✓ Returning status: {status}")
         return status
     except Exception as e:
@@ -209,78 +259,194 @@ async def get_status():
         }
 
 
-@api_router.post("/start")
-async def start_discovery(request: DiscoveryRequest):
-    """Start lead discovery"""
-    global current_leads
-    
-    print(f"📥 /api/start called - country: {request.country}, city: {request.city}, categories: {request.categories}")
-    print(f"📥 discovery_app is {'initialized' if discovery_app else 'None'}")
+def _start_run(request: DiscoveryRequest) -> Dict:
+    """Start a run in the registry (shared by /api/start and /api/runs)"""
+    print(f"📥 Start run - country: {request.country}, city: {request.city}, categories: {request.categories}")
+    print(f"📥 run_registry is {'initialized' if run_registry else 'None'}")
     
-    if not discovery_app:
-        error_msg = "Discovery app not initialized. Please check credentials.json and Google Sheets configuration."
-        print(f"⚠ {error_msg}")
+    if not run_registry:
+        print(f"⚠ {NOT_INITIALIZED}")
         creds_path = os.getenv('GOOGLE_SHEETS_CREDENTIALS_PATH', 'not set')
         # Don't print full credentials if it's JSON content (security)
         if creds_path and creds_path.strip().startswith('{'):
             print(f"⚠ Credentials provided as JSON (length: {len(creds_path)} chars)")
         else:
             print(f"⚠ Credentials path: {creds_path}")
-        raise HTTPException(status_code=503, detail=error_msg)
-    
-    if discovery_app.is_running:
-        raise HTTPException(status_code=400, detail="Discovery already running")
+        raise HTTPException(status_code=503, detail=NOT_INITIALIZED)
     
     try:
-        # Clear previous leads for new run
-        current_leads.clear()
-        
-        # Start discovery (non-blocking - runs in background)
-        # Use daemon=False to ensure discovery continues even if client disconnects
-        # The discovery should run independently of browser/client connections
-        # The thread will continue even if the web server receives shutdown signals
-        import threading
-        thread = threading.Thread(
-            target=discovery_app.start,
-            args=(request.country, request.city, request.categories),
-            daemon=False,  # Non-daemon thread continues even after main process signals
-            name="LeadDiscoveryThread"
+        # Runs execute in non-daemon threads, so discovery continues even if the
+        # client disconnects or the web server receives shutdown signals
+        run_id = run_registry.start(
+            request.country,
+            request.city,
+            request.categories,
+            concurrency=request.concurrency,
+            scheduler=request.scheduler,
+            cell_order=request.cell_order,
         )
-        thread.start()
-        
-        print(f"✓ Discovery started successfully in background thread (non-daemon)")
-        print(f"✓ Thread will continue running independently of web server lifecycle")
-        return {"success": True, "message": "Discovery started and will continue running independently"}
+    except RuntimeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         import traceback
         error_msg = f"Failed to start discovery: {str(e)}"
         print(f"⚠ {error_msg}")
         print(f"⚠ Traceback: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=error_msg)
+    
+    print(f"✓ Run {run_id} started in background thread (non-daemon)")
+    return {"success": True, "run_id": run_id, "message": "Discovery started and will continue running independently"}
+
+
+@api_router.post("/start")
+async def start_discovery(request: DiscoveryRequest):
+    """Start lead discovery (a new run; other active runs keep going)"""
+    return _start_run(request)
 
 
 @api_router.post("/stop")
 async def stop_discovery():
-    """Stop lead discovery (explicit stop only - discovery won't stop on server shutdown)"""
-    if not discovery_app:
-        raise HTTPException(status_code=503, detail="Discovery app not initialized. Please check credentials.json and Google Sheets configuration.")
+    """Stop all active runs (explicit stop only - discovery won't stop on server shutdown)"""
+    if not run_registry:
+        raise HTTPException(status_code=503, detail=NOT_INITIALIZED)
     
     try:
-        discovery_app.stop()
-        print("✓ Discovery stopped via API request")
-        return {"success": True, "message": "Discovery stopped. It will continue running if not explicitly stopped."}
+        stopped = run_registry.stop_all()
+        print(f"✓ {stopped} run(s) stopped via API request")
+        return {"success": True, "stopped": stopped, "message": f"Stopped {stopped} run(s)."}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@api_router.post("/plan")
+async def plan_discovery(request: DiscoveryRequest):
+    """Estimate calls, run time and cost of a run without starting it"""
+    try:
+        from planner import plan_run
+        return plan_run(
+            request.country,
+            request.city,
+            request.categories,
+            concurrency=request.concurrency,
+            scheduler=request.scheduler,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        import traceback
+        error_msg = f"Failed to plan discovery: {str(e)}"
+        print(f"⚠ Error in plan_discovery: {error_msg}")
+        print(f"⚠ Traceback: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=error_msg)
+
+
+@api_router.post("/runs")
+async def create_run(request: DiscoveryRequest):
+    """Start a new run alongside any active ones"""
+    return _start_run(request)
+
+
+@api_router.get("/runs")
+async def list_runs():
+    """Status of every registered run, newest first"""
+    if not run_registry:
+        raise HTTPException(status_code=503, detail=NOT_INITIALIZED)
+    return [entry.status() for entry in run_registry.list()]
+
+
+@api_router.get("/runs/{run_id}")
+async def get_run(run_id: str):
+    """Status of one run"""
+    return _get_run_or_404(run_id).status()
+
+
+@api_router.get("/runs/{run_id}/leads")
+async def get_run_leads(run_id: str):
+    """Leads saved by one run"""
+    return _get_run_or_404(run_id).leads
+
+
+@api_router.post("/runs/{run_id}/pause")
+async def pause_run(run_id: str):
+    """Pause one run; it keeps its position and continues with /resume"""
+    entry = _get_run_or_404(run_id)
+    if not entry.is_active:
+        raise HTTPException(status_code=400, detail=f"Run {run_id} is not running")
+    run_registry.pause(run_id)
+    return {"success": True, "run_id": run_id, "is_paused": entry.app.controller.paused}
+
+
+@api_router.post("/runs/{run_id}/resume")
+async def resume_run(run_id: str):
+    """Continue a paused run, or resume a stopped run from its checkpoint"""
+    if not run_registry:
+        raise HTTPException(status_code=503, detail=NOT_INITIALIZED)
+    entry = run_registry.get(run_id)
+    if entry and entry.is_active:
+        run_registry.unpause(run_id)
+        return {"success": True, "run_id": run_id, "is_paused": entry.app.controller.paused}
+    return await resume_discovery(run_id)
+
+
+@api_router.post("/runs/{run_id}/stop")
+async def stop_run(run_id: str):
+    """Stop one run; the others keep going"""
+    entry = _get_run_or_404(run_id)
+    run_registry.stop(run_id)
+    print(f"✓ Run {run_id} stopped via API request")
+    return {"success": True, "run_id": run_id, "is_running": entry.is_active}
+
+
+@api_router.post("/resume/{run_id}")
+async def resume_discovery(run_id: str):
+    """Resume a checkpointed run from the point where it stopped"""
+    if not run_registry:
+        raise HTTPException(status_code=503, detail=NOT_INITIALIZED)
+    
+    checkpoint = run_registry.checkpoint_store.load(run_id)
+    if not checkpoint:
+        raise HTTPException(status_code=404, detail=f"No checkpoint found for run: {run_id}")
+    
+    try:
+        run_registry.resume(run_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"No checkpoint found for run: {run_id}")
+    except (ValueError, RuntimeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        import traceback
+        error_msg = f"Failed to resume discovery: {str(e)}"
+        print(f"⚠ {error_msg}")
+        print(f"⚠ Traceback: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=error_msg)
+    
+    print(f"✓ Resuming run {run_id} at category {checkpoint.data['category_index'] + 1}, city {checkpoint.data['city_index'] + 1}")
+    return {
+        "success": True,
+        "message": f"Run {run_id} resumed",
+        "run_id": run_id,
+        "category_index": checkpoint.data["category_index"],
+        "city_index": checkpoint.data["city_index"],
+        "counters": checkpoint.counters,
+    }
+
+
+@api_router.get("/checkpoints")
+async def list_checkpoints():
+    """List checkpointed runs (most recent first) that can be resumed"""
+    if not run_registry:
+        raise HTTPException(status_code=503, detail=NOT_INITIALIZED)
+    return run_registry.checkpoint_store.list_runs()
+
+
 @api_router.get("/leads")
 async def get_leads(run_id: Optional[str] = None):
-    """Get discovered leads"""
+    """Get discovered leads (all registered runs, or one run)"""
     # Filter by run_id if provided
     if run_id:
-        filtered = [lead for lead in current_leads if lead.get("run_id") == run_id]
-        return filtered
-    return current_leads
+        entry = run_registry.get(run_id) if run_registry else None
+        return entry.leads if entry else []
+    return _all_leads()
 
 
 @api_router.get("/countries")
@@ -357,6 +523,7 @@ async def get_cities(country: Optional[str] = None):
 @api_router.get("/stats")
 async def get_stats():
     """Get statistics about discovered leads"""
+    current_leads = _all_leads()
     if not current_leads:
         return {
             "total_leads": 0,
@@ -385,6 +552,30 @@ async def get_stats():
     }
 
 
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Hot-path stage counters and latency histograms in Prometheus text format"""
+    import metrics
+    if run_registry:
+        metrics.ACTIVE_RUNS.set(run_registry.active_count())
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@api_router.get("/quota")
+async def get_quota():
+    """Places API calls used against the daily and monthly budget of each SKU"""
+    from quota_manager import get_quota_manager
+    return get_quota_manager().usage()
+
+
+@api_router.get("/cache")
+async def get_cache_stats():
+    """Response cache hits and misses of this process, per cache"""
+    import config
+    from response_cache import get_cache
+    return {name: get_cache(name).stats() for name in config.CACHE_TTL_DAYS}
+
+
 # Include API router AFTER all routes are defined but BEFORE catch-all route
 # This ensures API routes are matched before the catch-all route
 app.include_router(api_router)
@@ -0,0 +1,538 @@
+"""
+End-to-end throughput benchmark
+
+Runs LeadDiscoveryApp against local stand-ins for the Places Text Search and
+Place Details endpoints (Legacy, or New Text Search with --provider new), business websites and the Sheets values API, then
+reports leads/minute, API calls per lead, p50/p99 latency per stage and peak
+RSS. Latency, error rate and dataset size of the stand-ins are configurable,
+so the same numbers can be reproduced before and after a concurrency or
+batching change.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --scheduler pipeline --places-latency 0.2 --error-rate 0.02
+    python benchmark.py --scheduler sharded --concurrency 4 --json results.json
+    python benchmark.py --provider new
+
+Rate limits still apply (RATE_LIMIT_* environment variables); the defaults
+include the 1 request/second Sheets budget, which usually dominates. Stage
+latencies are measured in the client and include rate-limit and upstream-slot
+waits, i.e. what a business actually spends in each stage.
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import re
+import resource
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+
+
+# Phone numbers shared between places, so the dedupe path sees duplicates
+DUPLICATE_PHONE_POOL = 200
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Places, websites and Sheets stand-in with configurable latency, errors and dataset"""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        places_per_query: int = 40,
+        phone_rate: float = 0.9,
+        website_rate: float = 0.7,
+        duplicate_rate: float = 0.1,
+        places_latency: float = 0.1,
+        details_latency: float = 0.05,
+        website_latency: float = 0.2,
+        sheets_latency: float = 0.05,
+        error_rate: float = 0.0,
+        seed: int = 1
+    ):
+        """
+        Args:
+            places_per_query: Results per Text Search query (served 20 per page)
+            phone_rate: Fraction of places with a phone number
+            website_rate: Fraction of places with a website
+            duplicate_rate: Fraction of places whose phone repeats another place's
+            places_latency: Mean Text Search latency in seconds (+/-50% jitter)
+            details_latency: Mean Place Details latency
+            website_latency: Mean business website latency
+            sheets_latency: Mean Sheets API latency
+            error_rate: Fraction of requests answered with an error
+            seed: Seed for the dataset and for error/latency jitter
+        """
+        super().__init__(("127.0.0.1", 0), _StandInHandler)
+        self.places_per_query = places_per_query
+        self.phone_rate = phone_rate
+        self.website_rate = website_rate
+        self.duplicate_rate = duplicate_rate
+        self.latency = {
+            "text_search": places_latency,
+            "place_details": details_latency,
+            "website": website_latency,
+            "sheets": sheets_latency,
+        }
+        self.error_rate = error_rate
+        self.seed = seed
+        self.requests: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.sheets: Dict[str, List[List]] = defaultdict(list)
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True, name="BenchmarkStandIn")
+        self._thread.start()
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def begin(self, endpoint: str) -> bool:
+        """Count a request, apply its latency; returns False if it should fail"""
+        with self._lock:
+            self.requests[endpoint] += 1
+            jitter = self._random.uniform(0.5, 1.5)
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors[endpoint] += 1
+        time.sleep(self.latency.get(endpoint, 0) * jitter)
+        return not failed
+
+    def place(self, place_id: str) -> Dict:
+        """Deterministic details for a place_id"""
+        rng = random.Random(f"{self.seed}:{place_id}")
+        phone = ""
+        if rng.random() < self.phone_rate:
+            if rng.random() < self.duplicate_rate:
+                phone = f"+1 555 {rng.randrange(DUPLICATE_PHONE_POOL):04d}"
+            else:
+                phone = f"+1 {zlib.crc32(place_id.encode()):010d}"
+        website = f"{self.base_url}/site/{place_id}" if rng.random() < self.website_rate else ""
+        return {"formatted_phone_number": phone, "website": website}
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    server: StandInServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = {name: values[0] for name, values in parse_qs(parts.query).items()}
+
+        if parts.path.endswith("/textsearch/json"):
+            self._text_search(query)
+        elif parts.path.endswith("/details/json"):
+            self._place_details(query)
+        elif parts.path.startswith("/site/"):
+            self._website(parts.path.rsplit("/", 1)[-1])
+        elif parts.path.startswith("/v4/spreadsheets/"):
+            self._sheets("GET", unquote(parts.path), None)
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        path = unquote(urlsplit(self.path).path)
+        if path.endswith("/places:searchText"):
+            self._places_new_text_search(self._body())
+        else:
+            self._sheets("POST", path, self._body())
+
+    def do_PUT(self):
+        self._sheets("PUT", unquote(urlsplit(self.path).path), self._body())
+
+    def _body(self) -> Dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send(self, status: int, payload, content_type: str = "application/json"):
+        body = payload.encode("utf-8") if isinstance(payload, str) else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _text_search(self, query: Dict):
+        if not self.server.begin("text_search"):
+            self._send(200, {"status": "UNKNOWN_ERROR", "results": []})
+            return
+
+        # Follow-up pages carry only the token, as with the real API
+        if "pagetoken" in query:
+            prefix, start = query["pagetoken"].split(":")
+            start = int(start)
+        else:
+            prefix, start = f"{zlib.crc32(query.get('query', '').encode()):08x}", 0
+        end = min(start + 20, self.server.places_per_query)
+        if start >= end:
+            self._send(200, {"status": "ZERO_RESULTS", "results": []})
+            return
+
+        results = [
+            {
+                "place_id": f"{prefix}-{idx}",
+                "name": f"Business {prefix}-{idx}",
+                "formatted_address": f"{idx} Main Street",
+                "rating": round(3 + (idx % 20) / 10, 1),
+                "user_ratings_total": idx * 3,
+                "types": ["establishment"],
+                "business_status": "OPERATIONAL",
+            }
+            for idx in range(start, end)
+        ]
+        payload = {"status": "OK", "results": results}
+        if end < self.server.places_per_query:
+            payload["next_page_token"] = f"{prefix}:{end}"
+        self._send(200, payload)
+
+    def _places_new_text_search(self, body: Dict):
+        """Places API (New) Text Search: same places as _text_search, contact fields included"""
+        if not self.server.begin("text_search"):
+            self._send(503, {"error": {"code": 503, "message": "Backend error", "status": "UNAVAILABLE"}})
+            return
+
+        if "pageToken" in body:
+            prefix, start = body["pageToken"].split(":")
+            start = int(start)
+        else:
+            prefix, start = f"{zlib.crc32(body.get('textQuery', '').encode()):08x}", 0
+        end = min(start + 20, self.server.places_per_query)
+
+        places = []
+        for idx in range(start, end):
+            place_id = f"{prefix}-{idx}"
+            contact = self.server.place(place_id)
+            place = {
+                "id": place_id,
+                "displayName": {"text": f"Business {place_id}", "languageCode": "en"},
+                "formattedAddress": f"{idx} Main Street",
+                "rating": round(3 + (idx % 20) / 10, 1),
+                "userRatingCount": idx * 3,
+                "types": ["establishment"],
+                "businessStatus": "OPERATIONAL",
+            }
+            # Like the real API, empty fields are left out
+            if contact["formatted_phone_number"]:
+                place["nationalPhoneNumber"] = contact["formatted_phone_number"]
+            if contact["website"]:
+                place["websiteUri"] = contact["website"]
+            places.append(place)
+
+        payload = {"places": places} if places else {}
+        if end < self.server.places_per_query:
+            payload["nextPageToken"] = f"{prefix}:{end}"
+        self._send(200, payload)
+
+    def _place_details(self, query: Dict):
+        if not self.server.begin("place_details"):
+            self._send(200, {"status": "UNKNOWN_ERROR"})
+            return
+        self._send(200, {"status": "OK", "result": self.server.place(query.get("place_id", ""))})
+
+    def _website(self, place_id: str):
+        if not self.server.begin("website"):
+            self._send(503, "<html>Service unavailable</html>", "text/html")
+            return
+        self._send(200, f"<html><body>Contact us: info@{place_id}.example.com</body></html>", "text/html")
+
+    def _sheets(self, method: str, path: str, body: Optional[Dict]):
+        if not self.server.begin("sheets"):
+            self._send(503, {"error": {"code": 503, "message": "Backend error", "status": "UNAVAILABLE"}})
+            return
+
+        match = re.match(r"/v4/spreadsheets/([^/:]+)(?::(\w+))?(?:/values/(.+?)(?::(append|clear))?)?$", path)
+        if not match:
+            self._send(404, {"error": {"code": 404, "message": "not found"}})
+            return
+        spreadsheet_id, spreadsheet_action, cell_range, values_action = match.groups()
+        sheets = self.server.sheets
+
+        with self.server._lock:
+            if cell_range is None and spreadsheet_action == "batchUpdate":
+                for request in body.get("requests", []):
+                    title = request.get("addSheet", {}).get("properties", {}).get("title")
+                    if title:
+                        sheets[title] = []
+                self._send(200, {"spreadsheetId": spreadsheet_id, "replies": [{}]})
+            elif cell_range is None:
+                self._send(200, {
+                    "spreadsheetId": spreadsheet_id,
+                    "sheets": [{"properties": {"title": title}} for title in sheets],
+                })
+            else:
+                title, first_row, last_row, first_col, last_col = _parse_range(cell_range)
+                rows = sheets[title]
+                if method == "GET":
+                    selected = [
+                        row[first_col:last_col + 1]
+                        for row in rows[first_row:None if last_row is None else last_row + 1]
+                    ]
+                    payload = {"range": cell_range, "majorDimension": "ROWS"}
+                    if any(selected):
+                        payload["values"] = selected
+                    self._send(200, payload)
+                elif values_action == "append":
+                    rows.extend(body.get("values", []))
+                    self._send(200, {"spreadsheetId": spreadsheet_id, "updates": {"updatedRows": len(body.get("values", []))}})
+                else:
+                    for offset, row in enumerate(body.get("values", [])):
+                        while len(rows) <= first_row + offset:
+                            rows.append([])
+                        rows[first_row + offset] = row
+                    self._send(200, {"spreadsheetId": spreadsheet_id, "updatedRows": len(body.get("values", []))})
+
+
+def _parse_range(cell_range: str) -> Tuple[str, int, Optional[int], int, int]:
+    """
+    Parse A1 notation ("Sheet!E:F", "Sheet!A1:Z1", "Sheet!A1")
+
+    Returns:
+        (title, first_row, last_row or None, first_col, last_col), zero-based
+    """
+    title, _, cells = cell_range.partition("!")
+    bounds = []
+    for cell in cells.split(":"):
+        letters, digits = re.match(r"([A-Z]*)(\d*)", cell).groups()
+        col = 0
+        for letter in letters:
+            col = col * 26 + ord(letter) - ord("A") + 1
+        bounds.append((col - 1 if letters else 0, int(digits) - 1 if digits else None))
+    (first_col, first_row), (last_col, last_row) = bounds[0], bounds[-1]
+    if len(bounds) == 1 and first_row is not None:
+        last_col = 25  # A single cell anchors a write; reads take the row
+    return title, first_row or 0, last_row, first_col, last_col
+
+
+class StageTimer:
+    """Collects wall-clock latencies per pipeline stage"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float):
+        with self._lock:
+            self.samples[stage].append(seconds)
+
+    def wrap(self, cls, method: str, stage: str):
+        """Time every call of cls.method as stage"""
+        original = getattr(cls, method)
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - started)
+
+        setattr(cls, method, timed)
+
+    def wrap_async_requests(self, cls, stages: Dict[str, str]):
+        """Time the async engine's requests, staged by rate-limit bucket"""
+        original = cls._request
+
+        async def timed(discoverer, upstream, bucket, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await original(discoverer, upstream, bucket, *args, **kwargs)
+            finally:
+                self.record(stages.get(bucket, bucket), time.perf_counter() - started)
+
+        cls._request = timed
+
+    def summary(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                stage: {
+                    "count": len(samples),
+                    "p50_ms": round(percentile(samples, 50) * 1000, 1),
+                    "p99_ms": round(percentile(samples, 99) * 1000, 1),
+                }
+                for stage, samples in sorted(self.samples.items())
+            }
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile (0.0 for no samples)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    """Peak resident set size of this process and of its largest child (MB)"""
+    # ru_maxrss is KB on Linux, bytes on macOS
+    unit = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / unit, 1),
+    }
+
+
+def run_benchmark(args: argparse.Namespace) -> Dict:
+    """Start the stand-ins, run one discovery against them and collect the results"""
+    server = StandInServer(
+        places_per_query=args.places,
+        phone_rate=args.phone_rate,
+        website_rate=args.website_rate,
+        duplicate_rate=args.duplicate_rate,
+        places_latency=args.places_latency,
+        details_latency=args.details_latency,
+        website_latency=args.website_latency,
+        sheets_latency=args.sheets_latency,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+    server.start()
+
+    # Configure before config is first imported; state goes to a throwaway directory
+    os.environ.update({
+        "DATA_DIR": tempfile.mkdtemp(prefix="leadgen-benchmark-"),
+        "PLACES_API_BASE_URL": f"{server.base_url}/places",
+        "PLACES_NEW_API_BASE_URL": f"{server.base_url}/v1",
+        "PLACES_PROVIDER": args.provider,
+        "SHEETS_API_ENDPOINT": f"{server.base_url}/",
+        "GOOGLE_MAPS_API_KEY": "benchmark",
+        "GOOGLE_SHEETS_SPREADSHEET_ID": "benchmark",
+        "DISCOVERY_ENGINE": args.engine,
+    })
+    os.environ.pop("CHECKPOINT_DIR", None)
+
+    from async_maps_discoverer import AsyncMapsDiscoverer
+    from main import LeadDiscoveryApp
+    from maps_discoverer import MapsDiscoverer
+    from sheets_manager import SheetsManager
+
+    timer = StageTimer()
+    timer.wrap(MapsDiscoverer, "_request_text_search_page", "text_search")
+    timer.wrap(MapsDiscoverer, "_request_places_new_page", "text_search")
+    timer.wrap(MapsDiscoverer, "get_contact_details", "place_details")
+    timer.wrap(MapsDiscoverer, "fetch_email", "website")
+    timer.wrap(SheetsManager, "check_duplicate", "sheets_dedupe")
+    timer.wrap(SheetsManager, "append_lead", "sheets_append")
+    timer.wrap_async_requests(AsyncMapsDiscoverer, {
+        "places_text_search": "text_search",
+        "place_details": "place_details",
+        "websites": "website",
+    })
+
+    leads = []
+    app = LeadDiscoveryApp(lead_callback=leads.append)
+    categories = [f"Category {idx + 1}" for idx in range(args.categories)]
+
+    if args.max_seconds:
+        deadline = threading.Timer(args.max_seconds, app.stop)
+        deadline.daemon = True
+        deadline.start()
+
+    output = io.StringIO()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+        app.start(
+            args.country,
+            args.city,
+            categories,
+            concurrency=args.concurrency,
+            scheduler=args.scheduler,
+            cell_order="category"
+        )
+    elapsed = time.perf_counter() - started
+    server.stop()
+
+    places_calls = server.requests["text_search"] + server.requests["place_details"]
+    per_lead = lambda count: round(count / len(leads), 2) if leads else None
+    return {
+        "scheduler": args.scheduler,
+        "engine": args.engine,
+        "provider": args.provider,
+        "concurrency": args.concurrency,
+        "cells": app.cells_completed,
+        "leads": len(leads),
+        "elapsed_seconds": round(elapsed, 2),
+        "leads_per_minute": round(len(leads) / elapsed * 60, 1) if elapsed else 0.0,
+        "places_calls_per_lead": per_lead(places_calls),
+        "sheets_calls_per_lead": per_lead(server.requests["sheets"]),
+        "requests": dict(server.requests),
+        "errors": dict(server.errors),
+        "stages": timer.summary(),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def print_report(result: Dict):
+    print(f"\n{'='*60}")
+    print("Benchmark Results")
+    print(f"{'='*60}")
+    print(f"Scheduler: {result['scheduler']} ({result['engine']} engine, {result['provider']} Places API, concurrency {result['concurrency']})")
+    print(f"Cells completed: {result['cells']}")
+    print(f"Leads: {result['leads']} in {result['elapsed_seconds']}s")
+    print(f"Leads/minute: {result['leads_per_minute']}")
+    print(f"Places calls per lead: {result['places_calls_per_lead']}")
+    print(f"Sheets calls per lead: {result['sheets_calls_per_lead']}")
+    print(f"Requests: {result['requests']} (errors: {result['errors']})")
+    print(f"Peak RSS: {result['peak_rss_mb']['self']} MB (largest child: {result['peak_rss_mb']['children']} MB)")
+    print(f"\n{'Stage':<16}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}")
+    for stage, stats in result["stages"].items():
+        print(f"{stage:<16}{stats['count']:>8}{stats['p50_ms']:>10}{stats['p99_ms']:>10}")
+    if result["scheduler"] == "sharded":
+        print("(Places stages run in worker processes and are not timed with the sharded scheduler)")
+    print(f"{'='*60}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end throughput benchmark against local stand-in servers")
+    parser.add_argument("--scheduler", default="cells", choices=["cells", "pipeline", "queue", "sharded"])
+    parser.add_argument("--engine", default="sync", choices=["sync", "async"])
+    parser.add_argument("--provider", default="legacy", choices=["legacy", "new"],
+                        help="Places API: Legacy Text Search + Place Details, or New Text Search with contact fields")
+    parser.add_argument("--concurrency", type=int, default=4, help="Cells / workers / processes in parallel")
+    parser.add_argument("--country", default="India")
+    parser.add_argument("--city", default="Benchmark City", help="A city of --country runs all its cities")
+    parser.add_argument("--categories", type=int, default=4, help="Number of categories (cells = categories x cities)")
+    parser.add_argument("--places", type=int, default=40, help="Results per Text Search query")
+    parser.add_argument("--phone-rate", type=float, default=0.9)
+    parser.add_argument("--website-rate", type=float, default=0.7)
+    parser.add_argument("--duplicate-rate", type=float, default=0.1)
+    parser.add_argument("--places-latency", type=float, default=0.1, help="Seconds (+/-50%% jitter)")
+    parser.add_argument("--details-latency", type=float, default=0.05)
+    parser.add_argument("--website-latency", type=float, default=0.2)
+    parser.add_argument("--sheets-latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-seconds", type=float, default=0, help="Stop the run after this long (0 = run to completion)")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show the discovery output")
+    args = parser.parse_args()
+
+    result = run_benchmark(args)
+    print_report(result)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,297 @@
+"""
+HTTP record/replay ("cassette") for offline runs
+
+With config.HTTP_CASSETTE_MODE = "record", every Places Text Search, Place
+Details and business website response fetched through a discoverer's sessions
+(and the async engine's client) is appended to a gzip-compressed JSON-lines
+cassette. With "replay", the same requests are answered from the cassette
+without touching the network, so a run can be benchmarked and profiled
+offline and timings compared between runs on identical inputs.
+
+Requests are matched on method, URL (query parameters sorted, API key removed)
+and request body. Repeated requests replay their recorded responses in order;
+once exhausted, the last one is repeated. API keys are never written to disk.
+"""
+import atexit
+import base64
+import glob
+import gzip
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+import config
+
+
+# Query parameters and response headers that are never recorded
+SECRET_PARAMS = {"key"}
+DROPPED_HEADERS = {"set-cookie", "content-encoding", "content-length", "transfer-encoding", "connection"}
+
+
+def request_key(method: str, url: str, body: Optional[bytes] = None) -> str:
+    """Match key for a request: method, URL without secrets (sorted query) and body hash"""
+    key = f"{method.upper()} {strip_secrets(url)}"
+    if body:
+        key += f" #{hashlib.sha1(body).hexdigest()}"
+    return key
+
+
+def strip_secrets(url: str) -> str:
+    """URL with API keys removed and query parameters sorted"""
+    parts = urlsplit(url)
+    query = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+                   if name not in SECRET_PARAMS)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+
+class Cassette:
+    """Recorded responses keyed by request, stored as gzip JSON lines"""
+
+    def __init__(self, path: str, mode: str):
+        """
+        Args:
+            path: Cassette file (.jsonl.gz)
+            mode: "record" or "replay"
+        """
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self._entries: Dict[str, List[Dict]] = defaultdict(list)
+        self._positions: Dict[str, int] = defaultdict(int)
+        self._file = None
+        self._lock = threading.Lock()
+
+        if mode == "replay":
+            self._load()
+
+    def _load(self):
+        # Worker processes record to sidecar files next to the main cassette
+        paths = [self.path] + sorted(glob.glob(f"{self.path}.*"))
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    for line in f:
+                        if line.strip():
+                            entry = json.loads(line)
+                            self._entries[entry["key"]].append(entry)
+            except (EOFError, ValueError) as e:
+                # A killed recorder leaves a truncated stream; keep what was read
+                print(f"Cassette: {path} is truncated ({e}), using complete entries only")
+        print(f"Cassette: replaying {sum(len(entries) for entries in self._entries.values())} "
+              f"responses from {self.path}")
+
+    def _writer(self):
+        if self._file is None:
+            path = self.path
+            if multiprocessing.parent_process() is not None:
+                # Processes must not interleave writes to one gzip stream
+                path = f"{self.path}.{os.getpid()}"
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Appending adds a gzip member; readers see one continuous stream
+            self._file = gzip.open(path, "at", encoding="utf-8")
+        return self._file
+
+    def record(
+        self,
+        method: str,
+        url: str,
+        body: Optional[bytes],
+        status: int,
+        reason: str,
+        headers: Dict[str, str],
+        content: bytes,
+        elapsed: float
+    ):
+        """Append one response to the cassette"""
+        entry = {
+            "key": request_key(method, url, body),
+            "url": strip_secrets(url),
+            "status": status,
+            "reason": reason,
+            "headers": {name: value for name, value in headers.items() if name.lower() not in DROPPED_HEADERS},
+            "elapsed": round(elapsed, 4),
+        }
+        try:
+            entry["text"] = content.decode("utf-8")
+        except UnicodeDecodeError:
+            entry["base64"] = base64.b64encode(content).decode("ascii")
+
+        with self._lock:
+            writer = self._writer()
+            writer.write(json.dumps(entry) + "\n")
+            writer.flush()
+            self.recorded += 1
+
+    def replay(self, method: str, url: str, body: Optional[bytes] = None) -> Optional[Dict]:
+        """Next recorded response for a request (None if it was never recorded)"""
+        key = request_key(method, url, body)
+        with self._lock:
+            entries = self._entries.get(key)
+            if not entries:
+                self.misses += 1
+                return None
+            position = self._positions[key]
+            self._positions[key] = position + 1
+            self.hits += 1
+            return entries[min(position, len(entries) - 1)]
+
+    @staticmethod
+    def content(entry: Dict) -> bytes:
+        if "base64" in entry:
+            return base64.b64decode(entry["base64"])
+        return entry["text"].encode("utf-8")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def stats(self) -> Dict:
+        return {"mode": self.mode, "path": self.path, "hits": self.hits, "misses": self.misses, "recorded": self.recorded}
+
+
+class CassetteAdapter(HTTPAdapter):
+    """requests transport adapter that records to or replays from a cassette"""
+
+    def __init__(self, cassette: Cassette, **kwargs):
+        super().__init__(**kwargs)
+        self.cassette = cassette
+
+    def send(self, request, **kwargs):
+        body = request.body.encode("utf-8") if isinstance(request.body, str) else request.body
+
+        if self.cassette.mode == "replay":
+            entry = self.cassette.replay(request.method, request.url, body)
+            if entry is None:
+                raise requests.exceptions.ConnectionError(
+                    f"Cassette miss: {request.method} {strip_secrets(request.url)}", request=request
+                )
+            if config.HTTP_CASSETTE_LATENCY:
+                time.sleep(entry["elapsed"])
+            return self._build_response(request, entry)
+
+        started = time.perf_counter()
+        response = super().send(request, **kwargs)
+        content = response.content
+        self.cassette.record(
+            request.method, request.url, body,
+            response.status_code, response.reason or "", dict(response.headers),
+            content, time.perf_counter() - started
+        )
+        return response
+
+    def _build_response(self, request, entry: Dict) -> requests.Response:
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = entry.get("reason", "")
+        response.headers = CaseInsensitiveDict(entry["headers"])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = Cassette.content(entry)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.elapsed = timedelta(seconds=entry["elapsed"])
+        return response
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Optional[Cassette]:
+    """Process-wide cassette for config.HTTP_CASSETTE_MODE (None when record/replay is off)"""
+    global _cassette
+    if not config.HTTP_CASSETTE_MODE:
+        return None
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette(config.HTTP_CASSETTE_PATH, config.HTTP_CASSETTE_MODE)
+            # Finish the gzip stream so the cassette stays readable
+            atexit.register(_cassette.close)
+        return _cassette
+
+
+def close():
+    """Flush and close this process's cassette (if one was opened)"""
+    if _cassette is not None:
+        _cassette.close()
+
+
+def mount(session: requests.Session, **adapter_options) -> requests.Session:
+    """
+    Route a session's requests through the cassette (no-op when record/replay is off)
+
+    Args:
+        session: Session to mount the cassette adapter on
+        **adapter_options: HTTPAdapter pool settings (pool_connections, pool_maxsize, ...)
+    """
+    cassette = get_cassette()
+    if cassette:
+        adapter = CassetteAdapter(cassette, **adapter_options)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+    return session
+
+
+def async_transport(inner):
+    """
+    Wrap an httpx async transport with the cassette (returns it unchanged when off)
+
+    httpx is imported lazily so the sync engine doesn't depend on it.
+    """
+    cassette = get_cassette()
+    if not cassette:
+        return inner
+
+    import httpx
+
+    class CassetteTransport(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+            body = request.content or None
+            url = str(request.url)
+
+            if cassette.mode == "replay":
+                entry = cassette.replay(request.method, url, body)
+                if entry is None:
+                    raise httpx.ConnectError(f"Cassette miss: {request.method} {strip_secrets(url)}", request=request)
+                if config.HTTP_CASSETTE_LATENCY:
+                    import asyncio
+                    await asyncio.sleep(entry["elapsed"])
+                return httpx.Response(entry["status"], headers=entry["headers"],
+                                      content=Cassette.content(entry), request=request)
+
+            started = time.perf_counter()
+            response = await inner.handle_async_request(request)
+            content = await response.aread()
+            await response.aclose()
+            cassette.record(
+                request.method, url, body,
+                response.status_code, response.reason_phrase, dict(response.headers),
+                content, time.perf_counter() - started
+            )
+            headers = {name: value for name, value in response.headers.items() if name.lower() not in DROPPED_HEADERS}
+            return httpx.Response(response.status_code, headers=headers, content=content, request=request)
+
+        async def aclose(self):
+            await inner.aclose()
+
+    return CassetteTransport()
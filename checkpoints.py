@@ -0,0 +1,279 @@
+"""
+Resumable run checkpoints
+
+A checkpoint records everything needed to continue a run after a restart:
+the resolved category and city lists, which (category, city) cells are done,
+the place_ids already handled inside cells still in progress and the run
+counters. An interrupted cell searches again from its first page (Google page
+tokens expire within minutes; a search that had finished is replayed from the
+text_search response cache) and skips the places it had already handled.
+
+The checkpoint is rewritten atomically as JSON after every completed cell, and
+after every config.CHECKPOINT_SAVE_EVERY processed businesses or
+config.CHECKPOINT_SAVE_SECONDS, whichever comes first. Businesses processed
+after the last write are looked up again on resume (the sheet's duplicate
+check keeps them from being stored twice).
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Set, Tuple
+import config
+
+
+class RunCheckpoint:
+    """Progress of one discovery run"""
+
+    def __init__(self, store: Optional["CheckpointStore"], data: Dict):
+        """
+        Args:
+            store: Where to persist changes (None keeps the checkpoint in memory only)
+            data: Checkpoint contents
+        """
+        self.store = store
+        self.data = data
+        self._lock = threading.RLock()
+        # In-memory indexes, so recording progress doesn't scan every cell of the run
+        self._completed: Set[str] = set(data["completed_cells"])
+        self._order = self._load_cell_order()
+        self._frontier = 0  # Position in _order before which every cell is complete
+        self._unsaved = 0  # Businesses recorded since the last write
+        self._saved_at = time.monotonic()
+
+    @property
+    def run_id(self) -> str:
+        return self.data["run_id"]
+
+    @property
+    def categories(self) -> List[str]:
+        return self.data["categories"]
+
+    @property
+    def cities(self) -> List[str]:
+        return self.data["cities"]
+
+    @property
+    def counters(self) -> Dict:
+        return self.data["counters"]
+
+    @staticmethod
+    def cell_key(category_idx: int, city_idx: int) -> str:
+        """Key for a cell (0-based indices into the stored category and city lists)"""
+        return f"{category_idx}:{city_idx}"
+
+    def cell_order(self) -> List[Tuple[int, int]]:
+        """Every cell of the run in processing order"""
+        return list(self._order)
+
+    def _load_cell_order(self) -> List[Tuple[int, int]]:
+        if self.data.get("cell_order"):
+            return [tuple(int(idx) for idx in key.split(":")) for key in self.data["cell_order"]]
+        return [
+            (category_idx, city_idx)
+            for category_idx in range(len(self.categories))
+            for city_idx in range(len(self.cities))
+        ]
+
+    def is_cell_complete(self, category_idx: int, city_idx: int) -> bool:
+        with self._lock:
+            return self.cell_key(category_idx, city_idx) in self._completed
+
+    def processed_place_ids(self, category_idx: int, city_idx: int) -> Set[str]:
+        """place_ids already handled in a cell that was interrupted part-way"""
+        with self._lock:
+            cell = self.data["in_progress"].get(self.cell_key(category_idx, city_idx), {})
+            return set(cell.get("processed_place_ids", []))
+
+    def record_business(self, category_idx: int, city_idx: int, place_id: Optional[str], saved: bool = False):
+        """Record that one business in a cell has been fully processed (written in batches)"""
+        with self._lock:
+            if place_id:
+                self._cell_progress(category_idx, city_idx)["processed_place_ids"].append(place_id)
+            self.counters["businesses_processed"] += 1
+            if saved:
+                self.counters["leads_found"] += 1
+            self._unsaved += 1
+            if (self._unsaved >= config.CHECKPOINT_SAVE_EVERY
+                    or time.monotonic() - self._saved_at >= config.CHECKPOINT_SAVE_SECONDS):
+                self._update_frontier()
+                self.save()
+
+    def complete_cell(self, category_idx: int, city_idx: int):
+        """Mark a cell as done and drop its in-progress state"""
+        with self._lock:
+            key = self.cell_key(category_idx, city_idx)
+            if key not in self._completed:
+                self._completed.add(key)
+                self.data["completed_cells"].append(key)
+                self.counters["cells_completed"] += 1
+            self.data["in_progress"].pop(key, None)
+            self._update_frontier()
+            self.save()
+
+    def skip_cells(self, cells: List[Tuple[int, int]]):
+        """Leave cells out of the run (treated as complete, counted as skipped)"""
+        with self._lock:
+            skipped = self.data.setdefault("skipped_cells", [])
+            for category_idx, city_idx in cells:
+                key = self.cell_key(category_idx, city_idx)
+                if key not in self._completed:
+                    self._completed.add(key)
+                    self.data["completed_cells"].append(key)
+                    skipped.append(key)
+            self.counters["cells_skipped"] = len(skipped)
+            self._update_frontier()
+            self.save()
+
+    def finish(self, status: str, elapsed_seconds: float, parked_until: Optional[float] = None):
+        """
+        Record how the run ended
+
+        Args:
+            status: "completed", "stopped", "parked", "time_limit" or "error"
+            elapsed_seconds: Wall-clock time spent in this session of the run
+            parked_until: For a parked run, when its Places API budget resets
+        """
+        with self._lock:
+            self.data["status"] = status
+            self.data["parked_until"] = parked_until
+            self.counters["elapsed_seconds"] = round(elapsed_seconds, 1)
+            self._update_frontier()
+            self.save()
+
+    def save(self):
+        with self._lock:
+            self.data["updated_at"] = datetime.now().isoformat()
+            self._unsaved = 0
+            self._saved_at = time.monotonic()
+            if self.store:
+                self.store.save(self.data)
+
+    def _cell_progress(self, category_idx: int, city_idx: int) -> Dict:
+        return self.data["in_progress"].setdefault(
+            self.cell_key(category_idx, city_idx),
+            {"processed_place_ids": []}
+        )
+
+    def _update_frontier(self):
+        """Point category_index/city_index at the first cell (in processing order) not yet complete"""
+        # Cells are only ever completed, so the frontier only moves forward
+        while (self._frontier < len(self._order)
+               and self.cell_key(*self._order[self._frontier]) in self._completed):
+            self._frontier += 1
+        if self._frontier < len(self._order):
+            category_idx, city_idx = self._order[self._frontier]
+            self.data["category_index"] = category_idx
+            self.data["city_index"] = city_idx
+            return
+        self.data["category_index"] = len(self.categories)
+        self.data["city_index"] = 0
+
+
+class CheckpointStore:
+    """JSON checkpoint files in config.CHECKPOINT_DIR, one per run"""
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or config.CHECKPOINT_DIR
+        self._lock = threading.Lock()
+
+    def _path(self, run_id: str) -> str:
+        return os.path.join(self.directory, f"{run_id}.json")
+
+    def create(
+        self,
+        run_id: str,
+        country: str,
+        city: str,
+        categories: List[str],
+        cities: List[str],
+        options: Dict,
+        cell_order: Optional[List[Tuple[int, int]]] = None
+    ) -> RunCheckpoint:
+        """
+        Create and persist the checkpoint for a new run
+
+        Args:
+            run_id: Run ID
+            country: Country name
+            city: Starting city
+            categories: Categories in processing order
+            cities: Cities in processing order
+            options: Run options needed to resume (long_running, max_hours, ...)
+            cell_order: (category_idx, city_idx) processing order (default: category-major)
+        """
+        data = {
+            "run_id": run_id,
+            "country": country,
+            "city": city,
+            "categories": list(categories),
+            "cities": list(cities),
+            "options": options,
+            "cell_order": [RunCheckpoint.cell_key(*cell) for cell in cell_order] if cell_order else None,
+            "status": "running",
+            "created_at": datetime.now().isoformat(),
+            "category_index": 0,
+            "city_index": 0,
+            "completed_cells": [],
+            "in_progress": {},
+            "counters": {
+                "cells_completed": 0,
+                "cells_skipped": 0,
+                "businesses_processed": 0,
+                "leads_found": 0,
+                "elapsed_seconds": 0.0,
+            },
+        }
+        checkpoint = RunCheckpoint(self, data)
+        checkpoint.save()
+        return checkpoint
+
+    def load(self, run_id: str) -> Optional[RunCheckpoint]:
+        """Load a run's checkpoint (None if there isn't one)"""
+        try:
+            with open(self._path(run_id), "r", encoding="utf-8") as f:
+                return RunCheckpoint(self, json.load(f))
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Error loading checkpoint for run {run_id}: {e}")
+            return None
+
+    def save(self, data: Dict):
+        """Write a checkpoint atomically (temp file + rename)"""
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(data["run_id"])
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(temp_path, path)
+
+    def list_runs(self) -> List[Dict]:
+        """Summaries of all checkpointed runs, most recently updated first"""
+        if not os.path.isdir(self.directory):
+            return []
+
+        summaries = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(".json"):
+                continue
+            checkpoint = self.load(filename[:-len(".json")])
+            if not checkpoint:
+                continue
+            data = checkpoint.data
+            summaries.append({
+                "run_id": data["run_id"],
+                "country": data["country"],
+                "city": data["city"],
+                "status": data["status"],
+                "parked_until": data.get("parked_until"),
+                "category_index": data["category_index"],
+                "city_index": data["city_index"],
+                "cells_total": len(data["categories"]) * len(data["cities"]),
+                "counters": data["counters"],
+                "updated_at": data.get("updated_at"),
+            })
+        summaries.sort(key=lambda summary: summary.get("updated_at") or "", reverse=True)
+        return summaries
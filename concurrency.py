@@ -0,0 +1,68 @@
+"""
+Process-wide concurrency limits for upstream services
+"""
+import threading
+from contextlib import contextmanager
+from typing import Dict
+import config
+
+
+_semaphores: Dict[str, threading.BoundedSemaphore] = {}
+_semaphores_lock = threading.Lock()
+_process_share = 1.0  # Fraction of each upstream's slots this process may hold
+
+
+def set_process_share(share: float):
+    """Limit this process to a fraction of every upstream's in-flight slots (at least one)"""
+    global _process_share
+    with _semaphores_lock:
+        _process_share = share
+        _semaphores.clear()
+
+
+def get_upstream_semaphore(upstream: str) -> threading.BoundedSemaphore:
+    """
+    Get the shared semaphore for an upstream (created on first use)
+    
+    Args:
+        upstream: Upstream name as configured in config.UPSTREAM_CONCURRENCY
+        
+    Returns:
+        Semaphore bounding in-flight requests to that upstream
+    """
+    with _semaphores_lock:
+        semaphore = _semaphores.get(upstream)
+        if semaphore is None:
+            limit = max(1, int(config.UPSTREAM_CONCURRENCY.get(upstream, 1) * _process_share))
+            semaphore = threading.BoundedSemaphore(limit)
+            _semaphores[upstream] = semaphore
+        return semaphore
+
+
+@contextmanager
+def upstream_slot(upstream: str):
+    """Hold one in-flight request slot for an upstream for the duration of the block"""
+    semaphore = get_upstream_semaphore(upstream)
+    semaphore.acquire()
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+_cell_semaphore = threading.BoundedSemaphore(max(1, config.GLOBAL_CELL_CONCURRENCY))
+
+
+@contextmanager
+def cell_slot():
+    """
+    Hold one of the process-wide cell slots (config.GLOBAL_CELL_CONCURRENCY)
+    
+    Shared by every run in the process, so parallel runs split one budget
+    instead of each bringing its own.
+    """
+    _cell_semaphore.acquire()
+    try:
+        yield
+    finally:
+        _cell_semaphore.release()
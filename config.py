@@ -11,14 +11,213 @@ GOOGLE_SHEETS_CREDENTIALS_PATH = os.getenv("GOOGLE_SHEETS_CREDENTIALS_PATH", "cr
 GOOGLE_SHEETS_SPREADSHEET_ID = os.getenv("GOOGLE_SHEETS_SPREADSHEET_ID", "")
 GOOGLE_SHEETS_WORKSHEET_NAME = os.getenv("GOOGLE_SHEETS_WORKSHEET_NAME", "Leads")
 
+# Local state (checkpoints, caches). On Cloud Run point this at a mounted volume
+# (e.g. a Cloud Storage FUSE mount) so it survives container restarts.
+DATA_DIR = os.getenv("DATA_DIR", ".leadgen")
+CHECKPOINT_DIR = os.getenv("CHECKPOINT_DIR", os.path.join(DATA_DIR, "checkpoints"))
+CHECKPOINT_SAVE_EVERY = int(os.getenv("CHECKPOINT_SAVE_EVERY", "25"))  # Processed businesses between checkpoint writes
+CHECKPOINT_SAVE_SECONDS = float(os.getenv("CHECKPOINT_SAVE_SECONDS", "5"))  # ... or this long, whichever comes first
+
 # Google Maps API (Optional - can use scraping instead)
 GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY", "")
 
+# API endpoints (override to point discovery at local stand-ins, e.g. benchmark.py)
+PLACES_API_BASE_URL = os.getenv("PLACES_API_BASE_URL", "https://maps.googleapis.com/maps/api/place")
+PLACES_NEW_API_BASE_URL = os.getenv("PLACES_NEW_API_BASE_URL", "https://places.googleapis.com/v1")
+GEOCODING_API_URL = os.getenv("GEOCODING_API_URL", "https://maps.googleapis.com/maps/api/geocode/json")
+SHEETS_API_ENDPOINT = os.getenv("SHEETS_API_ENDPOINT", "")  # "" = Google; set = no credentials needed
+
 # Execution Settings
-DEFAULT_DELAY_BETWEEN_REQUESTS = 1  # seconds (reduced for faster processing)
-DEFAULT_DELAY_BETWEEN_SEARCHES = 2  # seconds between different searches (reduced)
 MAX_LONG_RUNNING_HOURS = 24
-MAX_RESULTS_PER_CATEGORY = 50  # Safety limit per category
+MAX_RESULTS_PER_CATEGORY = 50  # Safety limit per category (Text Search pages: 20 results each, at most 3)
+PLACES_NEXT_PAGE_DELAY = float(os.getenv("PLACES_NEXT_PAGE_DELAY", "2"))  # Seconds before a next_page_token is valid
+PLACES_NEXT_PAGE_RETRIES = 3  # Retries of a page whose token wasn't valid yet (INVALID_REQUEST)
+
+# How a cell is searched:
+# "text" = one Text Search query per (category, city), at most 60 results
+# "tiles" = Nearby Search over tiles of the city's viewport; full tiles are split (tiling.py)
+SEARCH_MODE = os.getenv("SEARCH_MODE", "text")
+TILING_MAX_DEPTH = int(os.getenv("TILING_MAX_DEPTH", "3"))  # Times a full tile is split (4**depth tiles at most)
+TILING_RESULT_CAP = 60  # A tile returning this many results is full (Nearby Search caps at 3 pages of 20)
+TILING_MAX_RESULTS = int(os.getenv("TILING_MAX_RESULTS", "1000"))  # Safety limit per cell in tiling mode
+TILE_COVERAGE_PATH = os.getenv("TILE_COVERAGE_PATH", os.path.join(DATA_DIR, "tiles.db"))
+TILE_REFRESH_DAYS = float(os.getenv("TILE_REFRESH_DAYS", "30"))  # Searched tiles older than this are revisited
+
+# Rate Limits (token bucket per upstream)
+# rate = sustained requests per second, burst = requests allowed back-to-back.
+# Callers only wait when a bucket is empty, replacing the old fixed sleeps.
+RATE_LIMITS = {
+    "places_text_search": {
+        "rate": float(os.getenv("RATE_LIMIT_PLACES_TEXT_SEARCH", "5")),
+        "burst": 5,
+    },
+    "place_details": {
+        "rate": float(os.getenv("RATE_LIMIT_PLACE_DETAILS", "10")),
+        "burst": 10,
+    },
+    "websites": {
+        "rate": float(os.getenv("RATE_LIMIT_WEBSITES", "20")),
+        "burst": 20,
+    },
+    "sheets": {
+        "rate": float(os.getenv("RATE_LIMIT_SHEETS", "1")),  # Sheets API quota: 60 requests/minute per user
+        "burst": 5,
+    },
+}
+
+# Discovery engine for Places API searches:
+# "sync" = requests, one blocking call at a time per cell
+# "async" = httpx coroutines on one shared event loop (Place Details fetched concurrently)
+DISCOVERY_ENGINE = os.getenv("DISCOVERY_ENGINE", "sync")
+
+# Places API used for Text Search:
+# "legacy" = Text Search (Legacy), then one Place Details call per result for phone/website
+# "new" = Places API (New) Text Search with a field mask: phone, website, rating and status
+#         come back in the search response, so no Place Details calls are made
+PLACES_PROVIDER = os.getenv("PLACES_PROVIDER", "legacy")
+
+# Concurrency Settings
+# Number of (category, city) cells processed in parallel (1 = sequential, original behaviour)
+CELL_CONCURRENCY = int(os.getenv("CELL_CONCURRENCY", "1"))
+# Maximum in-flight requests per upstream, shared by all cell workers in the process
+UPSTREAM_CONCURRENCY = {
+    "places": int(os.getenv("PLACES_CONCURRENCY", "4")),  # Text Search + Place Details
+    "websites": int(os.getenv("WEBSITES_CONCURRENCY", "8")),  # Business websites (email scraping)
+}
+# Place Details lookups (and their email fetches) in flight per cell in the sync engine;
+# the place_details rate limit and PLACES_CONCURRENCY still cap what reaches Google
+DETAILS_CONCURRENCY = int(os.getenv("DETAILS_CONCURRENCY", "4"))
+
+# Cells in flight across all runs in the process (parallel runs share this budget)
+GLOBAL_CELL_CONCURRENCY = int(os.getenv("GLOBAL_CELL_CONCURRENCY", "16"))
+MAX_ACTIVE_RUNS = int(os.getenv("MAX_ACTIVE_RUNS", "4"))  # Runs the API will execute at once
+MAX_FINISHED_RUNS = 20  # Finished runs the API keeps status and leads for
+
+# Discovery scheduler:
+# "cells" = each worker runs a whole (category, city) cell end to end (see CELL_CONCURRENCY)
+# "pipeline" = search -> details -> enrichment -> dedupe -> storage stages joined by bounded queues
+# "queue" = cells go through the durable SQLite job queue (JOB_QUEUE_PATH) with lease/ack;
+#           extra worker processes can join with: python main.py worker <run_id>
+# "sharded" = cells are hashed across SHARD_PROCESSES worker processes (with work-stealing);
+#             the main process is the only Sheets writer
+DISCOVERY_SCHEDULER = os.getenv("DISCOVERY_SCHEDULER", "cells")
+PIPELINE_STAGE_WORKERS = {
+    "search": 2,
+    "details": 4,
+    "enrichment": 8,
+    "dedupe": 1,  # Keep at 1 so in-run duplicates are caught before storage
+    "storage": 1,
+}
+PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", "100"))  # Max items waiting in front of each stage
+
+# Multi-process sharding (scheduler "sharded"): rate limits are split evenly between processes
+SHARD_PROCESSES = int(os.getenv("SHARD_PROCESSES", str(os.cpu_count() or 2)))
+SHARD_START_METHOD = os.getenv("SHARD_START_METHOD", "spawn")  # multiprocessing start method for workers
+
+# Durable job queue (scheduler "queue")
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", os.path.join(DATA_DIR, "jobs.db"))
+QUEUE_WORKERS = int(os.getenv("QUEUE_WORKERS", "4"))  # Worker threads per process
+QUEUE_LEASE_SECONDS = 600  # A cell not acked or extended within this time is handed to another worker
+QUEUE_MAX_ATTEMPTS = 3  # Attempts per cell before it is marked failed
+QUEUE_POLL_SECONDS = 2  # Idle wait while other workers still hold leases
+
+# Cell ordering
+# "yield" = cells with the most new leads per API call in past runs first (see YIELD_HISTORY_PATH)
+# "category" = each category for all cities, then the next category
+CELL_ORDER = os.getenv("CELL_ORDER", "yield")
+YIELD_HISTORY_PATH = os.getenv("YIELD_HISTORY_PATH", os.path.join(DATA_DIR, "yield.db"))
+# Expected new leads per API call for cells without history, by city tier
+YIELD_TIER_PRIORS = {
+    "Tier 1": 0.3,
+    "Tier 2": 0.2,
+    "Tier 3": 0.15,
+    None: 0.1,  # Cities outside the country's tier lists
+}
+YIELD_PRIOR_CALLS = 20  # How many API calls of history the tier prior is worth
+
+# Negative cache: cells that completed with no new leads are skipped by new runs for this long
+NEGATIVE_CACHE_PATH = os.getenv("NEGATIVE_CACHE_PATH", os.path.join(DATA_DIR, "negative_cache.db"))
+NEGATIVE_CACHE_TTL_DAYS = float(os.getenv("NEGATIVE_CACHE_TTL_DAYS", "30"))  # 0 = disabled
+
+# Response cache (response_cache.py): Places results reused across runs and processes
+CACHE_PATH = os.getenv("CACHE_PATH", os.path.join(DATA_DIR, "cache.db"))
+CACHE_MEMORY_ENTRIES = int(os.getenv("CACHE_MEMORY_ENTRIES", "10000"))  # LRU memory tier per cache
+CACHE_TTL_DAYS = {  # 0 = disabled
+    "place_details": float(os.getenv("PLACE_DETAILS_CACHE_TTL_DAYS", "30")),  # Phone, website and email by place_id
+    "text_search": float(os.getenv("TEXT_SEARCH_CACHE_TTL_DAYS", "7")),  # All pages of a search, keyed by what its requests send
+    "geocode": float(os.getenv("GEOCODE_CACHE_TTL_DAYS", "90")),  # City viewports for SEARCH_MODE="tiles"
+}
+
+# Run-wide place_id index (place_index.py): places another cell already found are
+# dropped right after Text Search, before their Place Details call and website fetch
+# "run" = within a run; "global" = also across runs, for PLACE_INDEX_TTL_DAYS; "off" = disabled.
+# Claims of runs that never completed are also purged after PLACE_INDEX_TTL_DAYS
+PLACE_INDEX_SCOPE = os.getenv("PLACE_INDEX_SCOPE", "run")
+PLACE_INDEX_PATH = os.getenv("PLACE_INDEX_PATH", os.path.join(DATA_DIR, "place_index.db"))
+PLACE_INDEX_TTL_DAYS = float(os.getenv("PLACE_INDEX_TTL_DAYS", "30"))
+
+# Run planner (planner.py): estimates for cells without history and typical call latencies
+PLAN_BUSINESSES_PER_CELL = int(os.getenv("PLAN_BUSINESSES_PER_CELL", "40"))  # About two Text Search pages
+PLAN_WEBSITE_RATE = float(os.getenv("PLAN_WEBSITE_RATE", "0.6"))  # Share of businesses that list a website
+PLAN_CALL_SECONDS = {
+    "places_text_search": 1.0,
+    "place_details": 0.3,
+    "websites": 1.5,
+    "sheets": 0.3,
+}
+# Places API list prices in USD per request (Text Search; Place Details with contact fields;
+# New Text Search with contact fields)
+PLACES_SKU_COST_USD = {
+    "text_search": float(os.getenv("PLACES_COST_TEXT_SEARCH", "0.032")),
+    "place_details": float(os.getenv("PLACES_COST_PLACE_DETAILS", "0.020")),
+    "text_search_enterprise": float(os.getenv("PLACES_COST_TEXT_SEARCH_ENTERPRISE", "0.035")),  # PLACES_PROVIDER="new"
+    "nearby_search": float(os.getenv("PLACES_COST_NEARBY_SEARCH", "0.032")),  # SEARCH_MODE="tiles"
+    "geocoding": float(os.getenv("PLACES_COST_GEOCODING", "0.005")),  # SEARCH_MODE="tiles", once per city
+}
+
+# Places API budgets in calls per SKU (quota_manager.py; 0 = unlimited). Windows follow
+# Google's quota day and billing month in QUOTA_TIMEZONE; usage is shared by all processes
+PLACES_BUDGETS = {
+    "text_search": {
+        "daily": int(os.getenv("PLACES_DAILY_BUDGET_TEXT_SEARCH", "0")),
+        "monthly": int(os.getenv("PLACES_MONTHLY_BUDGET_TEXT_SEARCH", "0")),
+    },
+    "place_details": {
+        "daily": int(os.getenv("PLACES_DAILY_BUDGET_PLACE_DETAILS", "0")),
+        "monthly": int(os.getenv("PLACES_MONTHLY_BUDGET_PLACE_DETAILS", "0")),
+    },
+    "text_search_enterprise": {
+        "daily": int(os.getenv("PLACES_DAILY_BUDGET_TEXT_SEARCH_ENTERPRISE", "0")),
+        "monthly": int(os.getenv("PLACES_MONTHLY_BUDGET_TEXT_SEARCH_ENTERPRISE", "0")),
+    },
+    "nearby_search": {
+        "daily": int(os.getenv("PLACES_DAILY_BUDGET_NEARBY_SEARCH", "0")),
+        "monthly": int(os.getenv("PLACES_MONTHLY_BUDGET_NEARBY_SEARCH", "0")),
+    },
+}
+QUOTA_PATH = os.getenv("QUOTA_PATH", os.path.join(DATA_DIR, "quota.db"))
+QUOTA_TIMEZONE = os.getenv("QUOTA_TIMEZONE", "America/Los_Angeles")  # Google quotas reset at midnight Pacific
+QUOTA_SLOWDOWN_AT = float(os.getenv("QUOTA_SLOWDOWN_AT", "0.8"))  # Share of a budget after which calls are spread out
+QUOTA_MAX_DELAY_SECONDS = float(os.getenv("QUOTA_MAX_DELAY_SECONDS", "10"))  # Longest slowdown wait per call
+QUOTA_OVER_LIMIT_PARK_MINUTES = float(os.getenv("QUOTA_OVER_LIMIT_PARK_MINUTES", "60"))  # After Google answers OVER_QUERY_LIMIT
+QUOTA_AUTO_RESUME = os.getenv("QUOTA_AUTO_RESUME", "1") == "1"  # API resumes parked runs when their window opens
+
+# HTTP record/replay for offline benchmarking ("" = off, "record" or "replay")
+HTTP_CASSETTE_MODE = os.getenv("HTTP_CASSETTE_MODE", "").lower()
+HTTP_CASSETTE_PATH = os.getenv("HTTP_CASSETTE_PATH", os.path.join(DATA_DIR, "cassettes", "default.jsonl.gz"))
+HTTP_CASSETTE_LATENCY = os.getenv("HTTP_CASSETTE_LATENCY", "0") == "1"  # Replay with recorded response times
+
+# Shared HTTP connection pools (http_client.py)
+HTTP_POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", "100"))  # Hosts with a pool kept open
+HTTP_POOL_PER_HOST = int(os.getenv("HTTP_POOL_PER_HOST", "10"))  # Connections per host; more requests wait for one
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "1") == "1"  # Async engine uses HTTP/2 when the h2 package is installed
+
+# Logging (structured_logging.py): records are queued and written by a background thread
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # "text" (console) or "json" (one object per line, e.g. Cloud Run)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")  # Per component, e.g. "discovery=WARNING,places=INFO,api=DEBUG"
+LOG_BUSINESS_SAMPLE_RATE = float(os.getenv("LOG_BUSINESS_SAMPLE_RATE", "1"))  # Fraction of per-business events logged (0 = none)
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # Records buffered for the writer; beyond that they are dropped
 
 # Search Settings
 MIN_RATING_THRESHOLD = 0.0  # Minimum rating to consider (0 = no filter)
@@ -0,0 +1,79 @@
+"""
+Process-wide pooled HTTP clients
+
+Every MapsDiscoverer and WebsiteAnalyzer used to build its own requests.Session,
+so connection pools and TLS sessions were thrown away with each cell. They now
+share one keep-alive session per process:
+
+- per-host connection pools of config.HTTP_POOL_PER_HOST connections; callers
+  wait for a free connection instead of opening more (pool_block)
+- gzip/deflate, plus brotli when the brotli package is installed
+- no cookie jar, so cookies set by one business website never reach another
+
+The async engine's httpx client is shared the same way (see
+AsyncEngine.client) and negotiates HTTP/2 when the h2 package is installed.
+A forked worker process builds its own session rather than reuse the
+parent's sockets.
+"""
+import importlib.util
+import os
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from typing import Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+import cassette
+import config
+
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.9',
+}
+
+_session: Optional[requests.Session] = None
+_session_pid: Optional[int] = None
+_lock = threading.Lock()
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def http2_enabled() -> bool:
+    """Whether the async client should negotiate HTTP/2 (config.HTTP2_ENABLED and h2 installed)"""
+    return config.HTTP2_ENABLED and _installed("h2")
+
+
+def adapter_options() -> Dict:
+    """Connection pool settings for requests transport adapters"""
+    return {
+        "pool_connections": config.HTTP_POOL_HOSTS,
+        "pool_maxsize": config.HTTP_POOL_PER_HOST,
+        "pool_block": True,
+    }
+
+
+def get_session() -> requests.Session:
+    """Shared keep-alive session of this process"""
+    global _session, _session_pid
+    with _lock:
+        if _session is None or _session_pid != os.getpid():
+            _session = _build_session()
+            _session_pid = os.getpid()
+        return _session
+
+
+def _build_session() -> requests.Session:
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    # urllib3 advertises (and decodes) br only when brotli is installed
+    session.headers["Accept-Encoding"] = make_headers(accept_encoding=True)["accept-encoding"]
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+    adapter = HTTPAdapter(**adapter_options())
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return cassette.mount(session, **adapter_options())
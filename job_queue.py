@@ -0,0 +1,225 @@
+"""
+Durable discovery job queue backed by a local SQLite file
+
+Each job is one (category, city) cell of a run. Workers lease a job, process it
+and ack it. A lease that isn't acked or extended before it expires (e.g. the
+worker crashed) makes the job available again, up to config.QUEUE_MAX_ATTEMPTS
+attempts. Any number of threads or processes sharing the file can pull work.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import config
+
+
+class JobQueue:
+    """Lease/ack work queue for discovery cells"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or config.JOB_QUEUE_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit mode; write transactions are opened explicitly with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _init_db(self):
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id TEXT NOT NULL,
+                    category_idx INTEGER NOT NULL,
+                    city_idx INTEGER NOT NULL,
+                    state TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    leased_by TEXT,
+                    lease_expires REAL,
+                    last_error TEXT,
+                    updated_at REAL NOT NULL,
+                    UNIQUE (run_id, category_idx, city_idx)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_run_state ON jobs (run_id, state)")
+
+    def enqueue(self, run_id: str, cells: List[Tuple[int, int]]) -> int:
+        """
+        Add cells for a run (cells already queued for the run are left as they are)
+
+        Args:
+            run_id: Run ID
+            cells: (category_idx, city_idx) pairs in processing order
+
+        Returns:
+            Number of newly queued jobs
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                before = self._conn.total_changes
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO jobs (run_id, category_idx, city_idx, updated_at) VALUES (?, ?, ?, ?)",
+                    [(run_id, category_idx, city_idx, now) for category_idx, city_idx in cells]
+                )
+                added = self._conn.total_changes - before
+                self._conn.execute("COMMIT")
+                return added
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def lease(self, run_id: str, worker_id: str, lease_seconds: Optional[float] = None) -> Optional[Dict]:
+        """
+        Take the next available job for a run
+
+        Pending jobs come first, in queue order; jobs whose lease has expired are
+        retried until they run out of attempts, then marked failed.
+
+        Returns:
+            Job dict (id, run_id, category_idx, city_idx, attempts) or None if nothing is available
+        """
+        lease_seconds = lease_seconds or config.QUEUE_LEASE_SECONDS
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Crashed work that has used up its attempts is parked as failed
+                self._conn.execute(
+                    """
+                    UPDATE jobs SET state = 'failed', last_error = 'lease expired', updated_at = ?
+                    WHERE run_id = ? AND state = 'leased' AND lease_expires < ? AND attempts >= ?
+                    """,
+                    (now, run_id, now, config.QUEUE_MAX_ATTEMPTS)
+                )
+                row = self._conn.execute(
+                    """
+                    SELECT * FROM jobs
+                    WHERE run_id = ? AND (state = 'pending' OR (state = 'leased' AND lease_expires < ?))
+                    ORDER BY id LIMIT 1
+                    """,
+                    (run_id, now)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+
+                self._conn.execute(
+                    """
+                    UPDATE jobs SET state = 'leased', attempts = attempts + 1, leased_by = ?,
+                        lease_expires = ?, updated_at = ?
+                    WHERE id = ?
+                    """,
+                    (worker_id, now + lease_seconds, now, row["id"])
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        job = dict(row)
+        job["attempts"] += 1
+        return job
+
+    def extend(self, job_id: int, worker_id: str, lease_seconds: Optional[float] = None) -> bool:
+        """Push a held lease's expiry forward (False if the lease was lost)"""
+        lease_seconds = lease_seconds or config.QUEUE_LEASE_SECONDS
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                UPDATE jobs SET lease_expires = ?, updated_at = ?
+                WHERE id = ? AND state = 'leased' AND leased_by = ?
+                """,
+                (now + lease_seconds, now, job_id, worker_id)
+            )
+            return cursor.rowcount == 1
+
+    def ack(self, job_id: int):
+        """Mark a job as done"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = 'done', lease_expires = NULL, updated_at = ? WHERE id = ?",
+                (time.time(), job_id)
+            )
+
+    def nack(self, job_id: int, error: str):
+        """Record a failed attempt; the job is retried until it runs out of attempts"""
+        with self._lock:
+            self._conn.execute(
+                """
+                UPDATE jobs SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,
+                    lease_expires = NULL, last_error = ?, updated_at = ?
+                WHERE id = ?
+                """,
+                (config.QUEUE_MAX_ATTEMPTS, error[:500], time.time(), job_id)
+            )
+
+    def release(self, job_id: int):
+        """Give a job back without counting the attempt (e.g. the run was stopped)"""
+        with self._lock:
+            self._conn.execute(
+                """
+                UPDATE jobs SET state = 'pending', attempts = MAX(attempts - 1, 0),
+                    leased_by = NULL, lease_expires = NULL, updated_at = ?
+                WHERE id = ? AND state = 'leased'
+                """,
+                (time.time(), job_id)
+            )
+
+    def stats(self, run_id: str) -> Dict[str, int]:
+        """Job counts by state for a run"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT state, COUNT(*) AS count FROM jobs WHERE run_id = ? GROUP BY state",
+                (run_id,)
+            ).fetchall()
+        counts = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+        for row in rows:
+            counts[row["state"]] = row["count"]
+        return counts
+
+    def done_cells(self, run_id: str) -> List[Tuple[int, int]]:
+        """(category_idx, city_idx) of every acked job for a run"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT category_idx, city_idx FROM jobs WHERE run_id = ? AND state = 'done'",
+                (run_id,)
+            ).fetchall()
+        return [(row["category_idx"], row["city_idx"]) for row in rows]
+
+    def heartbeat(self, job: Dict, worker_id: str) -> "LeaseHeartbeat":
+        """Context manager that keeps a job's lease alive while it is processed"""
+        return LeaseHeartbeat(self, job["id"], worker_id)
+
+
+class LeaseHeartbeat:
+    """Extends a lease every third of the lease period until the block exits"""
+
+    def __init__(self, queue: JobQueue, job_id: int, worker_id: str):
+        self.queue = queue
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True, name=f"LeaseHeartbeat-{job_id}")
+
+    def _run(self):
+        interval = max(1.0, config.QUEUE_LEASE_SECONDS / 3)
+        while not self._stopped.wait(interval):
+            if not self.queue.extend(self.job_id, self.worker_id):
+                break
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stopped.set()
+        self._thread.join()
+        return False
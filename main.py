@@ -2,44 +2,108 @@
 Main application for B2B Lead Discovery System
 Manual start/stop control with sequential execution
 """
+import logging
 import os
 import sys
 import time
 import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import uuid
 import config
+import metrics
+import place_index
+import response_cache
+import tiling
 from countries import list_all_countries, search_countries, get_country_config, get_all_cities_for_country
 from sheets_manager import SheetsManager
 from maps_discoverer import MapsDiscoverer
+from concurrency import cell_slot
+from pipeline import Pipeline, Stage
+from checkpoints import CheckpointStore, RunCheckpoint
+from job_queue import JobQueue
+from sharding import ShardedDiscovery
+from yield_history import YieldHistory
+from negative_cache import NegativeCache
+from run_control import RunCancelled, RunController
+import structured_logging
+
+
+log = structured_logging.get_logger("discovery")
 
 
 class LeadDiscoveryApp:
     """Main application class for lead discovery"""
     
-    def __init__(self, lead_callback=None):
-        self.sheets_manager = SheetsManager()
+    def __init__(self, lead_callback=None, sheets_manager: Optional[SheetsManager] = None):
+        """
+        Args:
+            lead_callback: Called with each saved lead
+            sheets_manager: Shared SheetsManager (e.g. several runs writing to the same sheets)
+        """
+        self.sheets_manager = sheets_manager or SheetsManager()
         self.is_running = False
-        self.should_stop = False
+        # Pause/stop signals; sleeps, requests and browser sessions of the run honour them
+        self.controller = RunController()
         self.run_id = str(uuid.uuid4())[:8]
         self.current_country = None
         self.current_city = None
         self.current_category = None
         self.lead_callback = lead_callback  # Callback function for when leads are found
         
+        # Cell progress (a cell is one category searched in one city)
+        self.concurrency = 1
+        self.cells_total = 0
+        self.cells_completed = 0
+        self.cells_skipped = 0  # Cells left out because of the negative cache
+        self.run_started_at = None
+        self.run_finished_at = None
+        self.scheduler = config.DISCOVERY_SCHEDULER
+        self.pipeline = None
+        self._cells_completed_at_start = 0
+        self._progress_lock = threading.Lock()
+        
+        # Checkpoints let a run continue after a restart (see resume())
+        self.checkpoint_store = CheckpointStore()
+        self.checkpoint = None
+        self.job_queue = None  # Opened on first use by the "queue" scheduler
+        self.sharded = None  # Process pool of the "sharded" scheduler while it runs
+        
+        # Per-cell API calls / new leads / duplicates, saved to the yield history when a cell completes
+        self.yield_history = None  # Opened on first use
+        self.negative_cache = None  # Opened on first use
+        self._cell_tallies = {}
+        self.places_deduped = 0  # Search results dropped because another cell of the run found them
+        
         # Note: Signal handlers are NOT registered here
         # This allows the discovery process to continue running even if the web server
         # receives shutdown signals. Discovery will only stop when explicitly requested
         # via the stop() method or API endpoint.
     
+    @property
+    def should_stop(self) -> bool:
+        """True once stop() has been requested for the current run"""
+        return self.controller.stopped
+    
+    @should_stop.setter
+    def should_stop(self, value: bool):
+        if value:
+            self.controller.stop()
+        else:
+            self.controller.reset()
+    
     def start(
         self,
         country: str,
         city: str,
         categories: Optional[List[str]] = None,
         long_running: bool = False,
-        max_hours: int = 24
+        max_hours: int = 24,
+        concurrency: Optional[int] = None,
+        scheduler: Optional[str] = None,
+        cell_order: Optional[str] = None
     ):
         """
         Start lead discovery process
@@ -50,6 +114,11 @@ class LeadDiscoveryApp:
             categories: List of categories to search (default: all)
             long_running: Whether to run for extended period
             max_hours: Maximum hours to run (for long_running mode)
+            concurrency: Number of (category, city) cells to process in parallel
+                         (default: config.CELL_CONCURRENCY, 1 = sequential)
+            scheduler: "cells", "pipeline", "queue" or "sharded" (default: config.DISCOVERY_SCHEDULER)
+            cell_order: "yield" (most productive cells first) or "category"
+                        (default: config.CELL_ORDER)
         """
         if self.is_running:
             print("Discovery already running. Stop it first.")
@@ -62,11 +131,6 @@ class LeadDiscoveryApp:
             print(f"Available countries: {', '.join(list_all_countries()[:10])}...")
             return
         
-        self.current_country = country
-        self.current_city = city
-        self.is_running = True
-        self.should_stop = False
-        
         # Use default categories if none provided
         if categories is None:
             categories = config.DEFAULT_CATEGORIES
@@ -75,7 +139,6 @@ class LeadDiscoveryApp:
         all_cities = get_all_cities_for_country(country)
         if not all_cities:
             print(f"Error: No cities found for country '{country}'")
-            self.is_running = False
             return
         
         # Find starting city index and reorder cities list to start from selected city
@@ -88,87 +151,194 @@ class LeadDiscoveryApp:
             print(f"Warning: City '{city}' not found in country cities list. Using only this city.")
             cities_to_process = [city]
         
+        # Every start is a new run; the first one keeps the ID assigned in __init__
+        if self.run_started_at is not None:
+            self.run_id = str(uuid.uuid4())[:8]
+        
+        cell_order = cell_order or config.CELL_ORDER
+        order = None
+        if cell_order == "yield":
+            order = self._get_yield_history().order_cells(
+                country,
+                categories,
+                cities_to_process,
+                [
+                    (category_idx, city_idx)
+                    for category_idx in range(len(categories))
+                    for city_idx in range(len(cities_to_process))
+                ]
+            )
+        
+        checkpoint = self.checkpoint_store.create(
+            self.run_id,
+            country,
+            city,
+            categories,
+            cities_to_process,
+            options={
+                "long_running": long_running,
+                "max_hours": max_hours,
+                "concurrency": concurrency,
+                "scheduler": scheduler,
+                "cell_order": cell_order,
+            },
+            cell_order=order
+        )
+        
+        # Cells that recently produced no new leads are skipped for this run
+        cached = self._get_negative_cache().cached_cells(country, categories, cities_to_process)
+        if cached:
+            checkpoint.skip_cells(list(cached))
+            print(f"Skipping {len(cached)} cells with no new leads in the last "
+                  f"{config.NEGATIVE_CACHE_TTL_DAYS:g} days "
+                  f"({sum(1 for reason in cached.values() if reason == 'zero_results')} zero results, "
+                  f"{sum(1 for reason in cached.values() if reason == 'duplicates_only')} duplicates only)")
+        
+        self._execute_run(checkpoint)
+    
+    def resume(self, run_id: str) -> bool:
+        """
+        Continue a checkpointed run from the point where it stopped
+        
+        Completed cells are skipped, and businesses already handled in a cell that
+        was interrupted part-way are not looked up again.
+        
+        Args:
+            run_id: ID of the run to resume
+            
+        Returns:
+            False if there was nothing to resume, True once the resumed run ends
+        """
+        if self.is_running:
+            print("Discovery already running. Stop it first.")
+            return False
+        
+        checkpoint = self.checkpoint_store.load(run_id)
+        if not checkpoint:
+            print(f"Error: No checkpoint found for run '{run_id}'.")
+            return False
+        if checkpoint.data["status"] == "completed":
+            print(f"Run '{run_id}' already completed. Nothing to resume.")
+            return False
+        
+        self.run_id = run_id
+        self._execute_run(checkpoint)
+        return True
+    
+    def _execute_run(self, checkpoint: RunCheckpoint):
+        """Run (or continue) the cells recorded in a checkpoint"""
+        data = checkpoint.data
+        options = data["options"]
+        country = data["country"]
+        categories = checkpoint.categories
+        cities_to_process = checkpoint.cities
+        long_running = options.get("long_running", False)
+        max_hours = options.get("max_hours", 24)
+        resuming = checkpoint.counters["elapsed_seconds"] > 0 or checkpoint.counters["cells_completed"] > 0
+        
+        concurrency = options.get("concurrency")
+        if concurrency is None:
+            concurrency = config.CELL_CONCURRENCY
+        concurrency = max(1, concurrency)
+        
+        scheduler = options.get("scheduler") or config.DISCOVERY_SCHEDULER
+        if scheduler == "pipeline" and not config.GOOGLE_MAPS_API_KEY:
+            print("Note: Pipeline scheduler requires GOOGLE_MAPS_API_KEY. Falling back to cell scheduler.")
+            scheduler = "cells"
+        
+        self.checkpoint = checkpoint
+        self.current_country = country
+        self.current_city = data["city"]
+        self.is_running = True
+        self.should_stop = False
+        
         print(f"\n{'='*60}")
-        print(f"B2B Lead Discovery Started")
+        print(f"B2B Lead Discovery {'Resumed' if resuming else 'Started'}")
         print(f"{'='*60}")
         print(f"Run ID: {self.run_id}")
         print(f"Country: {country}")
-        print(f"Starting City: {city}")
+        print(f"Starting City: {data['city']}")
         print(f"Total Cities: {len(cities_to_process)}")
         print(f"Categories: {len(categories)}")
         print(f"Mode: {'Long-running' if long_running else 'Standard'}")
-        print(f"Strategy: Complete each category for all cities before moving to next category")
+        if scheduler == "pipeline":
+            print(f"Scheduler: Pipeline ({', '.join(f'{name} x{count}' for name, count in config.PIPELINE_STAGE_WORKERS.items())})")
+        elif scheduler == "sharded":
+            print(f"Scheduler: Sharded ({options.get('concurrency') or config.SHARD_PROCESSES} worker processes)")
+        elif scheduler == "queue":
+            print(f"Scheduler: Job queue ({options.get('concurrency') or config.QUEUE_WORKERS} worker threads, {config.JOB_QUEUE_PATH})")
+        else:
+            print(f"Concurrency: {concurrency} cell(s) in parallel")
+        if options.get("cell_order") == "yield":
+            print(f"Strategy: Highest expected yield (new leads per API call) first")
+        else:
+            print(f"Strategy: Complete each category for all cities before moving to next category")
+        if checkpoint.counters.get("cells_skipped"):
+            print(f"Skipped: {checkpoint.counters['cells_skipped']} cells with no new leads in recent runs")
+        if resuming:
+            print(f"Resuming at: category {data['category_index'] + 1}, city {data['city_index'] + 1} "
+                  f"({checkpoint.counters['cells_completed']} cells already done)")
         print(f"{'='*60}\n")
         
-        start_time = time.time()
+        # Time already spent before a restart counts towards the long-running limit
+        start_time = time.time() - checkpoint.counters["elapsed_seconds"]
         max_seconds = max_hours * 3600 if long_running else None
         
+        self.concurrency = concurrency
+        self.scheduler = scheduler
+        self.pipeline = None
+        self.sharded = None
+        self._cell_tallies = {}
+        self.places_deduped = 0
+        self.cells_skipped = checkpoint.counters.get("cells_skipped", 0)
+        self.cells_total = len(categories) * len(cities_to_process) - self.cells_skipped
+        self.cells_completed = checkpoint.counters["cells_completed"]
+        self._cells_completed_at_start = self.cells_completed
+        self.run_started_at = time.time()
+        self.run_finished_at = None
+        
+        def time_limit_reached() -> bool:
+            return bool(max_seconds) and (time.time() - start_time) > max_seconds
+        
+        status = "completed"
         try:
-            total_leads_found = 0
+            if scheduler == "pipeline":
+                self._run_pipeline(country, time_limit_reached)
+            elif scheduler == "sharded":
+                self._run_sharded(country, options.get("concurrency") or config.SHARD_PROCESSES, time_limit_reached)
+            elif scheduler == "queue":
+                self._run_queue(country, options.get("concurrency") or config.QUEUE_WORKERS, time_limit_reached)
+            elif concurrency > 1:
+                self._run_cells_concurrently(country, concurrency, time_limit_reached)
+            else:
+                self._run_cells_sequentially(country, time_limit_reached)
             
-            # NEW LOGIC: For each category, iterate through all cities
-            for category_idx, category in enumerate(categories, 1):
-                if self.should_stop:
-                    print("\nStopping as requested...")
-                    break
-                
-                # Check time limit for long-running mode
-                if max_seconds and (time.time() - start_time) > max_seconds:
-                    print(f"\nMaximum time limit ({max_hours} hours) reached.")
-                    break
-                
-                self.current_category = category
-                
-                print(f"\n{'='*60}")
-                print(f"Category [{category_idx}/{len(categories)}]: {category}")
-                print(f"{'='*60}")
-                
-                # For this category, iterate through all cities
-                for city_idx, current_city in enumerate(cities_to_process, 1):
-                    if self.should_stop:
-                        print("\nStopping as requested...")
-                        break
-                    
-                    # Check time limit for long-running mode
-                    if max_seconds and (time.time() - start_time) > max_seconds:
-                        print(f"\nMaximum time limit ({max_hours} hours) reached.")
-                        break
-                    
-                    self.current_city = current_city
-                    
-                    print(f"\n[{city_idx}/{len(cities_to_process)}] City: {current_city}, {country}")
-                    print(f"Category: {category}")
-                    print("-" * 60)
-                    
-                    # Discover businesses for this category in this city
-                    leads = self._discover_category_leads(country, current_city, category)
-                    
-                    if leads:
-                        print(f"✓ Found {len(leads)} leads for '{category}' in {current_city}")
-                        total_leads_found += len(leads)
-                    else:
-                        print(f"  No leads found for '{category}' in {current_city}")
-                    
-                    # Delay between cities (except for last city of last category)
-                    if city_idx < len(cities_to_process) and not self.should_stop:
-                        print(f"\nWaiting {config.DEFAULT_DELAY_BETWEEN_SEARCHES} seconds before next city...")
-                        time.sleep(config.DEFAULT_DELAY_BETWEEN_SEARCHES)
-                
-                # Delay between categories (except for last one)
-                if category_idx < len(categories) and not self.should_stop:
-                    print(f"\n{'='*60}")
-                    print(f"Completed category '{category}' for all {len(cities_to_process)} cities")
-                    print(f"Waiting {config.DEFAULT_DELAY_BETWEEN_SEARCHES} seconds before next category...")
-                    print(f"{'='*60}\n")
-                    time.sleep(config.DEFAULT_DELAY_BETWEEN_SEARCHES)
+            if self.controller.parked_until:
+                # A Places API budget ran out: the remaining cells wait for its next window
+                status = "parked"
+                print(f"\nPlaces API budget exhausted. Run parked until "
+                      f"{datetime.fromtimestamp(self.controller.parked_until).isoformat(timespec='minutes')}; "
+                      f"continue it then with: resume {self.run_id}")
+            elif self.should_stop:
+                status = "stopped"
+            elif time_limit_reached():
+                status = "time_limit"
+                print(f"\nMaximum time limit ({max_hours} hours) reached.")
             
+            if status == "completed":
+                # Place claims only matter while the run can still be resumed
+                place_index.release_run(self.run_id)
+            
+            # Let queued per-cell log lines come out before the summary
+            structured_logging.flush()
             print(f"\n{'='*60}")
             print(f"Discovery Complete")
-            print(f"Total leads found: {total_leads_found}")
+            print(f"Total leads found: {checkpoint.counters['leads_found']}")
             print(f"Run ID: {self.run_id}")
             print(f"{'='*60}\n")
             
         except Exception as e:
+            status = "error"
             print(f"\nError during discovery: {e}")
             import traceback
             traceback.print_exc()
@@ -178,6 +348,8 @@ class LeadDiscoveryApp:
             # Only explicit stop() call should stop it
             print("\n\nInterrupted. Discovery will continue unless explicitly stopped via API.")
             # Don't set should_stop here - let it continue
+            # The cells left unfinished stay in the checkpoint, so the run must remain resumable
+            status = "stopped"
         except Exception as e:
             print(f"\nError during discovery: {e}")
             import traceback
@@ -187,82 +359,662 @@ class LeadDiscoveryApp:
         finally:
             # Mark as not running when complete, but discovery may have finished naturally
             self.is_running = False
+            self.run_finished_at = time.time()
+            checkpoint.finish(status, time.time() - start_time, parked_until=self.controller.parked_until)
+            place_index.close_run(self.run_id)
             # Don't reset should_stop here - it might be set by explicit stop() call
     
-    def _discover_category_leads(self, country: str, city: str, category: str) -> List[dict]:
-        """Discover and process leads for a category"""
+    def _pending_cells(self) -> List[Tuple[int, int]]:
+        """(category_idx, city_idx) of every cell not yet completed, in the run's cell order"""
+        checkpoint = self.checkpoint
+        return [cell for cell in checkpoint.cell_order() if not checkpoint.is_cell_complete(*cell)]
+    
+    def _run_cells_sequentially(self, country: str, time_limit_reached) -> int:
+        """Process cells one at a time, in the run's cell order"""
+        categories = self.checkpoint.categories
+        cities = self.checkpoint.cities
+        total_leads_found = 0
+        current_category_idx = None
+        
+        # Cells already done (before a restart) are skipped
+        for category_idx, city_idx in self._pending_cells():
+            if not self._hold_if_paused():
+                print("\nStopping as requested...")
+                break
+            
+            # Check time limit for long-running mode
+            if time_limit_reached():
+                break
+            
+            if category_idx != current_category_idx:
+                if current_category_idx is not None:
+                    log.info(f"\n{'='*60}\nCompleted category '{categories[current_category_idx]}' for all {len(cities)} cities\n{'='*60}\n")
+                current_category_idx = category_idx
+                
+                log.info(f"\n{'='*60}\nCategory [{category_idx + 1}/{len(categories)}]: {categories[category_idx]}\n{'='*60}")
+            
+            # Pacing between searches is handled by the rate-limit buckets (config.RATE_LIMITS)
+            leads = self._run_cell(country, category_idx, city_idx)
+            total_leads_found += len(leads)
+        
+        return total_leads_found
+    
+    def _run_cells_concurrently(self, country: str, concurrency: int, time_limit_reached) -> int:
+        """
+        Process cells in a bounded worker pool
+        
+        Cells are submitted in the same category-major order as the sequential mode,
+        but never more than `concurrency` at a time, so a stop request or the time
+        limit only has to wait for the cells already in flight. Pacing between
+        requests is left to the per-upstream concurrency and rate limits.
+        """
+        cells = iter(self._pending_cells())
+        total_leads_found = 0
+        pending = set()
+        
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="CellWorker") as executor:
+            while True:
+                # Top up the pool without queueing more cells than there are workers
+                while len(pending) < concurrency and self._hold_if_paused() and not time_limit_reached():
+                    cell = next(cells, None)
+                    if cell is None:
+                        break
+                    pending.add(executor.submit(self._run_cell, country, *cell))
+                
+                if not pending:
+                    break
+                
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        total_leads_found += len(future.result())
+                    except Exception as e:
+                        print(f"Error in cell worker: {e}")
+        
+        if self.should_stop:
+            print("\nStopping as requested...")
+        
+        return total_leads_found
+    
+    def _run_sharded(self, country: str, processes: int, time_limit_reached) -> int:
+        """
+        Process cells in a pool of worker processes
+        
+        Workers search and enrich their shard of the cells (see sharding.py); this
+        process turns the businesses they send back into leads and is the only
+        one writing to the sheet.
+        """
+        tasks = [
+            {
+                "cell": cell,
+                "category": self.checkpoint.categories[cell[0]],
+                "city": self.checkpoint.cities[cell[1]],
+                "skip_place_ids": sorted(self.checkpoint.processed_place_ids(*cell)),
+                "run_id": self.run_id,
+            }
+            for cell in self._pending_cells()
+        ]
+        if not tasks:
+            return 0
+        
+        self.sharded = ShardedDiscovery(country, tasks, processes)
+        self.sharded.start()
+        
+        total_leads = 0
+        try:
+            for cell, businesses, counts in self.sharded.results(lambda: self.should_stop or time_limit_reached()):
+                self._tally(cell, resumed=1 if self.checkpoint.processed_place_ids(*cell) else 0, **counts)
+                category = self.checkpoint.categories[cell[0]]
+                city = self.checkpoint.cities[cell[1]]
+                self.current_category = category
+                self.current_city = city
+                print(f"\n'{category}' in {city}, {country}: {len(businesses)} businesses")
+                
+                leads = self._store_businesses(businesses, country, city, category, cell)
+                total_leads += len(leads)
+                self._mark_cell_complete(*cell)
+            
+            if self.sharded.parked_until:
+                self.controller.park(self.sharded.parked_until)
+        finally:
+            # After a stop, don't wait for workers to finish their cells (they are redone on resume)
+            self.sharded.close(timeout=0.2 if self.should_stop else 30)
+        
+        if self.should_stop:
+            print("\nStopping as requested...")
+        
+        return total_leads
+    
+    def _run_queue(self, country: str, workers: int, time_limit_reached, enqueue: bool = True):
+        """
+        Process cells through the durable job queue
+        
+        Pending cells are enqueued (cells already queued for this run keep their
+        state), then worker threads lease, process and ack them. Cells leased by a
+        worker that crashed are retried once their lease expires. Returns when no
+        cell of the run is pending or leased by any worker, in any process.
+        """
+        if self.job_queue is None:
+            self.job_queue = JobQueue()
+        run_id = self.run_id
+        
+        if enqueue:
+            added = self.job_queue.enqueue(run_id, self._pending_cells())
+            print(f"Queued {added} cells in {self.job_queue.path}")
+        
+        def worker(worker_idx: int):
+            worker_id = f"{os.getpid()}-{worker_idx}"
+            while self._hold_if_paused() and not time_limit_reached():
+                job = self.job_queue.lease(run_id, worker_id)
+                if job is None:
+                    counts = self.job_queue.stats(run_id)
+                    if counts["pending"] + counts["leased"] == 0:
+                        break
+                    # Other workers still hold leases; wait in case one of them expires
+                    try:
+                        self.controller.sleep(config.QUEUE_POLL_SECONDS)
+                    except RunCancelled:
+                        break
+                    continue
+                
+                try:
+                    with self.job_queue.heartbeat(job, worker_id):
+                        self._run_cell(country, job["category_idx"], job["city_idx"])
+                except Exception as e:
+                    print(f"Error in queue worker {worker_id}: {e}")
+                    self.job_queue.nack(job["id"], str(e))
+                    continue
+                
+                if self.should_stop:
+                    # Cell was cut short - hand it back for resume or another worker
+                    self.job_queue.release(job["id"])
+                else:
+                    self.job_queue.ack(job["id"])
+        
+        threads = [
+            threading.Thread(target=worker, args=(worker_idx + 1,), name=f"QueueWorker-{worker_idx + 1}")
+            for worker_idx in range(max(1, workers))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        # Cells acked by worker processes are only known to the queue
+        for category_idx, city_idx in self.job_queue.done_cells(run_id):
+            if not self.checkpoint.is_cell_complete(category_idx, city_idx):
+                self._mark_cell_complete(category_idx, city_idx)
+        
+        if self.should_stop:
+            print("\nStopping as requested...")
+        
+        counts = self.job_queue.stats(run_id)
+        if counts["failed"]:
+            print(f"⚠ {counts['failed']} cells failed after {config.QUEUE_MAX_ATTEMPTS} attempts")
+    
+    def run_queue_worker(self, run_id: str, workers: Optional[int] = None):
+        """
+        Join a queue-scheduled run as an extra worker (e.g. from another process)
+        
+        Reads the run's categories and cities from its checkpoint and processes
+        queued cells until none are left. Progress inside a cell is not shared
+        between processes, so a cell retried elsewhere starts from its first page.
+        
+        Args:
+            run_id: ID of a run started with scheduler="queue"
+            workers: Worker threads (default: config.QUEUE_WORKERS)
+        """
+        saved = self.checkpoint_store.load(run_id)
+        if not saved:
+            print(f"Error: No checkpoint found for run '{run_id}'.")
+            return
+        
+        # In-memory copy: the coordinating process owns the checkpoint file
+        self.checkpoint = RunCheckpoint(None, saved.data)
+        self.run_id = run_id
+        self.is_running = True
+        self.should_stop = False
+        self.current_country = saved.data["country"]
+        self.cells_total = len(saved.categories) * len(saved.cities)
+        self.cells_completed = 0
+        self._cells_completed_at_start = 0
+        self.run_started_at = time.time()
+        self.run_finished_at = None
+        
+        print(f"Joining run {run_id} as queue worker ({workers or config.QUEUE_WORKERS} threads)")
+        try:
+            self._run_queue(self.current_country, workers or config.QUEUE_WORKERS, lambda: False, enqueue=False)
+        finally:
+            self.is_running = False
+            self.run_finished_at = time.time()
+    
+    def _run_cell(self, country: str, category_idx: int, city_idx: int) -> List[dict]:
+        """Discover leads for one (category, city) cell and record progress"""
+        category = self.checkpoint.categories[category_idx]
+        city = self.checkpoint.cities[city_idx]
+        self.current_category = category
+        self.current_city = city
+        
+        log.info(
+            f"\n[{city_idx + 1}/{len(self.checkpoint.cities)}] City: {city}, {country}\nCategory: {category}\n{'-' * 60}",
+            run_id=self.run_id, city=city, category=category
+        )
+        
+        # Discover businesses for this category in this city
+        with cell_slot():
+            leads = self._discover_category_leads(country, city, category, cell=(category_idx, city_idx))
+        
+        if leads:
+            log.info(f"✓ Found {len(leads)} leads for '{category}' in {city}", run_id=self.run_id, city=city, category=category, leads=len(leads))
+        else:
+            log.info(f"  No leads found for '{category}' in {city}", run_id=self.run_id, city=city, category=category, leads=0)
+        
+        self._mark_cell_complete(category_idx, city_idx)
+        
+        return leads
+    
+    def _mark_cell_complete(self, category_idx: int, city_idx: int):
+        """Record that every business found for a cell has been processed"""
+        # A stop can cut a cell short; leave it in progress so resume() finishes it
+        if self.should_stop:
+            return
+        with self._progress_lock:
+            self.cells_completed += 1
+            tally = self._cell_tallies.pop((category_idx, city_idx), None)
+        self.checkpoint.complete_cell(category_idx, city_idx)
+        
+        if tally:
+            self._record_cell_outcome(category_idx, city_idx, tally)
+    
+    def _record_cell_outcome(self, category_idx: int, city_idx: int, tally: dict):
+        """Feed a completed cell's counts to the yield history, the negative cache and the tile coverage"""
+        country = self.current_country
+        city = self.checkpoint.cities[city_idx]
+        category = self.checkpoint.categories[category_idx]
+        
         try:
-            # Initialize discoverer
-            discoverer = MapsDiscoverer(country)
+            self._get_yield_history().record(
+                country, city, category,
+                api_calls=tally["api_calls"],
+                businesses=tally["businesses"],
+                new_leads=tally["new_leads"],
+                duplicates=tally["duplicates"]
+            )
+        except Exception as e:
+            log.warning(f"Warning: Could not record yield history: {e}")
+        
+        try:
+            negative_cache = self._get_negative_cache()
+            if tally["new_leads"]:
+                negative_cache.remove(country, city, category)
+            elif tally["api_calls"] and not tally["search_errors"] and not tally["resumed"]:
+                # Only a search that really ran and came back empty counts - not a failed
+                # request, HTML scraping, or a cell finished after a restart
+                reason = "duplicates_only" if tally["businesses"] or tally["places_deduped"] else "zero_results"
+                negative_cache.add(country, city, category, reason)
+        except Exception as e:
+            log.warning(f"Warning: Could not update negative cache: {e}")
+        
+        if tally["tiles_searched"]:
+            try:
+                coverage = tiling.get_tile_coverage()
+                for tile in tally["tiles_searched"]:
+                    coverage.record(*tile)
+            except Exception as e:
+                log.warning(f"Warning: Could not record tile coverage: {e}")
+    
+    def _tally(self, cell: Optional[Tuple[int, int]], **counts):
+        """Add to a cell's api_calls / businesses / new_leads / duplicates / error / places_deduped counts (and tiles_searched list)"""
+        if not cell:
+            return
+        with self._progress_lock:
+            tally = self._cell_tallies.setdefault(
+                tuple(cell),
+                {"api_calls": 0, "businesses": 0, "new_leads": 0, "duplicates": 0, "search_errors": 0, "resumed": 0,
+                 "places_deduped": 0, "tiles_searched": []}
+            )
+            for name, value in counts.items():
+                tally[name] += value
+            self.places_deduped += counts.get("places_deduped", 0)
+    
+    def _get_yield_history(self) -> YieldHistory:
+        if self.yield_history is None:
+            self.yield_history = YieldHistory()
+        return self.yield_history
+    
+    def _get_negative_cache(self) -> NegativeCache:
+        if self.negative_cache is None:
+            self.negative_cache = NegativeCache()
+        return self.negative_cache
+    
+    def _run_pipeline(self, country: str, time_limit_reached) -> int:
+        """
+        Process cells as a staged pipeline
+        
+        search -> details -> enrichment -> dedupe -> storage, each stage with its
+        own workers (config.PIPELINE_STAGE_WORKERS) and a bounded input queue
+        (config.PIPELINE_QUEUE_SIZE). A full queue blocks the stage feeding it.
+        """
+        api_key = config.GOOGLE_MAPS_API_KEY
+        discoverer = MapsDiscoverer(country, controller=self.controller)
+        saved_leads = []
+        claimed_keys = set()  # phone/website keys already headed for storage in this run
+        claimed_lock = threading.Lock()
+        details_cache = response_cache.get_cache("place_details")
+        
+        def search(cell):
+            # A generator: each Text Search page goes on to the details stage while
+            # the next page's token is still waiting out its activation delay
+            if self.should_stop:
+                return
+            category = self.checkpoint.categories[cell[0]]
+            city = self.checkpoint.cities[cell[1]]
+            self.current_category = category
+            self.current_city = city
+            metrics.set_labels(country=country, category=category)
+            log.info(f"\nSearching '{category}' in {city}, {country}", run_id=self.run_id, city=city, category=category)
+            skip_place_ids = self.checkpoint.processed_place_ids(*cell)
+            # Own instance so this cell's request and error counts aren't mixed with other searches
+            searcher = MapsDiscoverer(country, controller=self.controller)
+            with cell_slot():
+                for businesses in searcher.iter_text_search_pages(
+                    category, city, api_key,
+                    max_results=config.MAX_RESULTS_PER_CATEGORY,
+                    skip_place_ids=skip_place_ids,
+                    cell_places=place_index.cell_places(self.run_id, cell)
+                ):
+                    for business in businesses:
+                        yield {"cell": cell, "category": category, "city": city, "business": business}
+            self._tally(
+                cell,
+                api_calls=searcher.api_calls,
+                search_errors=searcher.search_errors,
+                places_deduped=searcher.places_deduped,
+                tiles_searched=searcher.tiles_searched,
+                resumed=1 if skip_place_ids else 0
+            )
+        
+        def details(item):
+            if self.should_stop:
+                return []
+            business = item["business"]
+            if discoverer.has_contact_details(business):
+                return [item]  # Places API (New) results already carry phone and website
+            metrics.set_labels(country=country, category=item["category"])
+            cached = details_cache.get(business["place_id"])
+            if cached is not None:
+                # Seen in an earlier run: details and email are both known
+                discoverer.apply_details(business, cached)
+                item["cached"] = True
+                return [item]
+            self._tally(item["cell"], api_calls=1)
+            try:
+                details = discoverer.get_contact_details(business["place_id"], api_key)
+            except RunCancelled:
+                return []  # Stopped or parked: the place is looked up again on resume
+            discoverer.apply_details(business, details)
+            item["cacheable"] = details is not None
+            return [item]
+        
+        def enrichment(item):
+            if self.should_stop:
+                return []
+            if item.get("cached"):
+                return [item]
+            business = item["business"]
+            metrics.set_labels(country=country, category=item["category"])
+            if business.get("website"):
+                try:
+                    business["email"] = discoverer.fetch_email(business["website"])
+                except RunCancelled:
+                    return []
+            if item.get("cacheable"):
+                details_cache.put(business["place_id"], {
+                    "phone": business["phone"],
+                    "website": business["website"],
+                    "email": business["email"],
+                })
+            return [item]
+        
+        def dedupe(item):
+            if self.should_stop:
+                return []
+            lead = self._process_business_to_lead(item["business"], country, item["city"], item["category"])
+            if not lead:
+                self._tally(item["cell"], businesses=1)
+                self.checkpoint.record_business(*item["cell"], item["business"].get("place_id"))
+                return []
+            
+            with self.sheets_manager.lock, metrics.stage("duplicate_check", country=country, category=item["category"]):
+                is_duplicate = self.sheets_manager.check_duplicate(
+                    lead.get("phone"),
+                    lead.get("website"),
+                    country,
+                    item["city"]
+                )
+            
+            # Leads still waiting in the storage queue aren't in the sheet yet
+            keys = {f"{field}:{lead[field]}" for field in ("phone", "website") if lead.get(field)}
+            with claimed_lock:
+                if not is_duplicate and keys & claimed_keys:
+                    is_duplicate = True
+                if not is_duplicate:
+                    claimed_keys.update(keys)
+            
+            if is_duplicate:
+                log.business("    ⊘ Duplicate (skipped): %s", lead["business_name"], run_id=self.run_id, place_id=item["business"].get("place_id"))
+                self._tally(item["cell"], businesses=1, duplicates=1)
+                self.checkpoint.record_business(*item["cell"], item["business"].get("place_id"))
+                return []
+            return [{"cell": item["cell"], "place_id": item["business"].get("place_id"), "lead": lead}]
+        
+        def storage(item):
+            lead = item["lead"]
+            with self.sheets_manager.lock:
+                success = self._append_lead(lead)
+            self._tally(item["cell"], businesses=1, new_leads=1 if success else 0)
+            self.checkpoint.record_business(*item["cell"], item["place_id"], saved=success)
+            
+            if not success:
+                log.business("    ✗ Failed to save: %s", lead["business_name"], level=logging.WARNING, run_id=self.run_id, place_id=item["place_id"])
+                return []
             
+            saved_leads.append(lead)
+            log.business(
+                "    ✓ Saved: %s (%s, %s)", lead["business_name"], lead["category"], lead["city"],
+                run_id=self.run_id, place_id=item["place_id"]
+            )
+            # Call callback if provided (for UI updates)
+            if self.lead_callback:
+                try:
+                    self.lead_callback(lead)
+                except Exception as e:
+                    log.warning(f"      Warning: Callback error: {e}")
+            return []
+        
+        handlers = [
+            ("search", search),
+            ("details", details),
+            ("enrichment", enrichment),
+            ("dedupe", dedupe),
+            ("storage", storage),
+        ]
+        self.pipeline = Pipeline(
+            [
+                Stage(name, handler, config.PIPELINE_STAGE_WORKERS.get(name, 1), config.PIPELINE_QUEUE_SIZE)
+                for name, handler in handlers
+            ],
+            on_group_done=lambda cell: self._mark_cell_complete(*cell)
+        )
+        self.pipeline.start()
+        
+        try:
+            for cell in self._pending_cells():
+                if not self._hold_if_paused() or time_limit_reached():
+                    break
+                # Short put timeout so a stop or the time limit is noticed while blocked
+                while not self.pipeline.put(cell, group=cell, timeout=0.1):
+                    if self.should_stop or time_limit_reached():
+                        break
+        finally:
+            self.pipeline.close()
+        
+        if self.should_stop:
+            print("\nStopping as requested...")
+        
+        return len(saved_leads)
+    
+    def _discover_category_leads(
+        self,
+        country: str,
+        city: str,
+        category: str,
+        cell: Optional[Tuple[int, int]] = None
+    ) -> List[dict]:
+        """
+        Discover and process leads for a category
+        
+        Args:
+            country: Country name
+            city: City name
+            category: Business category
+            cell: (category_idx, city_idx) of this cell in the run checkpoint; progress
+                  is recorded per business so an interrupted cell can be resumed
+        """
+        skip_place_ids = self.checkpoint.processed_place_ids(*cell) if cell else set()
+        cell_places = place_index.cell_places(self.run_id, cell)
+        metrics.set_labels(country=country, category=category)
+        
+        try:
             # Search for businesses
-            print(f"Searching Google Maps...")
+            log.info("Searching Google Maps...", run_id=self.run_id, city=city, category=category)
             
             # Try Places API first if key is available
             api_key = config.GOOGLE_MAPS_API_KEY
-            if api_key:
+            if api_key and config.DISCOVERY_ENGINE == "async":
+                # Requests run as coroutines on the shared event loop; this thread only waits
+                from async_maps_discoverer import AsyncMapsDiscoverer
+                discoverer = AsyncMapsDiscoverer(country, controller=self.controller)
+                businesses = discoverer.run(discoverer.search_with_places_api(
+                    category, city, api_key,
+                    max_results=config.MAX_RESULTS_PER_CATEGORY,
+                    skip_place_ids=skip_place_ids,
+                    cell_places=cell_places
+                ))
+            elif api_key:
+                discoverer = MapsDiscoverer(country, controller=self.controller)
                 businesses = discoverer.search_with_places_api(
                     category, city, api_key,
-                    max_results=config.MAX_RESULTS_PER_CATEGORY
+                    max_results=config.MAX_RESULTS_PER_CATEGORY,
+                    skip_place_ids=skip_place_ids,
+                    cell_places=cell_places
                 )
             else:
                 # Fallback to HTML scraping (less reliable)
-                print("Note: Using HTML scraping. Consider using Google Places API for better results.")
+                log.info("Note: Using HTML scraping. Consider using Google Places API for better results.")
+                discoverer = MapsDiscoverer(country, controller=self.controller)
                 businesses = discoverer.search_businesses(
                     category, city,
                     max_results=config.MAX_RESULTS_PER_CATEGORY
                 )
             
+            self._tally(
+                cell,
+                api_calls=discoverer.api_calls,
+                search_errors=discoverer.search_errors,
+                places_deduped=discoverer.places_deduped,
+                tiles_searched=discoverer.tiles_searched,
+                resumed=1 if skip_place_ids else 0
+            )
+            
             if not businesses:
                 return []
             
-            print(f"Found {len(businesses)} businesses, evaluating...")
+            log.info(f"Found {len(businesses)} businesses, evaluating...", run_id=self.run_id, city=city, category=category, businesses=len(businesses))
             
-            # Process each business into a lead
-            leads = []
-            for idx, business in enumerate(businesses, 1):
-                if self.should_stop:
-                    break
-                
-                print(f"  [{idx}/{len(businesses)}] Processing: {business.get('name', 'Unknown')}")
-                
-                lead = self._process_business_to_lead(business, country, city, category)
-                
-                if lead:
+            return self._store_businesses(businesses, country, city, category, cell)
+            
+        except RunCancelled:
+            return []
+        except Exception as e:
+            log.error(f"Error discovering leads for {category}: {e}", run_id=self.run_id, city=city, category=category)
+            self._tally(cell, search_errors=1)
+            return []
+    
+    def _store_businesses(
+        self,
+        businesses: List[dict],
+        country: str,
+        city: str,
+        category: str,
+        cell: Optional[Tuple[int, int]] = None
+    ) -> List[dict]:
+        """
+        Turn discovered businesses into leads and append the new ones to the sheet
+        
+        Returns:
+            Leads that were saved
+        """
+        metrics.set_labels(country=country, category=category)
+        
+        # Process each business into a lead
+        leads = []
+        for idx, business in enumerate(businesses, 1):
+            if not self._hold_if_paused():
+                break
+            
+            log.business(
+                "  [%d/%d] Processing: %s", idx, len(businesses), business.get("name", "Unknown"),
+                run_id=self.run_id, place_id=business.get("place_id")
+            )
+            
+            lead = self._process_business_to_lead(business, country, city, category)
+            success = False
+            
+            if lead:
+                # Duplicate check + append must be atomic when cells run concurrently
+                with self.sheets_manager.lock:
                     # Check for duplicates (pass country and city for spreadsheet lookup)
-                    is_duplicate = self.sheets_manager.check_duplicate(
-                        lead.get("phone"),
-                        lead.get("website"),
-                        country,
-                        city
-                    )
+                    with metrics.stage("duplicate_check"):
+                        is_duplicate = self.sheets_manager.check_duplicate(
+                            lead.get("phone"),
+                            lead.get("website"),
+                            country,
+                            city
+                        )
                     
-                    if not is_duplicate:
-                        # Append to sheet immediately (append-only)
-                        success = self.sheets_manager.append_lead(lead)
-                        if success:
-                            leads.append(lead)
-                            print(f"    ✓ Saved")
-                            # Call callback if provided (for UI updates)
-                            if self.lead_callback:
-                                try:
-                                    self.lead_callback(lead)
-                                except Exception as e:
-                                    print(f"      Warning: Callback error: {e}")
-                        else:
-                            print(f"    ✗ Failed to save")
-                    else:
-                        print(f"    ⊘ Duplicate (skipped)")
+                    # Append to sheet immediately (append-only)
+                    success = False if is_duplicate else self._append_lead(lead)
                 
-                # Human-like delay between businesses
-                if idx < len(businesses) and not self.should_stop:
-                    time.sleep(config.DEFAULT_DELAY_BETWEEN_REQUESTS)
-            
-            return leads
+                if not is_duplicate:
+                    if success:
+                        leads.append(lead)
+                        log.business("    ✓ Saved", run_id=self.run_id, place_id=business.get("place_id"))
+                        # Call callback if provided (for UI updates)
+                        if self.lead_callback:
+                            try:
+                                self.lead_callback(lead)
+                            except Exception as e:
+                                log.warning(f"      Warning: Callback error: {e}")
+                    else:
+                        log.business("    ✗ Failed to save", level=logging.WARNING, run_id=self.run_id, place_id=business.get("place_id"))
+                else:
+                    log.business("    ⊘ Duplicate (skipped)", run_id=self.run_id, place_id=business.get("place_id"))
+                    self._tally(cell, duplicates=1)
             
-        except Exception as e:
-            print(f"Error discovering leads for {category}: {e}")
-            return []
+            self._tally(cell, businesses=1, new_leads=1 if success else 0)
+            if cell:
+                self.checkpoint.record_business(*cell, business.get("place_id"), saved=success)
+        
+        return leads
+    
+    def _append_lead(self, lead: dict) -> bool:
+        """Append a lead to the sheet, timed as the sheets_append stage (caller holds the sheets lock)"""
+        with metrics.stage("sheets_append", country=lead.get("country"), category=lead.get("category")) as call:
+            success = self.sheets_manager.append_lead(lead)
+            if not success:
+                call.outcome = "error"
+        return success
     
     def _process_business_to_lead(
         self,
@@ -303,11 +1055,16 @@ class LeadDiscoveryApp:
             return lead
             
         except Exception as e:
-            print(f"      Error processing business: {e}")
+            log.warning(f"      Error processing business: {e}", place_id=business.get("place_id"))
             return None
     
     def stop(self):
-        """Stop the discovery process"""
+        """
+        Stop the discovery process
+        
+        In-flight sleeps, requests and browser sessions are interrupted; progress up
+        to the last processed business stays in the checkpoint for resume().
+        """
         if not self.is_running:
             print("No discovery process running.")
             return
@@ -316,15 +1073,68 @@ class LeadDiscoveryApp:
         self.should_stop = True
         self.is_running = False
     
+    def pause(self):
+        """Hold the run at its next request or business, keeping its position"""
+        if not self.is_running:
+            print("No discovery process running.")
+            return
+        
+        print("\nPausing discovery process...")
+        self.controller.pause()
+        if self.sharded:
+            self.sharded.pause()
+    
+    def unpause(self):
+        """Continue a paused run from where it was held"""
+        if not self.controller.paused:
+            return
+        
+        print("\nContinuing discovery process...")
+        self.controller.resume()
+        if self.sharded:
+            self.sharded.resume()
+    
+    def _hold_if_paused(self) -> bool:
+        """Block while the run is paused; returns False once it has been stopped"""
+        try:
+            self.controller.checkpoint()
+            return True
+        except RunCancelled:
+            return False
+    
     def get_status(self) -> dict:
         """Get current status"""
         return {
             "is_running": self.is_running,
+            "is_paused": self.controller.paused,
+            "parked_until": self.controller.parked_until,
             "run_id": self.run_id,
             "current_country": self.current_country,
             "current_city": self.current_city,
             "current_category": self.current_category,
+            "concurrency": self.concurrency,
+            "cells_completed": self.cells_completed,
+            "cells_total": self.cells_total,
+            "cells_skipped": self.cells_skipped,
+            "places_deduped": self.places_deduped,
+            "cells_per_minute": self._cells_per_minute(),
+            "scheduler": self.scheduler,
+            "pipeline": self.pipeline.stats() if self.pipeline else [],
+            "queue": self.job_queue.stats(self.run_id) if self.job_queue else {},
+            "shards": self.sharded.stats() if self.sharded else [],
         }
+    
+    def _cells_per_minute(self) -> float:
+        """Completed cells per minute over the current (or last) run"""
+        if not self.run_started_at:
+            return 0.0
+        
+        end_time = self.run_finished_at or time.time()
+        elapsed_minutes = (end_time - self.run_started_at) / 60
+        if elapsed_minutes <= 0:
+            return 0.0
+        # Only cells completed since this process (re)started the run
+        return round((self.cells_completed - self._cells_completed_at_start) / elapsed_minutes, 2)
 
 
 def interactive_mode():
@@ -336,6 +1146,7 @@ def interactive_mode():
     print("="*60)
     print("\nCommands:")
     print("  start <country> <city> [categories...]")
+    print("  resume <run_id>")
     print("  stop")
     print("  status")
     print("  countries")
@@ -363,6 +1174,12 @@ def interactive_mode():
             elif cmd == "stop":
                 app.stop()
             
+            elif cmd == "resume":
+                if len(parts) < 2:
+                    print("Usage: resume <run_id>")
+                    continue
+                app.resume(parts[1])
+            
             elif cmd == "status":
                 status = app.get_status()
                 print(f"\nStatus:")
@@ -428,5 +1245,9 @@ def interactive_mode():
 
 
 if __name__ == "__main__":
-    interactive_mode()
+    if len(sys.argv) == 3 and sys.argv[1] == "worker":
+        # Extra queue worker process for an existing run: python main.py worker <run_id>
+        LeadDiscoveryApp().run_queue_worker(sys.argv[2])
+    else:
+        interactive_mode()
 
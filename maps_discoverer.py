@@ -1,30 +1,143 @@
 """
 Google Maps business discovery module with country-aware search
 """
+import contextvars
+import math
 import time
 import re
-from typing import List, Dict, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Dict, Optional, Set, Tuple
 import requests
 from bs4 import BeautifulSoup
 from urllib.parse import quote, urlencode
 import config
+import http_client
 from countries import get_google_domain
+from concurrency import upstream_slot
+import metrics
+import quota_manager
+import rate_limiter
+import response_cache
+from structured_logging import get_logger
+from quota_manager import QuotaExhausted
+from place_index import CellPlaces
+import tiling
+from run_control import RunCancelled, RunController
 from website_analyzer import WebsiteAnalyzer
 
 
+log = get_logger("places")
+
+
+# Places API endpoints (Legacy)
+# Official endpoints:
+# https://maps.googleapis.com/maps/api/place/textsearch/json
+# https://maps.googleapis.com/maps/api/place/details/json
+# (config.PLACES_API_BASE_URL can point these at a stand-in server)
+PLACES_TEXT_SEARCH_URL = f"{config.PLACES_API_BASE_URL}/textsearch/json"
+PLACES_DETAILS_URL = f"{config.PLACES_API_BASE_URL}/details/json"
+PLACES_NEARBY_SEARCH_URL = f"{config.PLACES_API_BASE_URL}/nearbysearch/json"  # SEARCH_MODE="tiles"
+MAX_TEXT_SEARCH_PAGES = 3  # Text Search returns at most 60 results, 20 per page
+
+# Places API (New) Text Search (config.PLACES_PROVIDER = "new")
+# Official endpoint: POST https://places.googleapis.com/v1/places:searchText
+# The field mask asks for the contact fields too, so no Place Details calls are needed
+# (phone, website and rating bill the request as Text Search Enterprise)
+PLACES_NEW_TEXT_SEARCH_URL = f"{config.PLACES_NEW_API_BASE_URL}/places:searchText"
+PLACES_NEW_FIELD_MASK = ",".join([
+    "places.id",
+    "places.displayName",
+    "places.formattedAddress",
+    "places.rating",
+    "places.userRatingCount",
+    "places.types",
+    "places.businessStatus",
+    "places.nationalPhoneNumber",
+    "places.websiteUri",
+    "nextPageToken",
+])
+PLACES_NEW_SKU = "text_search_enterprise"
+
 class MapsDiscoverer:
     """Discovers businesses from Google Maps with country-aware search"""
     
-    def __init__(self, country: str):
+    def __init__(self, country: str, controller: Optional[RunController] = None):
+        """
+        Args:
+            country: Country name
+            controller: Run controller whose pause/stop should interrupt this
+                        discoverer's waits and requests (None = uninterruptible)
+        """
         self.country = country
+        self.controller = controller
         self.google_domain = get_google_domain(country)
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.9',
-        })
+        # Process-wide keep-alive session, shared with every other discoverer and analyzer
+        self.session = http_client.get_session()
         self.website_analyzer = WebsiteAnalyzer()
+        self.api_calls = 0  # Places API requests made by this instance (for yield stats)
+        self.search_errors = 0  # Text Searches that failed (as opposed to finding nothing)
+        self.places_deduped = 0  # Results dropped because another cell already found them
+        # Tiles searched by this instance, (country, city, category, tile, results, saturated);
+        # the caller records their coverage once the cell's businesses are stored
+        self.tiles_searched: List[Tuple[str, str, str, str, int, bool]] = []
+        self._api_calls_lock = threading.Lock()
+    
+    def _count_api_call(self):
+        with self._api_calls_lock:
+            self.api_calls += 1
+    
+    def _count_search_error(self):
+        with self._api_calls_lock:
+            self.search_errors += 1
+    
+    def _sleep(self, seconds: float):
+        """Sleep that a run stop interrupts (raises RunCancelled)"""
+        if self.controller:
+            self.controller.sleep(seconds)
+        else:
+            time.sleep(seconds)
+    
+    def _acquire(self, bucket: str):
+        """Wait for a rate-limit token; pause holds here and stop interrupts the wait"""
+        self._sleep(rate_limiter.get_bucket(bucket).reserve())
+    
+    def _use_quota(self, sku: str):
+        """Count a Places call against its budgets, waiting first when one is nearly used up"""
+        self._sleep(self._reserve_quota(sku))
+    
+    def _reserve_quota(self, sku: str) -> float:
+        """
+        Count a Places call against its budgets (config.PLACES_BUDGETS)
+        
+        Returns:
+            Seconds to wait before making the call
+        
+        Raises:
+            QuotaExhausted: A budget is used up; the run has been parked
+        """
+        try:
+            return quota_manager.get_quota_manager().acquire(sku)
+        except QuotaExhausted as e:
+            raise self._quota_exhausted(e)
+    
+    def _quota_exhausted(self, error: QuotaExhausted) -> QuotaExhausted:
+        """Park the run until the budget's window resets; returns the error to raise"""
+        if self.controller:
+            self.controller.park(error.resets_at)
+        return error
+    
+    def _http_get(self, session: requests.Session, url: str, **kwargs) -> requests.Response:
+        """session.get() that a run stop abandons immediately (raises RunCancelled)"""
+        if self.controller:
+            return self.controller.call(session.get, url, **kwargs)
+        return session.get(url, **kwargs)
+    
+    def _http_post(self, session: requests.Session, url: str, **kwargs) -> requests.Response:
+        """session.post() that a run stop abandons immediately (raises RunCancelled)"""
+        if self.controller:
+            return self.controller.call(session.post, url, **kwargs)
+        return session.post(url, **kwargs)
     
     def should_exclude(self, business_name: str, website: Optional[str] = None) -> bool:
         """Check if business should be excluded based on name/website"""
@@ -114,13 +227,16 @@ class MapsDiscoverer:
             # Initialize driver
             service = Service(ChromeDriverManager().install())
             driver = webdriver.Chrome(service=service, options=chrome_options)
+            if self.controller:
+                # stop() quits the browser, which unblocks whatever call is in progress
+                self.controller.register_driver(driver)
             driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
             
             # Navigate to search
             driver.get(search_url)
             
             # Wait for results to load
-            time.sleep(5)  # Give maps time to load
+            self._sleep(5)  # Give maps time to load
             
             # Extract business listings
             # Google Maps class names change frequently, this is a general approach
@@ -138,7 +254,7 @@ class MapsDiscoverer:
                         
                         # Click to get details (phone, address, website)
                         element.click()
-                        time.sleep(2)
+                        self._sleep(2)
                         
                         # Extract details from side panel
                         try:
@@ -174,13 +290,21 @@ class MapsDiscoverer:
                         
                         # Go back to results
                         driver.back()
-                        time.sleep(1)
+                        self._sleep(1)
                         
+                    except RunCancelled:
+                        raise
                     except Exception as e:
+                        if self.controller and self.controller.stopped:
+                            raise RunCancelled()
                         print(f"  Error extracting business details: {e}")
                         continue
                 
+            except RunCancelled:
+                raise
             except Exception as e:
+                if self.controller and self.controller.stopped:
+                    raise RunCancelled()
                 print(f"Error finding business elements: {e}")
             
             # Filter excluded businesses
@@ -194,172 +318,775 @@ class MapsDiscoverer:
             
             return filtered_businesses
             
+        except RunCancelled:
+            return []
         except Exception as e:
+            if self.controller and self.controller.stopped:
+                return []
             print(f"Error with Selenium search: {e}")
             return []
         finally:
             if driver:
-                driver.quit()
+                if self.controller:
+                    self.controller.unregister_driver(driver)
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
     
     def search_with_places_api(
         self,
         category: str,
         city: str,
         api_key: str,
-        max_results: int = 20
+        max_results: int = 20,
+        skip_place_ids: Optional[Set[str]] = None,
+        cell_places: Optional[CellPlaces] = None
     ) -> List[Dict]:
         """
-        Search using Google Places API Text Search (Legacy)
+        Search using Google Places API Text Search (Legacy, or New per config.PLACES_PROVIDER)
         
         Official API Documentation:
         https://developers.google.com/maps/documentation/places/web-service/legacy/search-text
+        https://developers.google.com/maps/documentation/places/web-service/text-search
+        
+        Pages are processed as they arrive: Place Details for one page are
+        fetched concurrently (up to config.DETAILS_CONCURRENCY at a time) while
+        the next page's token waits out its activation delay.
+        With the New API the search response already carries phone and
+        website, and only the email lookups remain.
         
         Args:
             category: Business category
             city: City name
             api_key: Google Places API key
             max_results: Maximum results (max 60, 20 per page)
-            
+            skip_place_ids: place_ids to drop before any Place Details call
+                            (e.g. already handled before a run was interrupted)
+            cell_places: Run-wide place_id index of the searching cell; places
+                         other cells already found are dropped (see place_index.py)
+        
         Returns:
             List of business dictionaries with fields:
             - name, address, rating, review_count, types, business_status, place_id
-            - phone, website, email (from Place Details API if available)
+            - phone, website, email (from Place Details API or the search response if available)
+        """
+        businesses = []
+        idx = 0
+        pages = self.iter_text_search_pages(
+            category, city, api_key,
+            max_results=max_results,
+            skip_place_ids=skip_place_ids,
+            cell_places=cell_places
+        )
+        executor = ThreadPoolExecutor(
+            max_workers=max(1, config.DETAILS_CONCURRENCY),
+            thread_name_prefix="DetailsWorker"
+        )
+        try:
+            for page in pages:
+                # Get additional details (phone, website) for the whole page at once; the
+                # place_details rate limit and the places upstream slots still pace them.
+                # Each lookup runs in a copy of this context so its metrics keep the cell's labels
+                lookups = [
+                    executor.submit(contextvars.copy_context().run, self._contact_details, business, api_key)
+                    for business in page
+                ]
+                # Results are taken in page order, so output order is unchanged
+                for business, lookup in zip(page, lookups):
+                    if self.controller and self.controller.stopped:
+                        break
+                    idx += 1
+                    try:
+                        # This is optional - we can still use the business without these
+                        details = lookup.result()
+                        self.apply_details(business, details)
+                        
+                        businesses.append(business)
+                        log.business(
+                            "      [%d] ✓ %s (Rating: %s, Reviews: %s)",
+                            idx, business["name"], business.get("rating", "N/A"), business.get("review_count", 0),
+                            place_id=business.get("place_id"), category=category, city=city
+                        )
+                    
+                    except RunCancelled:
+                        # Stopped or parked: the place is looked up again on resume
+                        continue
+                    except Exception as e:
+                        # A failed lookup only loses this place
+                        log.warning(f"      [{idx}] Error processing place: {e}", exc_info=True, place_id=business.get("place_id"))
+                        continue
+                if self.controller and self.controller.stopped:
+                    pages.close()
+                    break
+        finally:
+            # Lookups not started yet are dropped; running ones end with the run's stop
+            executor.shutdown(wait=True, cancel_futures=True)
+        
+        if idx:
+            log.info(f"      Successfully processed {len(businesses)} businesses", category=category, city=city, businesses=len(businesses))
+        return businesses
+    
+    def text_search(
+        self,
+        category: str,
+        city: str,
+        api_key: str,
+        max_results: int = 20,
+        skip_place_ids: Optional[Set[str]] = None,
+        cell_places: Optional[CellPlaces] = None
+    ) -> List[Dict]:
+        """
+        Run only the Text Search step (no Place Details or email lookups)
+        
+        Args:
+            category: Business category
+            city: City name
+            api_key: Google Places API key
+            max_results: Maximum results (max 60, 20 per page)
+            skip_place_ids: place_ids to leave out of the results
+            cell_places: Run-wide place_id index of the searching cell
+        
+        Returns:
+            List of business dictionaries without phone, website and email
+        """
+        return [
+            business
+            for page in self.iter_text_search_pages(category, city, api_key, max_results, skip_place_ids, cell_places)
+            for business in page
+        ]
+    
+    def iter_text_search_pages(
+        self,
+        category: str,
+        city: str,
+        api_key: str,
+        max_results: int = 20,
+        skip_place_ids: Optional[Set[str]] = None,
+        cell_places: Optional[CellPlaces] = None
+    ) -> Iterator[List[Dict]]:
+        """
+        Run Text Search page by page, following next_page_token (up to 3 pages of 20)
+        
+        A next_page_token only becomes valid a short time after it is issued
+        (config.PLACES_NEXT_PAGE_DELAY). The next page is requested when the
+        caller asks for it, waiting only for what is left of that delay, so
+        work done on a page in between (e.g. its Place Details) hides the wait.
+        
+        With config.PLACES_PROVIDER = "new" the Places API (New) is searched
+        instead; its page tokens are valid at once, and its results already
+        carry phone and website (see has_contact_details).
+        
+        A search that ran recently (in any run or process) is replayed from
+        the text_search response cache, all pages at once and without calls.
+        With config.SEARCH_MODE = "tiles" the city is searched tile by tile
+        instead (see iter_tile_search_pages).
+        
+        Args:
+            category: Business category
+            city: City name
+            api_key: Google Places API key
+            max_results: Maximum results over all pages
+            skip_place_ids: place_ids to leave out of the results
+            cell_places: Run-wide place_id index of the searching cell; places
+                         other cells already found are left out
+        
+        Yields:
+            Businesses of each page, without phone, website and email (Legacy).
+            A failed later page ends the search; earlier pages have already
+            been yielded.
         """
         if not api_key:
-            print("Error: Google Places API key not provided")
-            return []
+            log.error("Error: Google Places API key not provided")
+            return
+        if config.SEARCH_MODE == "tiles":
+            yield from self.iter_tile_search_pages(category, city, api_key, skip_place_ids=skip_place_ids, cell_places=cell_places)
+            return
         
-        businesses = []
+        try:
+            query, params = self._text_search_params(category, city, api_key)
+            new_api = config.PLACES_PROVIDER == "new"
+            cache_key = self._text_search_cache_key(query, params)
+            cached_pages = self._cached_text_search(cache_key, query, max_results)
+            fetched_pages = []
+            next_page_token = None
+            position = 0
+            for page in range(1, MAX_TEXT_SEARCH_PAGES + 1):
+                if cached_pages is not None:
+                    # A cached page's token has expired; later pages come from the cache too
+                    if page > len(cached_pages):
+                        return
+                    data = cached_pages[page - 1]
+                elif new_api:
+                    data = self._request_places_new_page(query, api_key, next_page_token, category, page)
+                else:
+                    data = self._request_text_search_page(params, query, category, page)
+                fetched_pages.append(data)
+                
+                if new_api:
+                    results = [self._legacy_place(place) for place in self._parse_places_new_response(data, query)]
+                    next_page_token = data.get("nextPageToken") if results else None
+                    token_delay = 0.0
+                else:
+                    results = self._parse_text_search_response(data, query)
+                    next_page_token = data.get("next_page_token") if results else None
+                    token_delay = config.PLACES_NEXT_PAGE_DELAY if cached_pages is None else 0.0
+                
+                # Process each place result (max_results limit over all pages)
+                businesses = []
+                for place in results[:max_results - position]:
+                    position += 1
+                    business = self._build_business(place, position, skip_place_ids, cell_places)
+                    if business:
+                        businesses.append(business)
+                
+                if cached_pages is None and (not next_page_token or position >= max_results):
+                    self._store_text_search(cache_key, fetched_pages, position, complete=not next_page_token)
+                
+                token_ready_at = time.monotonic() + token_delay
+                yield businesses
+                
+                if not next_page_token or position >= max_results:
+                    return
+                # Per the docs, a Legacy page request carries only the token (and key)
+                params = {"pagetoken": next_page_token, "key": api_key}
+                self._sleep(max(0.0, token_ready_at - time.monotonic()))
         
+        except RunCancelled:
+            return
+        except requests.exceptions.RequestException as e:
+            log.error(f"      Network error in Places API: {e}", category=category, city=city)
+            self._count_search_error()
+        except Exception as e:
+            log.error(f"      Unexpected error in Places API: {e}", exc_info=True, category=category, city=city)
+            self._count_search_error()
+    
+    def iter_tile_search_pages(
+        self,
+        category: str,
+        city: str,
+        api_key: str,
+        max_results: Optional[int] = None,
+        skip_place_ids: Optional[Set[str]] = None,
+        cell_places: Optional[CellPlaces] = None
+    ) -> Iterator[List[Dict]]:
+        """
+        Search a city tile by tile with Nearby Search, past the 60-result cap
+        
+        The city's viewport (geocoded once, then cached) is the first tile. A
+        tile too big for one search, or whose search came back full
+        (config.TILING_RESULT_CAP), is split into quadrants, down to
+        config.TILING_MAX_DEPTH. Tiles searched recently that weren't full are
+        skipped (see tiling.py), so repeat runs only revisit dense or stale tiles.
+        
+        Searched tiles are collected in self.tiles_searched rather than recorded
+        here: a tile only counts as covered once the cell's businesses are
+        stored, so a run stopped before that searches it again on resume.
+        
+        Args:
+            category: Business category (the search keyword)
+            city: City name
+            api_key: Google Places API key
+            max_results: Maximum results over all tiles (default: config.TILING_MAX_RESULTS)
+            skip_place_ids: place_ids to leave out of the results
+            cell_places: Run-wide place_id index of the searching cell
+        
+        Yields:
+            Businesses of each page, without phone, website and email. Places
+            found by several tiles are yielded once. A failed tile is skipped.
+        """
+        max_results = max_results or config.TILING_MAX_RESULTS
         try:
-            # Build search query per official docs
-            # Format: "business type in city, country"
-            query = f"{category} in {city}, {self.country}"
-            
-            # Text Search API endpoint (Legacy)
-            # Official endpoint: https://maps.googleapis.com/maps/api/place/textsearch/json
-            search_url = "https://maps.googleapis.com/maps/api/place/textsearch/json"
+            viewport = self._geocode_viewport(city, api_key)
+        except RunCancelled:
+            return
+        if not viewport:
+            log.warning(f"      Could not geocode {city}, {self.country}; no tiles to search", city=city)
+            self._count_search_error()
+            return
+        
+        coverage = tiling.get_tile_coverage()
+        seen_place_ids: Set[str] = set()
+        position = 0
+        tiles = [(viewport, 0)]  # Depth-first, quadrants in order
+        while tiles and position < max_results:
+            tile, depth = tiles.pop()
+            key = tiling.tile_key(tile, depth)
+            can_split = depth < config.TILING_MAX_DEPTH
+            radius = tiling.tile_radius_m(tile)
+            covered = coverage.get(self.country, city, category, key)
             
-            # Required parameters per official docs:
-            # - query: The text string on which to search
-            # - key: Your API key
-            # Optional: type, location, radius, language, etc.
-            params = {
-                "query": query,
-                "key": api_key,
-            }
+            if can_split and (radius > tiling.NEARBY_MAX_RADIUS_M or (covered and covered["saturated"])):
+                # Too big for one search, or known to be full: go straight to the quadrants
+                tiles.extend((quadrant, depth + 1) for quadrant in reversed(tiling.split_tile(tile)))
+                continue
+            if covered:
+                log.info(f"      Tile {key} searched recently ({covered['results']} results), skipping", tile=key)
+                continue
             
-            # Make request
-            print(f"      API Request: {query}")
-            response = self.session.get(search_url, params=params, timeout=15)
-            response.raise_for_status()
-            data = response.json()
+            results = 0
+            complete = False
+            pages = self._iter_nearby_pages(tile, min(radius, tiling.NEARBY_MAX_RADIUS_M), category, api_key)
+            try:
+                for places in pages:
+                    results += len(places)
+                    businesses = []
+                    for place in places[:max_results - position]:
+                        place_id = place.get("place_id")
+                        if place_id in seen_place_ids:
+                            continue
+                        seen_place_ids.add(place_id)
+                        position += 1
+                        # Nearby Search has a short vicinity instead of the formatted address
+                        place.setdefault("formatted_address", place.get("vicinity", ""))
+                        business = self._build_business(place, position, skip_place_ids, cell_places)
+                        if business:
+                            businesses.append(business)
+                    yield businesses
+                    if position >= max_results:
+                        break
+                else:
+                    complete = True
+            except RunCancelled:
+                return
+            except requests.exceptions.RequestException as e:
+                log.error(f"      Network error in Places API: {e}", category=category, city=city, tile=key)
+                self._count_search_error()
+            except Exception as e:
+                log.error(f"      Unexpected error in Places API: {e}", exc_info=True, category=category, city=city, tile=key)
+                self._count_search_error()
+            finally:
+                pages.close()
             
-            # Check response status per official docs
+            if not complete:
+                continue  # A failed or cut-short tile stays uncovered
+            saturated = results >= config.TILING_RESULT_CAP
+            self.tiles_searched.append((self.country, city, category, key, results, saturated))
+            if saturated and can_split:
+                tiles.extend((quadrant, depth + 1) for quadrant in reversed(tiling.split_tile(tile)))
+    
+    def _iter_nearby_pages(self, tile: tiling.Tile, radius: float, category: str, api_key: str) -> Iterator[List[Dict]]:
+        """
+        Nearby Search one tile, page by page (raw results)
+        
+        Like iter_text_search_pages, the next page is requested when the
+        caller asks for it, waiting only for what is left of the token delay.
+        """
+        lat, lng = tiling.tile_center(tile)
+        label = f"{category} near {lat:.4f},{lng:.4f} ({radius / 1000:.1f} km)"
+        # Parameters per official docs: location, radius, keyword, key
+        params = {"location": f"{lat},{lng}", "radius": int(math.ceil(radius)), "keyword": category, "key": api_key}
+        for page in range(1, MAX_TEXT_SEARCH_PAGES + 1):
+            data = self._request_text_search_page(
+                params, label, category, page,
+                url=PLACES_NEARBY_SEARCH_URL,
+                sku="nearby_search"
+            )
             status = data.get("status")
-            if status != "OK":
-                error_msg = data.get("error_message", "Unknown error")
-                print(f"      Places API Text Search error: {status}")
-                if error_msg:
-                    print(f"      Error message: {error_msg}")
-                
-                # Handle specific error codes per official docs
-                if status == "ZERO_RESULTS":
-                    print(f"      No results found for query: {query}")
-                elif status == "INVALID_REQUEST":
-                    print(f"      Invalid request - check query format")
-                elif status == "OVER_QUERY_LIMIT":
-                    print(f"      Over query limit - check billing/quota")
-                elif status == "REQUEST_DENIED":
-                    print(f"      Request denied - check API key and permissions")
-                
-                return []
+            if status not in ("OK", "ZERO_RESULTS", "OVER_QUERY_LIMIT"):
+                # Not an empty tile: fail it so it stays uncovered
+                raise requests.exceptions.RequestException(f"Nearby Search {status}: {data.get('error_message', '')}")
+            results = self._parse_text_search_response(data, label)
             
-            # Extract results array per official docs
-            # Response format: { "html_attributions": [], "results": [...], "status": "OK" }
-            results = data.get("results", [])
+            next_page_token = data.get("next_page_token") if results else None
+            token_ready_at = time.monotonic() + config.PLACES_NEXT_PAGE_DELAY
+            yield results
             
-            if not results:
-                print(f"      No results in response")
-                return []
+            if not next_page_token:
+                return
+            params = {"pagetoken": next_page_token, "key": api_key}
+            self._sleep(max(0.0, token_ready_at - time.monotonic()))
+    
+    def _geocode_viewport(self, city: str, api_key: str) -> Optional[tiling.Tile]:
+        """
+        Viewport of a city from the Geocoding API (cached; None if not found)
+        
+        Official API Documentation:
+        https://developers.google.com/maps/documentation/geocoding/requests-geocoding
+        """
+        address = f"{city}, {self.country}"
+        cache = response_cache.get_cache("geocode")
+        cache_key = " ".join(address.lower().split())
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return tuple(cached)
+        
+        try:
+            with metrics.stage("geocode", country=self.country):
+                self._use_quota("geocoding")
+                self._acquire("places_text_search")
+                self._count_api_call()
+                with upstream_slot("places"):
+                    response = self._http_get(
+                        self.session,
+                        config.GEOCODING_API_URL,
+                        params={"address": address, "key": api_key},
+                        timeout=15
+                    )
+                response.raise_for_status()
+                data = response.json()
+        except RunCancelled:
+            raise
+        except Exception as e:
+            log.error(f"      Geocoding error for {address}: {e}", city=city)
+            return None
+        
+        if data.get("status") != "OK" or not data.get("results"):
+            log.warning(f"      Geocoding {address}: {data.get('status')}", city=city, status=data.get("status"))
+            return None
+        # Response format: { "results": [ { "geometry": { "viewport": { "northeast": {...}, "southwest": {...} } } } ] }
+        viewport = data["results"][0]["geometry"]["viewport"]
+        tile = (
+            viewport["southwest"]["lat"], viewport["southwest"]["lng"],
+            viewport["northeast"]["lat"], viewport["northeast"]["lng"],
+        )
+        cache.put(cache_key, list(tile))
+        return tile
+    
+    def _text_search_cache_key(self, query: str, params: Dict) -> str:
+        """
+        Cache key of a search: what its requests send, without the API key
+        
+        The provider, the normalised query, any further request parameters
+        and, for Places API (New), the field mask (it decides what a cached
+        response holds).
+        """
+        normalised = " ".join(query.lower().split())
+        parts = [config.PLACES_PROVIDER, normalised]
+        parts += [f"{name}={value}" for name, value in sorted(params.items()) if name not in ("query", "key")]
+        if config.PLACES_PROVIDER == "new":
+            parts.append(PLACES_NEW_FIELD_MASK)
+        return "|".join(parts)
+    
+    def _cached_text_search(self, cache_key: str, query: str, max_results: int) -> Optional[List[Dict]]:
+        """
+        Raw pages of a recent identical search, if they cover max_results
+        
+        Returns:
+            Decoded page responses in order, or None to search live
+        """
+        cached = response_cache.get_cache("text_search").get(cache_key)
+        if cached is None or not (cached["complete"] or cached["results"] >= max_results):
+            return None
+        log.info(f"      Text Search from cache: {query} ({len(cached['pages'])} pages)", query=query, cached=True)
+        return cached["pages"]
+    
+    def _store_text_search(self, cache_key: str, pages: List[Dict], results: int, complete: bool):
+        """
+        Cache the raw pages of a finished search
+        
+        Args:
+            pages: Decoded page responses in order
+            results: Results the pages held up to the search's max_results
+            complete: Whether the last page had no next page token (all results are cached)
+        """
+        # Only answers are cached: errors (and quota responses) must be retried
+        for data in pages:
+            if "error" in data or data.get("status", "OK") not in ("OK", "ZERO_RESULTS"):
+                return
+        response_cache.get_cache("text_search").put(
+            cache_key,
+            {"pages": pages, "results": results, "complete": complete}
+        )
+    
+    def _request_text_search_page(
+        self,
+        params: Dict,
+        query: str,
+        category: str,
+        page: int,
+        url: Optional[str] = None,
+        sku: str = "text_search"
+    ) -> Dict:
+        """
+        Request one Text Search (or Nearby Search: url, sku) page and decode it
+        
+        A token used a moment too early is answered with INVALID_REQUEST; later
+        pages are retried a few times (config.PLACES_NEXT_PAGE_RETRIES).
+        """
+        url = url or PLACES_TEXT_SEARCH_URL
+        for attempt in range(config.PLACES_NEXT_PAGE_RETRIES + 1):
+            log.info(f"      API Request: {query}{f' (page {page})' if page > 1 else ''}", query=query, page=page)
+            with metrics.stage("text_search", country=self.country, category=category):
+                self._use_quota(sku)
+                self._acquire("places_text_search")
+                self._count_api_call()
+                with upstream_slot("places"):
+                    response = self._http_get(self.session, url, params=params, timeout=15)
+                response.raise_for_status()
+                data = response.json()
             
-            print(f"      Found {len(results)} results from API")
+            if page == 1 or data.get("status") != "INVALID_REQUEST" or attempt == config.PLACES_NEXT_PAGE_RETRIES:
+                return data
+            self._sleep(config.PLACES_NEXT_PAGE_DELAY / 2)
+    
+    def _request_places_new_page(
+        self,
+        query: str,
+        api_key: str,
+        page_token: Optional[str],
+        category: str,
+        page: int
+    ) -> Dict:
+        """Request one Places API (New) Text Search page and decode it"""
+        log.info(f"      API Request: {query}{f' (page {page})' if page > 1 else ''}", query=query, page=page)
+        with metrics.stage("text_search", country=self.country, category=category):
+            self._use_quota(PLACES_NEW_SKU)
+            self._acquire("places_text_search")
+            self._count_api_call()
+            with upstream_slot("places"):
+                response = self._http_post(
+                    self.session,
+                    PLACES_NEW_TEXT_SEARCH_URL,
+                    json=self._places_new_body(query, page_token),
+                    headers=self._places_new_headers(api_key),
+                    timeout=15
+                )
+            # Client errors come back as a JSON error object (see _parse_places_new_response)
+            if response.status_code >= 500:
+                response.raise_for_status()
+            return response.json()
+    
+    def _text_search_params(self, category: str, city: str, api_key: str) -> Tuple[str, Dict]:
+        """Build the Text Search query string and request parameters"""
+        # Build search query per official docs
+        # Format: "business type in city, country"
+        query = f"{category} in {city}, {self.country}"
+        
+        # Required parameters per official docs:
+        # - query: The text string on which to search
+        # - key: Your API key
+        # Optional: type, location, radius, language, etc.
+        params = {
+            "query": query,
+            "key": api_key,
+        }
+        return query, params
+    
+    def _parse_text_search_response(self, data: Dict, query: str) -> List[Dict]:
+        """
+        Validate a Text Search response and return its results array
+        
+        Args:
+            data: Decoded JSON response
+            query: Query string (for error messages)
             
-            # Process each place result (max_results limit)
-            for idx, place in enumerate(results[:max_results], 1):
-                try:
-                    # Extract place_id (required for Place Details)
-                    place_id = place.get("place_id")
-                    if not place_id:
-                        print(f"      [{idx}] Skipping: No place_id")
-                        continue
-                    
-                    # Extract data from Text Search response per official docs
-                    # Text Search returns: name, formatted_address, rating, user_ratings_total,
-                    # place_id, business_status, types, geometry, etc.
-                    business_name = place.get("name", "").strip()
-                    if not business_name:
-                        print(f"      [{idx}] Skipping: No name")
-                        continue
-                    
-                    # Check if should exclude
-                    if self.should_exclude(business_name):
-                        print(f"      [{idx}] Excluded: {business_name}")
-                        continue
-                    
-                    # Build business dict from Text Search data
-                    business = {
-                        "name": business_name,
-                        "address": place.get("formatted_address", "").strip(),
-                        "rating": place.get("rating"),  # Optional: 1.0 to 5.0
-                        "review_count": place.get("user_ratings_total", 0),  # Optional: total reviews
-                        "types": place.get("types", []),  # Array of place types
-                        "business_status": place.get("business_status", "OPERATIONAL"),  # OPERATIONAL, CLOSED_TEMPORARILY, CLOSED_PERMANENTLY
-                        "place_id": place_id,
-                    }
-                    
-                    # Get additional details (phone, website) from Place Details API
-                    # This is optional - we can still use the business without these
-                    details = self._get_place_details(place_id, api_key)
-                    if details:
-                        business["phone"] = details.get("phone", "")
-                        business["website"] = details.get("website", "")
-                        business["email"] = details.get("email", "")
-                    else:
-                        # No details available - still use the business
-                        business["phone"] = ""
-                        business["website"] = ""
-                        business["email"] = ""
-                    
-                    businesses.append(business)
-                    print(f"      [{idx}] ✓ {business_name} (Rating: {business.get('rating', 'N/A')}, Reviews: {business.get('review_count', 0)})")
-                    
-                    # Rate limiting between requests
-                    if idx < len(results[:max_results]):
-                        time.sleep(config.DEFAULT_DELAY_BETWEEN_REQUESTS)
-                    
-                except Exception as e:
-                    print(f"      [{idx}] Error processing place: {e}")
-                    import traceback
-                    traceback.print_exc()
-                    continue
+        Returns:
+            List of raw place results (empty on error or no results)
+        
+        Raises:
+            QuotaExhausted: Google answered OVER_QUERY_LIMIT (the run has been parked)
+        """
+        # Check response status per official docs
+        status = data.get("status")
+        if status != "OK":
+            error_msg = data.get("error_message", "Unknown error")
             
-            print(f"      Successfully processed {len(businesses)} businesses")
-            return businesses
+            # Handle specific error codes per official docs
+            if status == "ZERO_RESULTS":
+                log.info(f"      No results found for query: {query}", query=query, status=status)
+            elif status == "OVER_QUERY_LIMIT":
+                # Not an empty cell: park the run so the cell is searched again later
+                raise self._quota_exhausted(quota_manager.get_quota_manager().over_query_limit("text_search"))
+            else:
+                hint = {
+                    "INVALID_REQUEST": "Invalid request - check query format",
+                    "REQUEST_DENIED": "Request denied - check API key and permissions",
+                }.get(status, "")
+                log.warning(
+                    f"      Places API Text Search error: {status} ({error_msg}){' - ' + hint if hint else ''}",
+                    query=query, status=status, error_message=error_msg
+                )
             
-        except requests.exceptions.RequestException as e:
-            print(f"      Network error in Places API: {e}")
+            if status != "ZERO_RESULTS":
+                self._count_search_error()
             return []
-        except Exception as e:
-            print(f"      Unexpected error in Places API: {e}")
-            import traceback
-            traceback.print_exc()
+        
+        # Extract results array per official docs
+        # Response format: { "html_attributions": [], "results": [...], "status": "OK" }
+        results = data.get("results", [])
+        
+        if not results:
+            log.info(f"      No results in response", query=query)
             return []
+        
+        log.info(f"      Found {len(results)} results from API", query=query, results=len(results))
+        return results
+    
+    def _places_new_body(self, query: str, page_token: Optional[str] = None) -> Dict:
+        """Build a Places API (New) Text Search request body"""
+        # A page token is only valid with the same textQuery and pageSize
+        body = {"textQuery": query, "pageSize": 20}
+        if page_token:
+            body["pageToken"] = page_token
+        return body
+    
+    def _places_new_headers(self, api_key: str) -> Dict:
+        """Places API (New) request headers: the key and the field mask (required)"""
+        return {
+            "X-Goog-Api-Key": api_key,
+            "X-Goog-FieldMask": PLACES_NEW_FIELD_MASK,
+        }
+    
+    def _parse_places_new_response(self, data: Dict, query: str) -> List[Dict]:
+        """
+        Validate a Places API (New) Text Search response and return its places
+        
+        Args:
+            data: Decoded JSON response
+            query: Query string (for error messages)
+        
+        Returns:
+            List of raw places (empty on error or no results)
+        
+        Raises:
+            QuotaExhausted: Google answered RESOURCE_EXHAUSTED (the run has been parked)
+        """
+        # Errors per official docs: { "error": { "code": 403, "message": "...", "status": "PERMISSION_DENIED" } }
+        error = data.get("error")
+        if error:
+            status = error.get("status", "UNKNOWN")
+            if status == "RESOURCE_EXHAUSTED":
+                # Not an empty cell: park the run so the cell is searched again later
+                raise self._quota_exhausted(quota_manager.get_quota_manager().over_query_limit(PLACES_NEW_SKU))
+            log.warning(
+                f"      Places API (New) Text Search error: {status} ({error.get('message', 'Unknown error')})",
+                query=query, status=status, error_message=error.get("message")
+            )
+            self._count_search_error()
+            return []
+        
+        # No matches is an empty response body: {}
+        places = data.get("places", [])
+        if not places:
+            log.info(f"      No results found for query: {query}", query=query, status="ZERO_RESULTS")
+            return []
+        
+        log.info(f"      Found {len(places)} results from API", query=query, results=len(places))
+        return places
+    
+    @staticmethod
+    def _legacy_place(place: Dict) -> Dict:
+        """Map a Places API (New) place onto Text Search (Legacy) field names"""
+        return {
+            "place_id": place.get("id"),
+            "name": place.get("displayName", {}).get("text", ""),
+            "formatted_address": place.get("formattedAddress", ""),
+            "rating": place.get("rating"),
+            "user_ratings_total": place.get("userRatingCount", 0),
+            "types": place.get("types", []),
+            "business_status": place.get("businessStatus", "OPERATIONAL"),
+            # Contact fields Legacy only has in Place Details
+            "formatted_phone_number": place.get("nationalPhoneNumber", ""),
+            "website": place.get("websiteUri", ""),
+        }
+    
+    def _build_business(
+        self,
+        place: Dict,
+        idx: int,
+        skip_place_ids: Optional[Set[str]] = None,
+        cell_places: Optional[CellPlaces] = None
+    ) -> Optional[Dict]:
+        """
+        Build a business dict from a Text Search result
+        
+        Args:
+            place: Raw place result
+            idx: Position in the result list (for log lines)
+            skip_place_ids: place_ids to skip
+            cell_places: Run-wide place_id index (places claimed by other cells are skipped)
+            
+        Returns:
+            Business dict, or None if the place is skipped. Contact details
+            are included only when the result carries them (Places API (New))
+        """
+        # Extract place_id (required for Place Details)
+        place_id = place.get("place_id")
+        if not place_id:
+            log.business("      [%d] Skipping: No place_id", idx)
+            return None
+        if skip_place_ids and place_id in skip_place_ids:
+            log.business("      [%d] Skipping: Already processed", idx, place_id=place_id)
+            return None
+        
+        # Extract data from Text Search response per official docs
+        # Text Search returns: name, formatted_address, rating, user_ratings_total,
+        # place_id, business_status, types, geometry, etc.
+        business_name = place.get("name", "").strip()
+        if not business_name:
+            log.business("      [%d] Skipping: No name", idx, place_id=place_id)
+            return None
+        
+        # Check if should exclude
+        if self.should_exclude(business_name):
+            log.business("      [%d] Excluded: %s", idx, business_name, place_id=place_id)
+            return None
+        
+        # Found by another cell of the run (overlapping category or city): drop it
+        # before its Place Details call and website fetch
+        if cell_places and not cell_places.claim(place_id):
+            log.business("      [%d] Skipping: Already found in this run", idx, place_id=place_id)
+            with self._api_calls_lock:
+                self.places_deduped += 1
+            return None
+        
+        # Build business dict from Text Search data
+        business = {
+            "name": business_name,
+            "address": place.get("formatted_address", "").strip(),
+            "rating": place.get("rating"),  # Optional: 1.0 to 5.0
+            "review_count": place.get("user_ratings_total", 0),  # Optional: total reviews
+            "types": place.get("types", []),  # Array of place types
+            "business_status": place.get("business_status", "OPERATIONAL"),  # OPERATIONAL, CLOSED_TEMPORARILY, CLOSED_PERMANENTLY
+            "place_id": place_id,
+        }
+        if "formatted_phone_number" in place:
+            business["phone"] = (place["formatted_phone_number"] or "").strip()
+            business["website"] = (place.get("website") or "").strip()
+            business["email"] = ""  # Still scraped from the website
+        return business
+    
+    @staticmethod
+    def has_contact_details(business: Dict) -> bool:
+        """Whether a business already has phone and website, so Place Details can be skipped"""
+        return "phone" in business
+    
+    def _contact_details(self, business: Dict, api_key: str) -> Optional[Dict]:
+        """
+        Phone, website and email for a business
+        
+        Taken from the search result when it carried them (Places API (New)),
+        otherwise from Place Details; the email is scraped from the website.
+        """
+        if not self.has_contact_details(business):
+            return self._get_place_details(business["place_id"], api_key)
+        website = business["website"]
+        return {
+            "phone": business["phone"],
+            "website": website,
+            "email": self.fetch_email(website) if website else "",
+        }
+    
+    def apply_details(self, business: Dict, details: Optional[Dict]):
+        """Copy phone/website/email from Place Details onto a business dict"""
+        if details:
+            business["phone"] = details.get("phone", "")
+            business["website"] = details.get("website", "")
+            business["email"] = details.get("email", "")
+        else:
+            # No details available - still use the business
+            business["phone"] = ""
+            business["website"] = ""
+            business["email"] = ""
     
     def _get_place_details(self, place_id: str, api_key: str) -> Optional[Dict]:
         """
         Get detailed information for a place using Place Details API (Legacy)
         
+        Results are served from the place_details response cache while fresh
+        (config.CACHE_TTL_DAYS), saving the Details call and the email scrape.
+        
         Official API Documentation:
         https://developers.google.com/maps/documentation/places/web-service/legacy/details
         
@@ -370,69 +1097,131 @@ class MapsDiscoverer:
         Returns:
             Dict with phone, website, email (or None if failed)
         """
-        try:
-            # Place Details API endpoint (Legacy)
-            # Official endpoint: https://maps.googleapis.com/maps/api/place/details/json
-            details_url = "https://maps.googleapis.com/maps/api/place/details/json"
-            
-            # Required parameters per official docs:
-            # - place_id: The place_id from Text Search
-            # - key: Your API key
-            # - fields: Comma-separated list of fields to return (optional but recommended for cost control)
-            params = {
-                "place_id": place_id,
-                "key": api_key,
-                "fields": "formatted_phone_number,website"  # Only get what we need to save costs
-            }
-            
-            response = self.session.get(details_url, params=params, timeout=15)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Check response status per official docs
-            status = data.get("status")
-            if status != "OK":
-                # Don't print error for missing details - it's optional
-                # Many places don't have phone/website in the database
-                return None
-            
-            # Extract result object per official docs
-            # Response format: { "html_attributions": [], "result": {...}, "status": "OK" }
-            result = data.get("result", {})
-            if not result:
-                return None
-            
-            # Extract phone and website per official docs
-            # formatted_phone_number: Contains the place's phone number in its local format
-            # website: The authoritative website for this place
-            details = {
-                "phone": result.get("formatted_phone_number", "").strip(),
-                "website": result.get("website", "").strip(),
-            }
+        # Repeat runs find the same places: reuse their details and email
+        cache = response_cache.get_cache("place_details")
+        cached = cache.get(place_id)
+        if cached is not None:
+            return dict(cached)
+        
+        details = self.get_contact_details(place_id, api_key)
+        if not details:
+            return None
+        
+        # Extract email from website if available (not from API, we scrape it)
+        details["email"] = self.fetch_email(details["website"]) if details.get("website") else ""
+        cache.put(place_id, details)
+        return details
+    
+    def get_contact_details(self, place_id: str, api_key: str) -> Optional[Dict]:
+        """
+        Run only the Place Details request for a place
+        
+        Args:
+            place_id: Place ID from Text Search response
+            api_key: Google Places API key
             
-            # Extract email from website if available (not from API, we scrape it)
-            if details.get("website"):
-                try:
-                    website_response = self.website_analyzer.session.get(
-                        details["website"], 
-                        timeout=5,
-                        allow_redirects=True
+        Returns:
+            Dict with phone and website (or None if failed)
+        
+        Raises:
+            RunCancelled: The run was stopped, or parked (QuotaExhausted)
+        """
+        try:
+            with metrics.stage("place_details", country=self.country):
+                self._use_quota("place_details")
+                self._acquire("place_details")
+                self._count_api_call()
+                with upstream_slot("places"):
+                    response = self._http_get(
+                        self.session,
+                        PLACES_DETAILS_URL,
+                        params=self._place_details_params(place_id, api_key),
+                        timeout=15
                     )
-                    website_response.raise_for_status()
-                    email = self.website_analyzer.extract_email(website_response.text)
-                    details["email"] = email if email else ""
-                except Exception as e:
-                    # Silently fail - email extraction is optional
-                    details["email"] = ""
-            else:
-                details["email"] = ""
-            
-            return details
+                response.raise_for_status()
+                data = response.json()
+            return self._parse_place_details_response(data)
             
+        except RunCancelled:
+            # A stop or an exhausted budget ends the lookup; it isn't a missing detail
+            raise
         except requests.exceptions.RequestException as e:
             # Network error - silently fail (details are optional)
             return None
         except Exception as e:
             # Other errors - silently fail (details are optional)
             return None
-
+    
+    def fetch_email(self, website: str) -> str:
+        """
+        Scrape the first email address from a business website
+        
+        Args:
+            website: Website URL from Place Details
+            
+        Returns:
+            Email address, or "" if none found or the fetch failed
+        
+        Raises:
+            RunCancelled: The run was stopped
+        """
+        try:
+            with metrics.stage("email_fetch", country=self.country):
+                self._acquire("websites")
+                with upstream_slot("websites"):
+                    website_response = self._http_get(
+                        self.website_analyzer.session,
+                        website,
+                        timeout=5,
+                        allow_redirects=True
+                    )
+                website_response.raise_for_status()
+            email = self.website_analyzer.extract_email(website_response.text)
+            return email if email else ""
+        except RunCancelled:
+            raise
+        except Exception as e:
+            # Silently fail - email extraction is optional
+            return ""
+    
+    def _place_details_params(self, place_id: str, api_key: str) -> Dict:
+        """Build Place Details request parameters"""
+        # Required parameters per official docs:
+        # - place_id: The place_id from Text Search
+        # - key: Your API key
+        # - fields: Comma-separated list of fields to return (optional but recommended for cost control)
+        return {
+            "place_id": place_id,
+            "key": api_key,
+            "fields": "formatted_phone_number,website"  # Only get what we need to save costs
+        }
+    
+    def _parse_place_details_response(self, data: Dict) -> Optional[Dict]:
+        """
+        Extract phone and website from a Place Details response
+        
+        Returns:
+            Dict with phone and website (no email yet), or None if unavailable
+        """
+        # Check response status per official docs
+        status = data.get("status")
+        if status == "OVER_QUERY_LIMIT":
+            raise self._quota_exhausted(quota_manager.get_quota_manager().over_query_limit("place_details"))
+        if status != "OK":
+            # Don't print error for missing details - it's optional
+            # Many places don't have phone/website in the database
+            return None
+        
+        # Extract result object per official docs
+        # Response format: { "html_attributions": [], "result": {...}, "status": "OK" }
+        result = data.get("result", {})
+        if not result:
+            return None
+        
+        # Extract phone and website per official docs
+        # formatted_phone_number: Contains the place's phone number in its local format
+        # website: The authoritative website for this place
+        return {
+            "phone": result.get("formatted_phone_number", "").strip(),
+            "website": result.get("website", "").strip(),
+        }
@@ -0,0 +1,252 @@
+"""
+In-process metrics for the discovery hot path, rendered in Prometheus text format
+
+Text Search, Place Details, email fetches, duplicate checks and Sheets appends
+are timed into a latency histogram and counted by outcome, labelled with the
+country and category being worked on. Workers declare what they are working on
+with set_labels(); stage() picks the labels up from there, so methods deep in
+the call chain (e.g. Place Details) don't need the category passed down.
+
+Labels live in a context variable: they are per thread, and per task on the
+async engine's event loop.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from run_control import RunCancelled
+
+
+# Latency buckets in seconds (upper bounds; +Inf is implicit)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_labels: contextvars.ContextVar = contextvars.ContextVar("metric_labels", default={})
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [
+                f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(self._values.items())
+            ]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, per label set"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            return [
+                f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(self._values.items())
+            ]
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum and count"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count], sum
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            for idx, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[idx] += 1
+                    break
+            else:
+                counts[-1] += 1
+            total[0] += value
+
+    def count(self, **labels) -> int:
+        with self._lock:
+            series = self._series.get(self._key(labels))
+            return sum(series[0]) if series else 0
+
+    def _samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = 'le="{}"'.format("+Inf" if bound == float("inf") else _format_value(bound))
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total[0])}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Named metrics of the process"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        """All metrics in Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "leadgen_stage_duration_seconds",
+    "Wall-clock time of hot-path stage calls, including rate-limit waits",
+    ("stage", "country", "category")
+)
+STAGE_CALLS = REGISTRY.counter(
+    "leadgen_stage_calls_total",
+    "Hot-path stage calls by outcome",
+    ("stage", "country", "category", "outcome")
+)
+ACTIVE_RUNS = REGISTRY.gauge("leadgen_active_runs", "Discovery runs currently executing")
+
+
+class _StageCall:
+    """Handle for a stage() block; set outcome to record a handled failure"""
+
+    def __init__(self):
+        self.outcome = "ok"
+
+
+def set_labels(**labels):
+    """Label stage metrics recorded from now on in this thread (or async task)"""
+    _labels.set({**_labels.get(), **labels})
+
+
+@contextmanager
+def stage(name: str, country: Optional[str] = None, category: Optional[str] = None) -> Iterator[_StageCall]:
+    """
+    Time a block as one call of a hot-path stage
+
+    An exception leaving the block is counted as outcome="error" ("cancelled"
+    for a stopped run) and re-raised.
+
+    Args:
+        name: Stage name (text_search, place_details, email_fetch, duplicate_check, sheets_append)
+        country: Label value (default: from set_labels)
+        category: Label value (default: from set_labels)
+    """
+    labels = _labels.get()
+    country = country if country is not None else labels.get("country", "")
+    category = category if category is not None else labels.get("category", "")
+    call = _StageCall()
+    started = time.perf_counter()
+    try:
+        yield call
+    except RunCancelled:
+        call.outcome = "cancelled"
+        raise
+    except BaseException:
+        call.outcome = "error"
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage=name, country=country, category=category)
+        STAGE_CALLS.inc(stage=name, country=country, category=category, outcome=call.outcome)
+
+
+def render() -> str:
+    return REGISTRY.render()
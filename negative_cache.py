@@ -0,0 +1,107 @@
+"""
+Negative cache of empty discovery cells
+
+A (country, city, category) cell that completes without a single new lead -
+Text Search returned ZERO_RESULTS or every business was already in the sheet -
+is remembered for config.NEGATIVE_CACHE_TTL_DAYS. Runs started within that
+window skip the cell instead of paying for its searches again.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import config
+
+
+class NegativeCache:
+    """SQLite-backed set of cells that recently produced nothing"""
+
+    def __init__(self, path: Optional[str] = None, ttl_days: Optional[float] = None):
+        """
+        Args:
+            path: SQLite file (default: config.NEGATIVE_CACHE_PATH)
+            ttl_days: How long an entry suppresses its cell (default: config.NEGATIVE_CACHE_TTL_DAYS)
+        """
+        self.path = path or config.NEGATIVE_CACHE_PATH
+        self.ttl_seconds = (config.NEGATIVE_CACHE_TTL_DAYS if ttl_days is None else ttl_days) * 86400
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS empty_cells (
+                    country TEXT NOT NULL,
+                    city TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    reason TEXT NOT NULL,
+                    cached_at REAL NOT NULL,
+                    PRIMARY KEY (country, city, category)
+                )
+            """)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def add(self, country: str, city: str, category: str, reason: str):
+        """
+        Remember that a cell produced no new leads
+
+        Args:
+            reason: "zero_results" or "duplicates_only"
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO empty_cells (country, city, category, reason, cached_at) VALUES (?, ?, ?, ?, ?)",
+                (country, city, category, reason, time.time())
+            )
+
+    def remove(self, country: str, city: str, category: str):
+        """Forget a cell (it produced leads again)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM empty_cells WHERE country = ? AND city = ? AND category = ?",
+                (country, city, category)
+            )
+
+    def cached_cells(self, country: str, categories: List[str], cities: List[str]) -> Dict[Tuple[int, int], str]:
+        """
+        Cells of a run that are still within their TTL
+
+        Args:
+            country: Country name
+            categories: Run categories (cell keys use their indices)
+            cities: Run cities
+
+        Returns:
+            {(category_idx, city_idx): reason}
+        """
+        if not self.enabled:
+            return {}
+
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT city, category, reason FROM empty_cells WHERE country = ? AND cached_at >= ?",
+                (country, time.time() - self.ttl_seconds)
+            ).fetchall()
+
+        category_indexes = {category: idx for idx, category in enumerate(categories)}
+        city_indexes = {city: idx for idx, city in enumerate(cities)}
+        return {
+            (category_indexes[row["category"]], city_indexes[row["city"]]): row["reason"]
+            for row in rows
+            if row["category"] in category_indexes and row["city"] in city_indexes
+        }
+
+    def purge_expired(self) -> int:
+        """Delete entries past their TTL; returns how many were removed"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM empty_cells WHERE cached_at < ?",
+                (time.time() - self.ttl_seconds,)
+            )
+            return cursor.rowcount
@@ -0,0 +1,188 @@
+"""
+Staged processing pipeline with bounded queues between stages
+
+Each stage has its own worker threads and an input queue of fixed capacity.
+A full queue blocks the upstream stage (backpressure), so a slow stage shows up
+as a deep queue in front of it instead of stalling every other stage.
+"""
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set
+
+
+_SENTINEL = object()
+
+
+class Stage:
+    """One pipeline stage: a handler run by N worker threads"""
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Any], Optional[Iterable[Any]]],
+        workers: int = 1,
+        queue_size: int = 100
+    ):
+        """
+        Args:
+            name: Stage name (used in stats and thread names)
+            handler: Called with one item; returns the items to pass downstream
+                     (an empty list or None drops the item). A generator handler
+                     streams each item downstream as soon as it is yielded
+            workers: Number of worker threads
+            queue_size: Capacity of the stage's input queue
+        """
+        self.name = name
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.input: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self.processed = 0
+        self.errors = 0
+        self.busy_seconds = 0.0  # Time spent inside the handler
+        self.blocked_seconds = 0.0  # Time spent waiting on a full downstream queue
+        self.active = 0
+        self.started_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def stats(self) -> Dict:
+        """Queue depth and throughput for this stage"""
+        elapsed_minutes = (time.time() - self.started_at) / 60 if self.started_at else 0
+        return {
+            "stage": self.name,
+            "workers": self.workers,
+            "active_workers": self.active,
+            "queue_depth": self.input.qsize(),
+            "queue_capacity": self.input.maxsize,
+            "processed": self.processed,
+            "errors": self.errors,
+            "items_per_minute": round(self.processed / elapsed_minutes, 2) if elapsed_minutes > 0 else 0.0,
+            "avg_seconds_per_item": round(self.busy_seconds / self.processed, 3) if self.processed else 0.0,
+            "blocked_seconds": round(self.blocked_seconds, 1),
+        }
+
+
+class Pipeline:
+    """
+    Linear chain of stages
+
+    Items are tracked by group (e.g. one discovery cell): when every item that
+    descended from a group has left the pipeline, on_group_done(group) is called.
+    A group in which any handler raised is not reported done.
+    """
+
+    def __init__(
+        self,
+        stages: List[Stage],
+        on_group_done: Optional[Callable[[Hashable], None]] = None
+    ):
+        self.stages = stages
+        self.on_group_done = on_group_done
+        self._outstanding: Dict[Hashable, int] = {}
+        self._failed_groups: Set[Hashable] = set()
+        self._outstanding_lock = threading.Lock()
+        self._threads: List[threading.Thread] = []
+
+    def start(self):
+        """Start worker threads for every stage"""
+        now = time.time()
+        for index, stage in enumerate(self.stages):
+            stage.started_at = now
+            next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+            for worker_idx in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._worker,
+                    args=(stage, next_stage),
+                    daemon=True,
+                    name=f"Pipeline-{stage.name}-{worker_idx + 1}"
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def put(self, item: Any, group: Hashable = None, timeout: Optional[float] = None) -> bool:
+        """
+        Feed an item into the first stage (blocks while the first queue is full)
+
+        Returns:
+            False if the queue was still full after `timeout` seconds
+        """
+        self._track(group, 1)
+        try:
+            self.stages[0].input.put((group, item), timeout=timeout)
+            return True
+        except queue.Full:
+            # The item never entered the pipeline: its group isn't done
+            self._track(group, -1, report=False)
+            return False
+
+    def close(self):
+        """Drain the pipeline: stop each stage after everything upstream has finished"""
+        for stage in self.stages:
+            for _ in range(stage.workers):
+                stage.input.put(_SENTINEL)
+            for thread in self._threads:
+                if thread.name.startswith(f"Pipeline-{stage.name}-"):
+                    thread.join()
+
+    def stats(self) -> List[Dict]:
+        """Per-stage stats, in pipeline order"""
+        return [stage.stats() for stage in self.stages]
+
+    def _worker(self, stage: Stage, next_stage: Optional[Stage]):
+        while True:
+            envelope = stage.input.get()
+            if envelope is _SENTINEL:
+                break
+
+            group, item = envelope
+            with stage._lock:
+                stage.active += 1
+            started = time.time()
+            blocked = 0.0
+            try:
+                for output in stage.handler(item) or []:
+                    if next_stage is None:
+                        continue
+                    # Count children before the parent is released so the group
+                    # can't be reported done while work is still in flight
+                    self._track(group, 1)
+                    put_started = time.time()
+                    next_stage.input.put((group, output))
+                    blocked += time.time() - put_started
+            except Exception as e:
+                print(f"Pipeline stage '{stage.name}' error: {e}")
+                with stage._lock:
+                    stage.errors += 1
+                if group is not None:
+                    with self._outstanding_lock:
+                        self._failed_groups.add(group)
+            finally:
+                finished = time.time()
+                with stage._lock:
+                    stage.active -= 1
+                    stage.processed += 1
+                    stage.busy_seconds += finished - started - blocked
+                    stage.blocked_seconds += blocked
+                self._track(group, -1)
+
+    def _track(self, group: Hashable, delta: int, report: bool = True):
+        if group is None:
+            return
+        with self._outstanding_lock:
+            remaining = self._outstanding.get(group, 0) + delta
+            if remaining > 0:
+                self._outstanding[group] = remaining
+                return
+            self._outstanding.pop(group, None)
+            failed = group in self._failed_groups
+            self._failed_groups.discard(group)
+        if not report:
+            return
+        if failed:
+            print(f"Pipeline group {group} had failed items; not marked done")
+            return
+        if delta < 0 and self.on_group_done:
+            try:
+                self.on_group_done(group)
+            except Exception as e:
+                print(f"Pipeline group callback error: {e}")
@@ -0,0 +1,174 @@
+"""
+Index of place_ids already found, checked right after Text Search
+
+Overlapping categories ("skin clinic" / "dermatology clinic") and neighbouring
+cities return the same places many times per run, and each repeat used to cost
+a Place Details call and a website fetch before the sheet's duplicate check
+rejected it. Every place a cell finds is claimed here first; places another
+cell has already claimed are dropped before any further request.
+
+With config.PLACE_INDEX_SCOPE = "run" (default) claims last for the run;
+"global" keeps them across runs for config.PLACE_INDEX_TTL_DAYS, so later runs
+skip places earlier runs found. Claims live in a SQLite file
+(config.PLACE_INDEX_PATH), shared by the threads and worker processes of a run.
+A cell may claim a place again (e.g. when it is resumed after an interruption).
+
+A completed run's claims are dropped at once. Those of runs that were stopped,
+parked or abandoned are kept for a resume, and like global claims are purged
+once older than config.PLACE_INDEX_TTL_DAYS (whenever an index is opened).
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+import config
+
+
+OWNERS_MEMORY_LIMIT = 100000  # In-process claim lookups kept per index before the map is reset
+
+
+class PlaceIndex:
+    """SQLite-backed place_id claims within one scope (a run, or all runs)"""
+
+    def __init__(self, scope: str, path: Optional[str] = None, ttl_days: Optional[float] = None):
+        """
+        Args:
+            scope: Run ID, or "global" for claims shared by all runs
+            path: SQLite file (default: config.PLACE_INDEX_PATH)
+            ttl_days: How long a global claim holds (default: config.PLACE_INDEX_TTL_DAYS)
+        """
+        self.scope = scope
+        self.path = path or config.PLACE_INDEX_PATH
+        self.ttl_seconds = (config.PLACE_INDEX_TTL_DAYS if ttl_days is None else ttl_days) * 86400
+        self._owners: Dict[str, str] = {}  # place_id -> owner, for claims seen by this process
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS place_claims (
+                    scope TEXT NOT NULL,
+                    place_id TEXT NOT NULL,
+                    owner TEXT NOT NULL,
+                    claimed_at REAL NOT NULL,
+                    PRIMARY KEY (scope, place_id)
+                )
+            """)
+            self._conn.execute("CREATE INDEX IF NOT EXISTS place_claims_age ON place_claims (claimed_at)")
+            # Claims of every scope (including runs that never completed) expire
+            self._conn.execute(
+                "DELETE FROM place_claims WHERE claimed_at < ?",
+                (time.time() - self.ttl_seconds,)
+            )
+
+    def claim(self, place_id: str, owner: str) -> bool:
+        """
+        Claim a place for a cell
+
+        Args:
+            place_id: Place found by the cell's search
+            owner: Claiming cell (see PlaceIndex.cell)
+
+        Returns:
+            True if the place is new (or already the owner's), False if another cell has it
+        """
+        with self._lock:
+            known = self._owners.get(place_id)
+            if known is not None:
+                return known == owner
+
+            with self._conn:
+                now = time.time()
+                if self.scope == "global":
+                    # An expired claim no longer holds
+                    self._conn.execute(
+                        "DELETE FROM place_claims WHERE scope = ? AND place_id = ? AND claimed_at < ?",
+                        (self.scope, place_id, now - self.ttl_seconds)
+                    )
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO place_claims (scope, place_id, owner, claimed_at) VALUES (?, ?, ?, ?)",
+                    (self.scope, place_id, owner, now)
+                )
+                row = self._conn.execute(
+                    "SELECT owner FROM place_claims WHERE scope = ? AND place_id = ?",
+                    (self.scope, place_id)
+                ).fetchone()
+            if len(self._owners) >= OWNERS_MEMORY_LIMIT:
+                self._owners.clear()  # Only a shortcut in front of SQLite
+            self._owners[place_id] = row[0]
+            return row[0] == owner
+
+    def cell(self, owner: str) -> "CellPlaces":
+        """Claims made on behalf of one cell"""
+        return CellPlaces(self, owner)
+
+    def count(self) -> int:
+        """Places claimed in this scope"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM place_claims WHERE scope = ?", (self.scope,)
+            ).fetchone()[0]
+
+    def clear(self):
+        """Drop the scope's claims (a finished run no longer needs them)"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM place_claims WHERE scope = ?", (self.scope,))
+            self._owners.clear()
+
+
+class CellPlaces:
+    """A PlaceIndex bound to the cell whose search is claiming places"""
+
+    def __init__(self, index: PlaceIndex, owner: str):
+        self.index = index
+        self.owner = owner
+
+    def claim(self, place_id: str) -> bool:
+        """True if the cell should handle the place, False if another cell already has it"""
+        return self.index.claim(place_id, self.owner)
+
+
+def cell_places(run_id: str, cell: Optional[Tuple[int, int]]) -> Optional[CellPlaces]:
+    """Claims of a run's cell (None when config.PLACE_INDEX_SCOPE is "off" or there is no cell)"""
+    if cell is None or config.PLACE_INDEX_SCOPE not in ("run", "global"):
+        return None
+    scope = run_id if config.PLACE_INDEX_SCOPE == "run" else "global"
+    return get_place_index(scope).cell(f"{run_id}:{cell[0]}:{cell[1]}")
+
+
+_indexes: Dict[str, PlaceIndex] = {}
+_indexes_pid: Optional[int] = None
+_indexes_lock = threading.Lock()
+
+
+def get_place_index(scope: str) -> PlaceIndex:
+    """Process-wide index of a scope (a forked worker opens its own connection)"""
+    global _indexes, _indexes_pid
+    with _indexes_lock:
+        if _indexes_pid != os.getpid():
+            _indexes = {}
+            _indexes_pid = os.getpid()
+        index = _indexes.get(scope)
+        if index is None:
+            index = _indexes[scope] = PlaceIndex(scope)
+        return index
+
+
+def release_run(run_id: str):
+    """Drop a finished run's claims (run scope only; global claims expire by TTL)"""
+    if config.PLACE_INDEX_SCOPE != "run":
+        return
+    get_place_index(run_id).clear()
+    close_run(run_id)
+
+
+def close_run(run_id: str):
+    """Forget a run's index in this process once the run ends (its stored claims stay for resume)"""
+    # Threads still finishing a request may hold the index; its connection closes with it
+    with _indexes_lock:
+        if _indexes_pid == os.getpid():
+            _indexes.pop(run_id, None)
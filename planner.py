@@ -0,0 +1,215 @@
+"""
+Run planner: call, duration and cost estimates before a run is started
+
+A run covers every (category, city) cell of a country, starting from the chosen
+city like LeadDiscoveryApp.start(). For each cell the planner estimates how many
+businesses Text Search returns and how many become new leads, from the cell's
+yield history (or config.PLAN_BUSINESSES_PER_CELL and the city tier's yield
+prior when it has none). From those it projects:
+
+- Places Text Search and Place Details calls (and their list-price cost; the
+  Places API (New) provider makes no Place Details calls)
+- business website fetches (config.PLAN_WEBSITE_RATE of businesses)
+- Google Sheets requests (a duplicate check per business, a header check and
+  an append per new lead)
+
+Run time is the larger of what the rate limits (config.RATE_LIMITS) allow and
+what the scheduler's workers can get through at typical call latencies
+(config.PLAN_CALL_SECONDS). Cells in the negative cache are left out, as the
+run would skip them.
+"""
+import math
+from typing import Dict, List, Optional
+import config
+from countries import get_all_cities_for_country, get_country_config
+from negative_cache import NegativeCache
+from yield_history import YieldHistory
+
+
+RESULTS_PER_PAGE = 20  # Text Search page size
+MAX_PAGES = 3  # Text Search returns at most 60 results
+
+# Call counters of an estimate -> rate limit bucket
+BUCKETS = {
+    "text_search_calls": "places_text_search",
+    "details_calls": "place_details",
+    "website_fetches": "websites",
+    "sheets_calls": "sheets",
+}
+
+
+def run_cities(country: str, city: str) -> List[str]:
+    """Cities a run started from `city` goes through, in order"""
+    all_cities = get_all_cities_for_country(country)
+    if city in all_cities:
+        start = all_cities.index(city)
+        return all_cities[start:] + all_cities[:start]
+    return [city]
+
+
+def estimate_cell(history: YieldHistory, country: str, city: str, category: str) -> Dict:
+    """
+    Expected businesses, new leads and calls for one cell
+
+    Returns:
+        Dict with businesses, new_leads, text_search_calls, details_calls,
+        website_fetches, sheets_calls and has_history
+    """
+    past = history.get(country, city, category)
+    if past and past["runs"]:
+        businesses = past["businesses"] / past["runs"]
+    else:
+        businesses = float(config.PLAN_BUSINESSES_PER_CELL)
+    businesses = min(businesses, config.MAX_RESULTS_PER_CATEGORY)
+
+    pages = min(MAX_PAGES, max(1, math.ceil(businesses / RESULTS_PER_PAGE)))
+    # Places API (New) search results carry phone and website: no Place Details calls
+    details_calls = 0.0 if config.PLACES_PROVIDER == "new" else businesses
+    api_calls = pages + details_calls
+    new_leads = min(businesses, history.expected_yield(country, city, category) * api_calls)
+
+    return {
+        "businesses": businesses,
+        "new_leads": new_leads,
+        "text_search_calls": pages,
+        "details_calls": details_calls,
+        "website_fetches": businesses * config.PLAN_WEBSITE_RATE,
+        "sheets_calls": businesses + 2 * new_leads,
+        "has_history": bool(past),
+    }
+
+
+def _workers(scheduler: str, concurrency: Optional[int]) -> int:
+    """Cells the scheduler works on at once"""
+    if scheduler == "queue":
+        workers = concurrency or config.QUEUE_WORKERS
+    elif scheduler == "sharded":
+        workers = concurrency or config.SHARD_PROCESSES
+    else:
+        workers = concurrency or config.CELL_CONCURRENCY
+    return max(1, min(workers, config.GLOBAL_CELL_CONCURRENCY))
+
+
+def _latency_seconds(totals: Dict, scheduler: str, workers: int) -> float:
+    """Run time if only call latency and worker counts limited it"""
+    latency = config.PLAN_CALL_SECONDS
+    seconds = {counter: totals[counter] * latency[bucket] for counter, bucket in BUCKETS.items()}
+
+    if scheduler == "pipeline":
+        stages = config.PIPELINE_STAGE_WORKERS
+        return max(
+            seconds["text_search_calls"] / stages["search"],
+            seconds["details_calls"] / stages["details"],
+            seconds["website_fetches"] / stages["enrichment"],
+            seconds["sheets_calls"] / stages["storage"],
+        )
+
+    # Each worker runs its cell's calls one after another; upstream caps are per process
+    processes = workers if scheduler == "sharded" else 1
+    places_slots = config.UPSTREAM_CONCURRENCY["places"] * processes
+    website_slots = config.UPSTREAM_CONCURRENCY["websites"] * processes
+    return max(
+        sum(seconds.values()) / workers,
+        (seconds["text_search_calls"] + seconds["details_calls"]) / places_slots,
+        seconds["website_fetches"] / website_slots,
+    )
+
+
+def plan_run(
+    country: str,
+    city: str,
+    categories: Optional[List[str]] = None,
+    concurrency: Optional[int] = None,
+    scheduler: Optional[str] = None,
+    history: Optional[YieldHistory] = None,
+    negative_cache: Optional[NegativeCache] = None
+) -> Dict:
+    """
+    Estimate the calls, run time and cost of a discovery run
+
+    Args:
+        country: Country name
+        city: Starting city
+        categories: Categories to search (default: config.DEFAULT_CATEGORIES)
+        concurrency: Cells in parallel (as for LeadDiscoveryApp.start)
+        scheduler: "cells", "pipeline", "queue" or "sharded" (default: config.DISCOVERY_SCHEDULER)
+        history: Yield history to estimate from (default: config.YIELD_HISTORY_PATH)
+        negative_cache: Cells to leave out (default: config.NEGATIVE_CACHE_PATH)
+
+    Returns:
+        Plan dict: cell counts, call estimates, expected leads, duration and cost
+
+    Raises:
+        ValueError: Unknown country
+    """
+    if not get_country_config(country):
+        raise ValueError(f"Country '{country}' not found")
+
+    categories = categories or config.DEFAULT_CATEGORIES
+    scheduler = scheduler or config.DISCOVERY_SCHEDULER
+    cities = run_cities(country, city)
+    history = history or YieldHistory()
+    negative_cache = negative_cache or NegativeCache()
+
+    skipped = negative_cache.cached_cells(country, categories, cities)
+    totals = dict.fromkeys(["businesses", "new_leads"] + list(BUCKETS), 0.0)
+    by_category = {}
+    cells_with_history = 0
+
+    for category_idx, category in enumerate(categories):
+        category_totals = {"cells": 0, "new_leads": 0.0, "places_calls": 0.0}
+        for city_idx, cell_city in enumerate(cities):
+            if (category_idx, city_idx) in skipped:
+                continue
+            estimate = estimate_cell(history, country, cell_city, category)
+            for name in totals:
+                totals[name] += estimate[name]
+            cells_with_history += estimate["has_history"]
+            category_totals["cells"] += 1
+            category_totals["new_leads"] += estimate["new_leads"]
+            category_totals["places_calls"] += estimate["text_search_calls"] + estimate["details_calls"]
+        by_category[category] = {
+            "cells": category_totals["cells"],
+            "new_leads": round(category_totals["new_leads"]),
+            "places_calls": round(category_totals["places_calls"]),
+        }
+
+    # Sharded workers split the limits between them, so totals are the same for every scheduler
+    rate_seconds = {
+        bucket: totals[counter] / config.RATE_LIMITS[bucket]["rate"]
+        for counter, bucket in BUCKETS.items()
+    }
+    workers = _workers(scheduler, concurrency)
+    bottleneck = max(rate_seconds, key=rate_seconds.get)
+    duration = rate_seconds[bottleneck]
+    latency_duration = _latency_seconds(totals, scheduler, workers)
+    if latency_duration > duration:
+        bottleneck, duration = "workers", latency_duration
+
+    text_search_sku = "text_search_enterprise" if config.PLACES_PROVIDER == "new" else "text_search"
+    cost = {
+        text_search_sku: totals["text_search_calls"] * config.PLACES_SKU_COST_USD[text_search_sku],
+        "place_details": totals["details_calls"] * config.PLACES_SKU_COST_USD["place_details"],
+    }
+
+    return {
+        "country": country,
+        "city": city,
+        "categories": categories,
+        "scheduler": scheduler,
+        "workers": workers,
+        "cities": len(cities),
+        "cells": len(categories) * len(cities),
+        "cells_skipped": len(skipped),
+        "cells_with_history": cells_with_history,
+        "calls": {counter: round(totals[counter]) for counter in BUCKETS},
+        "expected_businesses": round(totals["businesses"]),
+        "expected_new_leads": round(totals["new_leads"]),
+        "duration_seconds": round(duration),
+        "duration_hours": round(duration / 3600, 2),
+        "bottleneck": bottleneck,
+        "exceeds_max_hours": duration > config.MAX_LONG_RUNNING_HOURS * 3600,
+        "cost_usd": {name: round(value, 2) for name, value in cost.items()},
+        "total_cost_usd": round(sum(cost.values()), 2),
+        "by_category": by_category,
+    }
@@ -0,0 +1,187 @@
+"""
+Daily and monthly Places API budgets per SKU
+
+Every Text Search and Place Details call is counted against the SKU's budgets
+(config.PLACES_BUDGETS) in a SQLite file, so all runs and worker processes draw
+from the same allowance. Windows follow Google's quota day and billing month in
+config.QUOTA_TIMEZONE.
+
+Once a budget is config.QUOTA_SLOWDOWN_AT used, calls are spread out so the
+rest lasts until the window resets. When it is used up - or Google answers
+OVER_QUERY_LIMIT - QuotaExhausted is raised and the run is parked: it stops
+without completing the cells in flight, and its remaining cells wait in the
+checkpoint for the next window instead of being recorded as empty.
+"""
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+from zoneinfo import ZoneInfo
+import config
+from run_control import RunCancelled
+from structured_logging import get_logger
+
+
+log = get_logger("places")
+
+# Rate limit bucket of a Places call -> billed SKU
+BUCKET_SKUS = {
+    "places_text_search": "text_search",
+    "place_details": "place_details",
+}
+
+
+class QuotaExhausted(RunCancelled):
+    """A Places API budget is used up; the run should be parked until resets_at"""
+
+    def __init__(self, sku: str, window: str, resets_at: float):
+        self.sku = sku
+        self.window = window
+        self.resets_at = resets_at
+        super().__init__(
+            f"{sku} {window} budget exhausted until "
+            f"{datetime.fromtimestamp(resets_at).isoformat(timespec='minutes')}"
+        )
+
+
+def _windows(now: float) -> Dict[str, Tuple[str, float]]:
+    """Current daily and monthly window: {window: (period key, resets_at timestamp)}"""
+    local = datetime.fromtimestamp(now, ZoneInfo(config.QUOTA_TIMEZONE))
+    day_start = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    next_day = day_start + timedelta(days=1)  # Wall-clock arithmetic: midnight even across DST
+    next_month = (day_start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return {
+        "daily": (local.strftime("%Y-%m-%d"), next_day.timestamp()),
+        "monthly": (local.strftime("%Y-%m"), next_month.timestamp()),
+    }
+
+
+class QuotaManager:
+    """SQLite-backed Places API call counts per SKU and window"""
+
+    def __init__(self, path: Optional[str] = None, budgets: Optional[Dict[str, Dict[str, int]]] = None):
+        """
+        Args:
+            path: SQLite file (default: config.QUOTA_PATH)
+            budgets: {sku: {"daily": calls, "monthly": calls}} (default: config.PLACES_BUDGETS)
+        """
+        self.path = path or config.QUOTA_PATH
+        self.budgets = budgets if budgets is not None else config.PLACES_BUDGETS
+        self.parked_until: Optional[float] = None  # Set once this process hit an exhausted budget
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS quota_usage (
+                    sku TEXT NOT NULL,
+                    period TEXT NOT NULL,
+                    calls INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (sku, period)
+                )
+            """)
+
+    def acquire(self, sku: str) -> float:
+        """
+        Count one call of a SKU against its budgets
+
+        Returns:
+            Seconds the caller should wait first (0.0 while budgets have headroom)
+
+        Raises:
+            QuotaExhausted: A budget of the SKU is used up (the call is not counted)
+        """
+        budgets = self.budgets.get(sku, {})
+        now = time.time()
+        windows = _windows(now)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                used = self._used(sku, windows)
+                for window, limit in budgets.items():
+                    if limit and used[window] >= limit:
+                        raise self._park(QuotaExhausted(sku, window, windows[window][1]))
+                for period, _ in windows.values():
+                    self._conn.execute(
+                        """
+                        INSERT INTO quota_usage (sku, period, calls) VALUES (?, ?, 1)
+                        ON CONFLICT (sku, period) DO UPDATE SET calls = calls + 1
+                        """,
+                        (sku, period)
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        # Past the slowdown point, pace the remaining calls over the rest of the window
+        delay = 0.0
+        for window, limit in budgets.items():
+            if limit and used[window] + 1 >= limit * config.QUOTA_SLOWDOWN_AT:
+                remaining = max(1, limit - used[window] - 1)
+                delay = max(delay, (windows[window][1] - now) / remaining)
+        return min(delay, config.QUOTA_MAX_DELAY_SECONDS)
+
+    def over_query_limit(self, sku: str) -> QuotaExhausted:
+        """
+        Google answered OVER_QUERY_LIMIT for a SKU: park for config.QUOTA_OVER_LIMIT_PARK_MINUTES
+
+        Returns:
+            The QuotaExhausted to raise
+        """
+        resets_at = time.time() + config.QUOTA_OVER_LIMIT_PARK_MINUTES * 60
+        return self._park(QuotaExhausted(sku, "upstream", resets_at))
+
+    def usage(self) -> Dict[str, Dict[str, Dict]]:
+        """Calls used, budget and reset time per SKU and window"""
+        windows = _windows(time.time())
+        with self._lock:
+            report = {}
+            for sku in sorted(set(self.budgets) | set(BUCKET_SKUS.values())):
+                used = self._used(sku, windows)
+                report[sku] = {
+                    window: {
+                        "used": used[window],
+                        "budget": self.budgets.get(sku, {}).get(window, 0),
+                        "resets_at": datetime.fromtimestamp(resets_at).isoformat(timespec="seconds"),
+                    }
+                    for window, (_, resets_at) in windows.items()
+                }
+        return report
+
+    def _used(self, sku: str, windows: Dict[str, Tuple[str, float]]) -> Dict[str, int]:
+        """Calls counted in each window (caller holds the lock)"""
+        used = {}
+        for window, (period, _) in windows.items():
+            row = self._conn.execute(
+                "SELECT calls FROM quota_usage WHERE sku = ? AND period = ?",
+                (sku, period)
+            ).fetchone()
+            used[window] = row["calls"] if row else 0
+        return used
+
+    def _park(self, error: QuotaExhausted) -> QuotaExhausted:
+        if self.parked_until is None or error.resets_at > self.parked_until:
+            log.warning(f"⚠ Places API {error}; parking remaining cells", sku=error.sku, window=error.window)
+            self.parked_until = error.resets_at
+        return error
+
+
+_manager: Optional[QuotaManager] = None
+_manager_pid: Optional[int] = None
+_manager_lock = threading.Lock()
+
+
+def get_quota_manager() -> QuotaManager:
+    """Process-wide quota manager (a forked worker opens its own connection)"""
+    global _manager, _manager_pid
+    with _manager_lock:
+        if _manager is None or _manager_pid != os.getpid():
+            _manager = QuotaManager()
+            _manager_pid = os.getpid()
+        return _manager
@@ -0,0 +1,97 @@
+"""
+Token-bucket rate limiting per upstream service
+
+Each upstream (Places text search, Place Details, business websites, Sheets API)
+has a named bucket configured in config.RATE_LIMITS. Callers only wait when the
+bucket is empty, so there is no idle sleep while the quota has headroom.
+"""
+import threading
+import time
+from typing import Dict
+import config
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, holding at most `burst`"""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = max(rate, 0.001)
+        self.burst = max(burst, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        Take tokens now and return how long the caller must wait before using them
+
+        The balance may go negative, which queues later callers behind earlier ones
+        in arrival order instead of letting them race for the next refill.
+
+        Returns:
+            Seconds to wait (0.0 if tokens were available)
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Block until tokens are available
+
+        Returns:
+            Seconds spent waiting
+        """
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+_buckets: Dict[str, TokenBucket] = {}
+_buckets_lock = threading.Lock()
+_process_share = 1.0  # Fraction of each configured rate this process may use
+
+
+def set_process_share(share: float):
+    """
+    Limit this process to a fraction of every configured rate
+    
+    Used by worker processes that together must stay within one quota.
+    Buckets created before the call are discarded.
+    """
+    global _process_share
+    with _buckets_lock:
+        _process_share = share
+        _buckets.clear()
+
+
+def get_bucket(name: str) -> TokenBucket:
+    """
+    Get the shared bucket for an upstream (created on first use)
+
+    Args:
+        name: Bucket name as configured in config.RATE_LIMITS
+
+    Returns:
+        TokenBucket shared by every caller in the process
+    """
+    with _buckets_lock:
+        bucket = _buckets.get(name)
+        if bucket is None:
+            limits = config.RATE_LIMITS.get(name)
+            if not limits:
+                raise KeyError(f"No rate limit configured for '{name}' (see config.RATE_LIMITS)")
+            bucket = TokenBucket(limits["rate"] * _process_share, limits["burst"] * _process_share)
+            _buckets[name] = bucket
+        return bucket
+
+
+def acquire(name: str, tokens: float = 1.0) -> float:
+    """Block until the named upstream's bucket allows another request"""
+    return get_bucket(name).acquire(tokens)
@@ -0,0 +1,188 @@
+"""
+Persistent cache of Places API results
+
+Re-running a country returns the same businesses, and every repeat used to
+cost a Place Details call and an email scrape. A ResponseCache keeps such
+results in a SQLite file (config.CACHE_PATH) shared by all runs and processes,
+with an LRU memory tier in front of it (config.CACHE_MEMORY_ENTRIES per cache)
+so hot keys don't touch the disk. Entries expire after the cache's TTL
+(config.CACHE_TTL_DAYS). Lookups are counted per cache as memory hits, disk
+hits and misses, in stats() and in leadgen_cache_lookups_total.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import config
+import metrics
+
+
+CACHE_LOOKUPS = metrics.REGISTRY.counter(
+    "leadgen_cache_lookups_total",
+    "Response cache lookups by result (memory_hit, disk_hit, miss)",
+    ("cache", "result")
+)
+
+
+class ResponseCache:
+    """SQLite-backed JSON values by key, with a TTL and an in-memory LRU tier"""
+
+    def __init__(
+        self,
+        name: str,
+        ttl_days: Optional[float] = None,
+        path: Optional[str] = None,
+        memory_entries: Optional[int] = None
+    ):
+        """
+        Args:
+            name: Cache name (entries of different caches share the file, not keys)
+            ttl_days: How long an entry is served (default: config.CACHE_TTL_DAYS[name]; 0 = disabled)
+            path: SQLite file (default: config.CACHE_PATH)
+            memory_entries: LRU memory tier size (default: config.CACHE_MEMORY_ENTRIES)
+        """
+        self.name = name
+        self.path = path or config.CACHE_PATH
+        self.ttl_seconds = (config.CACHE_TTL_DAYS.get(name, 0) if ttl_days is None else ttl_days) * 86400
+        self.memory_entries = config.CACHE_MEMORY_ENTRIES if memory_entries is None else memory_entries
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self._memory: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if not self.enabled:
+            return
+
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            # WAL lets worker processes read while another one writes
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    cache TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    cached_at REAL NOT NULL,
+                    PRIMARY KEY (cache, key)
+                )
+            """)
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Cached value for a key (None if missing, expired or the cache is disabled)"""
+        if not self.enabled:
+            return None
+
+        oldest = time.time() - self.ttl_seconds
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and entry[1] >= oldest:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                result = "memory_hit"
+                value = entry[0]
+            else:
+                row = self._conn.execute(
+                    "SELECT value, cached_at FROM cache_entries WHERE cache = ? AND key = ? AND cached_at >= ?",
+                    (self.name, key, oldest)
+                ).fetchone()
+                if row:
+                    value = json.loads(row[0])
+                    self._remember(key, value, row[1])
+                    self.disk_hits += 1
+                    result = "disk_hit"
+                else:
+                    self._memory.pop(key, None)
+                    self.misses += 1
+                    result = "miss"
+                    value = None
+
+        CACHE_LOOKUPS.inc(cache=self.name, result=result)
+        return value
+
+    def put(self, key: str, value: Any):
+        """Store a JSON-serialisable value (no-op when the cache is disabled)"""
+        if not self.enabled:
+            return
+
+        cached_at = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (cache, key, value, cached_at) VALUES (?, ?, ?, ?)",
+                (self.name, key, json.dumps(value), cached_at)
+            )
+            self._remember(key, value, cached_at)
+            self.stores += 1
+
+    def _remember(self, key: str, value: Any, cached_at: float):
+        """Add to the memory tier, evicting the least recently used entry (caller holds the lock)"""
+        if self.memory_entries <= 0:
+            return
+        self._memory[key] = (value, cached_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def purge_expired(self) -> int:
+        """Delete entries past their TTL; returns how many were removed from disk"""
+        if not self.enabled:
+            return 0
+        oldest = time.time() - self.ttl_seconds
+        with self._lock, self._conn:
+            for key in [key for key, (_, cached_at) in self._memory.items() if cached_at < oldest]:
+                del self._memory[key]
+            cursor = self._conn.execute(
+                "DELETE FROM cache_entries WHERE cache = ? AND cached_at < ?",
+                (self.name, oldest)
+            )
+            return cursor.rowcount
+
+    def stats(self) -> Dict:
+        """Lookup counters of this process, and the hit rate"""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else None,
+                "memory_entries": len(self._memory),
+            }
+
+
+_caches: Dict[str, ResponseCache] = {}
+_caches_pid: Optional[int] = None
+_caches_lock = threading.Lock()
+
+
+def get_cache(name: str) -> ResponseCache:
+    """Process-wide cache by name (a forked worker opens its own connection)"""
+    global _caches, _caches_pid
+    with _caches_lock:
+        if _caches_pid != os.getpid():
+            _caches = {}
+            _caches_pid = os.getpid()
+        cache = _caches.get(name)
+        if cache is None:
+            cache = _caches[name] = ResponseCache(name)
+        return cache
+
+
+def stats() -> Dict[str, Dict]:
+    """Counters of every cache opened in this process"""
+    with _caches_lock:
+        caches = list(_caches.values()) if _caches_pid == os.getpid() else []
+    return {cache.name: cache.stats() for cache in caches}
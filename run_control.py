@@ -0,0 +1,159 @@
+"""
+Pause / resume / stop control for a running discovery
+
+A RunController is shared by everything working on one run. Blocking work goes
+through it - sleeps, HTTP requests, coroutines on the async engine, Selenium
+sessions - so that stop() interrupts all of it within a fraction of a second
+instead of waiting for the current call chain to finish. pause() holds workers
+at their next request or business without giving up their position.
+"""
+import asyncio
+import concurrent.futures
+import threading
+from typing import Any, Callable, Optional, Set
+
+
+# How often blocked waits re-check for stop/pause
+POLL_INTERVAL = 0.05
+
+
+class RunCancelled(Exception):
+    """Raised inside a run's workers once the run has been stopped"""
+
+
+class RunController:
+    """Stop and pause signals for one run, plus helpers that honour them"""
+
+    def __init__(self):
+        self._stopped = threading.Event()
+        self._running = threading.Event()  # Cleared while paused
+        self._running.set()
+        self.parked_until: Optional[float] = None  # Set by park(): when the run may continue
+        self._drivers: Set[Any] = set()
+        self._drivers_lock = threading.Lock()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stopped.is_set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set() and not self.stopped
+
+    def stop(self):
+        """Stop the run: wake every waiter and close open browser sessions"""
+        self._stopped.set()
+        self._running.set()
+        with self._drivers_lock:
+            drivers = list(self._drivers)
+            self._drivers.clear()
+        for driver in drivers:
+            # quit() can block on the browser; don't hold up the caller
+            threading.Thread(target=self._quit_driver, args=(driver,), daemon=True).start()
+
+    def park(self, until: float):
+        """Stop the run until a timestamp (e.g. a Places API budget's next window)"""
+        self.parked_until = max(until, self.parked_until or 0)
+        self.stop()
+
+    def pause(self):
+        """Hold workers at their next checkpoint (in-flight requests complete)"""
+        if not self.stopped:
+            self._running.clear()
+
+    def resume(self):
+        """Let paused workers continue from where they were held"""
+        self._running.set()
+
+    def reset(self):
+        """Clear stop, pause and park for a new run"""
+        self.parked_until = None
+        self._stopped.clear()
+        self._running.set()
+
+    def checkpoint(self):
+        """
+        Block while paused
+
+        Raises:
+            RunCancelled: The run was stopped (before or while paused)
+        """
+        while not self._running.wait(POLL_INTERVAL):
+            pass
+        if self.stopped:
+            raise RunCancelled()
+
+    def sleep(self, seconds: float):
+        """
+        time.sleep() that returns early on stop
+
+        Raises:
+            RunCancelled: The run was stopped during the sleep
+        """
+        if seconds > 0 and self._stopped.wait(seconds):
+            raise RunCancelled()
+        self.checkpoint()
+
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """
+        Run a blocking call (e.g. an HTTP request) so that a stop can abandon it
+
+        The call runs in a helper thread while this thread waits; on stop the
+        helper is left to finish on its own and RunCancelled is raised at once.
+        """
+        self.checkpoint()
+
+        outcome = {}
+        done = threading.Event()
+
+        def target():
+            try:
+                outcome["result"] = func(*args, **kwargs)
+            except BaseException as e:
+                outcome["error"] = e
+            finally:
+                done.set()
+
+        threading.Thread(target=target, daemon=True, name="RunControlCall").start()
+        while not done.wait(POLL_INTERVAL):
+            if self.stopped:
+                raise RunCancelled()
+
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
+
+    def run_coroutine(self, coro, loop: asyncio.AbstractEventLoop) -> Any:
+        """
+        Run a coroutine on another thread's event loop; a stop cancels it
+
+        Raises:
+            RunCancelled: The run was stopped (the coroutine is cancelled)
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        while True:
+            try:
+                return future.result(POLL_INTERVAL)
+            except concurrent.futures.TimeoutError:
+                pass
+            if self.stopped:
+                future.cancel()
+                raise RunCancelled()
+
+    def register_driver(self, driver):
+        """Track a Selenium driver so stop() can quit it"""
+        with self._drivers_lock:
+            self._drivers.add(driver)
+        if self.stopped:
+            self.stop()
+
+    def unregister_driver(self, driver):
+        with self._drivers_lock:
+            self._drivers.discard(driver)
+
+    @staticmethod
+    def _quit_driver(driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass
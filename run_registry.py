@@ -0,0 +1,224 @@
+"""
+Registry of discovery runs executing in parallel
+
+Every run gets its own LeadDiscoveryApp (its own checkpoint, counters and stop
+flag) and a background thread. All runs share one SheetsManager, so duplicate
+checks and appends stay serialised across runs, and the process-wide budgets:
+config.RATE_LIMITS, config.UPSTREAM_CONCURRENCY and config.GLOBAL_CELL_CONCURRENCY.
+
+A run parked because a Places API budget ran out (see quota_manager.py) is
+resumed automatically when the budget's window opens (config.QUOTA_AUTO_RESUME).
+"""
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+import config
+from checkpoints import CheckpointStore
+from main import LeadDiscoveryApp
+from sheets_manager import SheetsManager
+
+
+class RunEntry:
+    """One registered run: its app, thread and the leads it has saved"""
+
+    def __init__(self, app: LeadDiscoveryApp):
+        self.app = app
+        self.run_id = app.run_id
+        self.thread: Optional[threading.Thread] = None
+        self.leads: List[Dict] = []
+        self.created_at = time.time()
+
+    @property
+    def is_active(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def status(self) -> Dict:
+        status = self.app.get_status()
+        # The thread is still winding down for a moment after is_running drops
+        status["is_running"] = status["is_running"] or self.is_active
+        status["leads_found"] = len(self.leads)
+        return status
+
+
+class RunRegistry:
+    """Start, track and stop discovery runs by run_id"""
+
+    def __init__(self, lead_callback: Optional[Callable[[Dict], None]] = None):
+        """
+        Args:
+            lead_callback: Called for every lead saved by any run
+        """
+        self.sheets_manager = SheetsManager()
+        self.checkpoint_store = CheckpointStore()
+        self.lead_callback = lead_callback
+        self._runs: Dict[str, RunEntry] = {}
+        self._resume_timers: Dict[str, threading.Timer] = {}
+        self._lock = threading.Lock()
+
+    def start(self, country: str, city: str, categories: Optional[List[str]] = None, **options) -> str:
+        """
+        Start a new run in a background thread
+
+        Args:
+            country: Country name
+            city: Starting city
+            categories: Categories to search (default: all)
+            **options: Passed to LeadDiscoveryApp.start (concurrency, scheduler, ...)
+
+        Returns:
+            run_id of the new run
+
+        Raises:
+            RuntimeError: config.MAX_ACTIVE_RUNS runs are already active
+        """
+        entry = self._register()
+        self._launch(entry, entry.app.start, (country, city, categories), options)
+        return entry.run_id
+
+    def resume(self, run_id: str) -> str:
+        """
+        Continue a checkpointed run in a background thread
+
+        A run still registered (e.g. parked or stopped in this process) keeps its
+        entry, so its saved leads and status carry over.
+
+        Raises:
+            KeyError: No checkpoint exists for run_id
+            ValueError: The run is active or already completed
+            RuntimeError: config.MAX_ACTIVE_RUNS runs are already active
+        """
+        checkpoint = self.checkpoint_store.load(run_id)
+        if not checkpoint:
+            raise KeyError(run_id)
+        if checkpoint.data["status"] == "completed":
+            raise ValueError(f"Run {run_id} already completed")
+
+        entry = self._register(run_id)
+        self._launch(entry, entry.app.resume, (run_id,), {})
+        return run_id
+
+    def stop(self, run_id: str) -> bool:
+        """Ask a run to stop, or cancel a parked run's automatic resume (False if it isn't registered)"""
+        with self._lock:
+            timer = self._resume_timers.pop(run_id, None)
+        if timer:
+            timer.cancel()
+        entry = self.get(run_id)
+        if not entry:
+            return False
+        if entry.app.is_running:
+            entry.app.stop()
+        return True
+
+    def pause(self, run_id: str) -> bool:
+        """Pause a run in place (False if it isn't registered)"""
+        entry = self.get(run_id)
+        if not entry:
+            return False
+        entry.app.pause()
+        return True
+
+    def unpause(self, run_id: str) -> bool:
+        """Continue a paused run (False if it isn't registered)"""
+        entry = self.get(run_id)
+        if not entry:
+            return False
+        entry.app.unpause()
+        return True
+
+    def stop_all(self) -> int:
+        """Ask every active run to stop; returns how many were stopped"""
+        stopped = 0
+        for entry in self.list():
+            if entry.app.is_running:
+                entry.app.stop()
+                stopped += 1
+        return stopped
+
+    def get(self, run_id: str) -> Optional[RunEntry]:
+        with self._lock:
+            return self._runs.get(run_id)
+
+    def list(self) -> List[RunEntry]:
+        """Registered runs, newest first"""
+        with self._lock:
+            return sorted(self._runs.values(), key=lambda entry: entry.created_at, reverse=True)
+
+    def latest(self) -> Optional[RunEntry]:
+        """Most recently started run"""
+        runs = self.list()
+        return runs[0] if runs else None
+
+    def active_count(self) -> int:
+        return sum(1 for entry in self.list() if entry.is_active)
+
+    def _register(self, run_id: Optional[str] = None) -> RunEntry:
+        """Entry for a new run, or the existing entry of a run being resumed"""
+        with self._lock:
+            existing = self._runs.get(run_id) if run_id else None
+            if existing and existing.is_active:
+                raise ValueError(f"Run {run_id} is already running")
+            active = sum(1 for entry in self._runs.values() if entry.is_active)
+            if active >= config.MAX_ACTIVE_RUNS:
+                raise RuntimeError(f"{active} runs already active (MAX_ACTIVE_RUNS={config.MAX_ACTIVE_RUNS})")
+            if existing:
+                return existing
+
+        app = LeadDiscoveryApp(sheets_manager=self.sheets_manager)
+        app.checkpoint_store = self.checkpoint_store
+        if run_id:
+            app.run_id = run_id
+        entry = RunEntry(app)
+        app.lead_callback = lambda lead: self._on_lead(entry, lead)
+
+        with self._lock:
+            self._runs[entry.run_id] = entry
+            self._prune()
+        return entry
+
+    def _launch(self, entry: RunEntry, target: Callable, args: tuple, kwargs: Dict):
+        # Non-daemon: a run continues even if the web server receives shutdown signals
+        entry.thread = threading.Thread(
+            target=self._run,
+            args=(entry, target, args, kwargs),
+            daemon=False,
+            name=f"LeadDiscoveryThread-{entry.run_id}"
+        )
+        entry.thread.start()
+
+    def _run(self, entry: RunEntry, target: Callable, args: tuple, kwargs: Dict):
+        target(*args, **kwargs)
+        parked_until = entry.app.controller.parked_until
+        if parked_until and config.QUOTA_AUTO_RESUME:
+            self._schedule_resume(entry.run_id, parked_until)
+
+    def _schedule_resume(self, run_id: str, at: float):
+        """Resume a parked run once its Places API budget window has opened"""
+        def resume():
+            with self._lock:
+                self._resume_timers.pop(run_id, None)
+            try:
+                self.resume(run_id)
+                print(f"Resumed parked run {run_id}")
+            except (KeyError, ValueError, RuntimeError) as e:
+                print(f"⚠ Could not resume parked run {run_id}: {e}")
+
+        timer = threading.Timer(max(0.0, at - time.time()) + 1, resume)
+        timer.daemon = True
+        with self._lock:
+            self._resume_timers[run_id] = timer
+        timer.start()
+
+    def _on_lead(self, entry: RunEntry, lead: Dict):
+        entry.leads.append(lead)
+        if self.lead_callback:
+            self.lead_callback(lead)
+
+    def _prune(self):
+        """Forget the oldest finished runs beyond config.MAX_FINISHED_RUNS (caller holds the lock)"""
+        finished = sorted(
+            (entry for entry in self._runs.values() if entry.thread is not None and not entry.is_active),
+            key=lambda entry: entry.created_at
+        )
+        for entry in finished[:max(0, len(finished) - config.MAX_FINISHED_RUNS)]:
+            del self._runs[entry.run_id]
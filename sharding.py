@@ -0,0 +1,243 @@
+"""
+Multi-process sharded discovery
+
+The cells of a run are split across worker processes by a deterministic hash
+of the cell, so the same run always shards the same way. Each worker takes
+cells from the front of its own shard; a worker whose shard is empty steals
+from the back of the fullest remaining shard. Workers only search and enrich
+(Places requests, JSON decoding, website HTML parsing) - businesses are sent
+back to the coordinator, which is the single writer to Google Sheets.
+"""
+import multiprocessing
+import queue
+import time
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+import cassette
+import config
+import concurrency
+import place_index
+import quota_manager
+import rate_limiter
+import structured_logging
+from maps_discoverer import MapsDiscoverer
+
+
+def shard_for(category_idx: int, city_idx: int, shards: int) -> int:
+    """Deterministic shard index for a cell (stable across processes and restarts)"""
+    return zlib.crc32(f"{category_idx}:{city_idx}".encode("utf-8")) % shards
+
+
+class ShardBoard:
+    """
+    Cell tasks per shard plus shared head/tail cursors
+
+    The owner of a shard consumes from the head; thieves take from the tail, so
+    stolen cells are the ones the owner would have reached last.
+    """
+
+    def __init__(self, shard_tasks: List[List[Dict]], context):
+        self.shard_tasks = shard_tasks
+        self.heads = context.Array("i", [0] * len(shard_tasks), lock=False)
+        self.tails = context.Array("i", [len(tasks) for tasks in shard_tasks], lock=False)
+        self.lock = context.Lock()
+
+    def claim(self, shard_idx: int) -> Optional[Tuple[Dict, bool]]:
+        """
+        Take the next task for a shard's worker
+
+        Returns:
+            (task, stolen) or None once every shard is empty
+        """
+        with self.lock:
+            if self.heads[shard_idx] < self.tails[shard_idx]:
+                task = self.shard_tasks[shard_idx][self.heads[shard_idx]]
+                self.heads[shard_idx] += 1
+                return task, False
+
+            victim = max(range(len(self.shard_tasks)), key=lambda idx: self.tails[idx] - self.heads[idx])
+            if self.tails[victim] - self.heads[victim] <= 0:
+                return None
+            self.tails[victim] -= 1
+            return self.shard_tasks[victim][self.tails[victim]], True
+
+
+def _shard_worker(shard_idx: int, processes: int, country: str, board: ShardBoard, results, stop_event, running_event):
+    """Worker process: discover businesses for claimed cells and send them to the coordinator"""
+    # Every process has its own buckets and semaphores; split the quota between them
+    rate_limiter.set_process_share(1.0 / processes)
+    concurrency.set_process_share(1.0 / processes)
+
+    api_key = config.GOOGLE_MAPS_API_KEY
+    discoverer = MapsDiscoverer(country)
+    try:
+        while not stop_event.is_set():
+            # Paused: hold before the next cell
+            if not running_event.wait(0.1):
+                continue
+            claimed = board.claim(shard_idx)
+            if claimed is None:
+                break
+            task, stolen = claimed
+
+            try:
+                if api_key:
+                    businesses = discoverer.search_with_places_api(
+                        task["category"], task["city"], api_key,
+                        max_results=config.MAX_RESULTS_PER_CATEGORY,
+                        skip_place_ids=set(task["skip_place_ids"]),
+                        cell_places=place_index.cell_places(task["run_id"], tuple(task["cell"]))
+                    )
+                else:
+                    businesses = discoverer.search_businesses(
+                        task["category"], task["city"],
+                        max_results=config.MAX_RESULTS_PER_CATEGORY
+                    )
+                parked_until = quota_manager.get_quota_manager().parked_until
+                if parked_until:
+                    # A Places API budget ran out mid-cell: hand the cell back and stop
+                    results.put(("parked", shard_idx, task["cell"], parked_until, stolen))
+                    break
+                counts = {
+                    "api_calls": discoverer.api_calls,
+                    "search_errors": discoverer.search_errors,
+                    "places_deduped": discoverer.places_deduped,
+                    "tiles_searched": discoverer.tiles_searched,
+                }
+                discoverer.api_calls = discoverer.search_errors = discoverer.places_deduped = 0
+                discoverer.tiles_searched = []
+                results.put(("cell", shard_idx, task["cell"], (businesses, counts), stolen))
+            except Exception as e:
+                results.put(("error", shard_idx, task["cell"], str(e), stolen))
+    finally:
+        # Worker processes exit without atexit hooks; finish the cassette sidecar and logs here
+        cassette.close()
+        structured_logging.flush()
+        results.put(("done", shard_idx, None, None, False))
+
+
+class ShardedDiscovery:
+    """Coordinator for a process pool working through one run's cells"""
+
+    def __init__(self, country: str, tasks: List[Dict], processes: Optional[int] = None):
+        """
+        Args:
+            country: Country name
+            tasks: One dict per cell: cell (category_idx, city_idx), category, city,
+                   skip_place_ids (place_ids already handled in an interrupted cell),
+                   run_id (scope of the run-wide place_id index)
+            processes: Worker processes (default: config.SHARD_PROCESSES)
+        """
+        self.country = country
+        self.processes = max(1, min(processes or config.SHARD_PROCESSES, len(tasks) or 1))
+        self._context = multiprocessing.get_context(config.SHARD_START_METHOD)
+
+        shard_tasks: List[List[Dict]] = [[] for _ in range(self.processes)]
+        for task in tasks:
+            shard_tasks[shard_for(*task["cell"], self.processes)].append(task)
+
+        self.board = ShardBoard(shard_tasks, self._context)
+        self.results_queue = self._context.Queue()
+        self.stop_event = self._context.Event()
+        self.running_event = self._context.Event()  # Cleared while paused
+        self.running_event.set()
+        self.workers: List = []
+        self.parked_until: Optional[float] = None  # Set when a worker ran out of Places API budget
+        self.shard_stats = [
+            {"shard": idx, "assigned": len(shard), "completed": 0, "stolen": 0, "errors": 0, "finished": False}
+            for idx, shard in enumerate(shard_tasks)
+        ]
+
+    def start(self):
+        """Start one worker process per shard"""
+        for shard_idx in range(self.processes):
+            process = self._context.Process(
+                target=_shard_worker,
+                args=(
+                    shard_idx, self.processes, self.country, self.board,
+                    self.results_queue, self.stop_event, self.running_event
+                ),
+                daemon=True,
+                name=f"ShardWorker-{shard_idx + 1}"
+            )
+            process.start()
+            self.workers.append(process)
+
+    def results(self, should_stop=None) -> Iterator[Tuple[Tuple[int, int], List[Dict], Dict]]:
+        """
+        Yield (cell, businesses, counts) as workers finish cells, until every worker is done
+
+        counts holds the cell's api_calls, search_errors, places_deduped and tiles_searched. Results stop early
+        when a worker runs out of Places API budget (see parked_until).
+
+        Args:
+            should_stop: Optional callable; once it returns True, workers finish
+                         their current cell and no further results are yielded
+        """
+        finished = 0
+        while finished < len(self.workers):
+            if should_stop and should_stop():
+                self.stop_event.set()
+                return
+
+            try:
+                kind, shard_idx, cell, payload, stolen = self.results_queue.get(timeout=0.2)
+            except queue.Empty:
+                if not any(process.is_alive() for process in self.workers):
+                    # Workers exited without reporting (e.g. killed)
+                    return
+                continue
+
+            stats = self.shard_stats[shard_idx]
+            if kind == "done":
+                stats["finished"] = True
+                finished += 1
+            elif kind == "parked":
+                # Stop every worker; the run is parked until the budget resets
+                self.parked_until = max(payload, self.parked_until or 0)
+                self.stop_event.set()
+                return
+            elif kind == "error":
+                stats["errors"] += 1
+                print(f"Error in shard {shard_idx + 1} for cell {cell}: {payload}")
+            else:
+                stats["completed"] += 1
+                if stolen:
+                    stats["stolen"] += 1
+                businesses, counts = payload
+                yield tuple(cell), businesses, counts
+
+    def pause(self):
+        """Hold workers before their next cell (cells in progress finish)"""
+        self.running_event.clear()
+
+    def resume(self):
+        self.running_event.set()
+
+    def close(self, timeout: float = 30):
+        """Stop the workers and wait for them to exit"""
+        self.stop_event.set()
+        self.running_event.set()
+        deadline = time.time() + timeout
+        while any(process.is_alive() for process in self.workers) and time.time() < deadline:
+            # A worker can't exit while its queued results are unread
+            self._drain()
+            for process in self.workers:
+                process.join(0.1)
+        for process in self.workers:
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self._drain()
+
+    def _drain(self):
+        """Discard results nobody will consume (after a stop)"""
+        while True:
+            try:
+                self.results_queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def stats(self) -> List[Dict]:
+        """Per-shard progress (cells assigned, completed, stolen from other shards)"""
+        return [dict(stats) for stats in self.shard_stats]
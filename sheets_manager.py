@@ -3,6 +3,7 @@ Google Sheets integration for storing leads
 """
 import os
 import re
+import threading
 from typing import List, Dict, Optional
 from google.oauth2.credentials import Credentials
 from google.auth.transport.requests import Request
@@ -10,6 +11,7 @@ from google.oauth2 import service_account
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 import config
+import rate_limiter
 
 
 class SheetsManager:
@@ -21,6 +23,9 @@ class SheetsManager:
         self.spreadsheet_id = config.GOOGLE_SHEETS_SPREADSHEET_ID
         self._worksheet_cache = {}  # Cache worksheet names by country
         self._duplicate_cache = {}  # Cache duplicate check results (phone/website -> bool)
+        # The Sheets API client is not thread-safe; concurrent cell workers hold this
+        # lock around check_duplicate + append_lead so the pair is also atomic
+        self.lock = threading.RLock()
         self._initialize_service()
     
     def _initialize_service(self):
@@ -45,8 +50,17 @@ class SheetsManager:
                 except json.JSONDecodeError as e:
                     raise ValueError(f"Invalid JSON in GOOGLE_SHEETS_CREDENTIALS_PATH: {e}")
             
+            if config.SHEETS_API_ENDPOINT:
+                # Stand-in Sheets server (e.g. benchmark.py) - no Google credentials
+                from google.auth.credentials import AnonymousCredentials
+                self.service = build(
+                    'sheets', 'v4',
+                    credentials=AnonymousCredentials(),
+                    client_options={"api_endpoint": config.SHEETS_API_ENDPOINT}
+                )
+                print(f"✓ Google Sheets service using endpoint: {config.SHEETS_API_ENDPOINT}")
             # Try service account first (recommended for automation)
-            if os.path.exists(creds_path):
+            elif os.path.exists(creds_path):
                 creds = service_account.Credentials.from_service_account_file(
                     creds_path,
                     scopes=[
@@ -71,6 +85,11 @@ class SheetsManager:
         except Exception as e:
             raise Exception(f"Failed to initialize Google Sheets service: {e}")
     
+    def _execute(self, request):
+        """Execute a Sheets API request once the 'sheets' rate-limit bucket allows it"""
+        rate_limiter.acquire("sheets")
+        return request.execute()
+    
     def _get_worksheet_name(self, country: str) -> str:
         """Generate worksheet name in format: country (country-wise sheets)"""
         # Clean name: remove special characters, replace spaces with hyphens
@@ -80,9 +99,9 @@ class SheetsManager:
     def _worksheet_exists(self, worksheet_name: str) -> bool:
         """Check if worksheet exists in the spreadsheet"""
         try:
-            spreadsheet = self.service.spreadsheets().get(
+            spreadsheet = self._execute(self.service.spreadsheets().get(
                 spreadsheetId=self.spreadsheet_id
-            ).execute()
+            ))
             
             for sheet in spreadsheet.get('sheets', []):
                 if sheet['properties']['title'] == worksheet_name:
@@ -114,10 +133,10 @@ class SheetsManager:
                 }]
             }
             
-            self.service.spreadsheets().batchUpdate(
+            self._execute(self.service.spreadsheets().batchUpdate(
                 spreadsheetId=self.spreadsheet_id,
                 body=request_body
-            ).execute()
+            ))
             
             print(f"✓ Created worksheet '{worksheet_name}' in spreadsheet")
             return True
@@ -166,10 +185,10 @@ class SheetsManager:
         """Ensure worksheet exists with proper headers"""
         try:
             # Check if headers exist
-            result = self.service.spreadsheets().values().get(
+            result = self._execute(self.service.spreadsheets().values().get(
                 spreadsheetId=self.spreadsheet_id,
                 range=f"{worksheet_name}!A1:Z1"
-            ).execute()
+            ))
             
             values = result.get('values', [])
             if not values or len(values) == 0:
@@ -180,12 +199,12 @@ class SheetsManager:
                     "Rating", "Review Count",
                     "Run ID", "Timestamp"
                 ]
-                self.service.spreadsheets().values().update(
+                self._execute(self.service.spreadsheets().values().update(
                     spreadsheetId=self.spreadsheet_id,
                     range=f"{worksheet_name}!A1",
                     valueInputOption='RAW',
                     body={'values': [headers]}
-                ).execute()
+                ))
                 print(f"✓ Added headers to worksheet '{worksheet_name}'")
             
         except HttpError as e:
@@ -232,13 +251,13 @@ class SheetsManager:
                 lead_data.get("timestamp", ""),
             ]
             
-            self.service.spreadsheets().values().append(
+            self._execute(self.service.spreadsheets().values().append(
                 spreadsheetId=self.spreadsheet_id,
                 range=f"{worksheet_name}!A:A",
                 valueInputOption='RAW',
                 insertDataOption='INSERT_ROWS',
                 body={'values': [row]}
-            ).execute()
+            ))
             
             # Update cache after successful append to avoid duplicate checks
             phone = lead_data.get("phone", "").strip()
@@ -306,10 +325,10 @@ class SheetsManager:
             if not worksheet_name:
                 return False  # If worksheet doesn't exist, no duplicates
             
-            result = self.service.spreadsheets().values().get(
+            result = self._execute(self.service.spreadsheets().values().get(
                 spreadsheetId=self.spreadsheet_id,
                 range=f"{worksheet_name}!E:F"  # Phone and Website columns
-            ).execute()
+            ))
             
             values = result.get('values', [])
             if len(values) <= 1:  # Only headers or empty
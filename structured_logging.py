@@ -0,0 +1,200 @@
+"""
+Non-blocking structured logging for the discovery hot path
+
+Records are put on a bounded in-memory queue and written to stdout by a
+background thread (logging.handlers.QueueListener), so a worker never blocks on
+a slow stdout - under Cloud Run every write goes through the logging agent.
+When the queue is full, records are dropped and counted instead of stalling.
+
+Every component ("discovery", "places", "api") has its own logger and level
+(config.LOG_LEVEL, overridden per component by config.LOG_LEVELS). Per-business
+events go through StructuredLogger.business(), which only keeps a fraction of
+them (config.LOG_BUSINESS_SAMPLE_RATE); warnings and errors are never sampled.
+
+With config.LOG_FORMAT = "json" each record is one JSON object per line with
+"severity" and "message" (the keys Cloud Logging reads) plus its fields;
+"text" prints the message only, like the console output before.
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+import config
+import metrics
+
+
+ROOT_LOGGER = "leadgen"
+
+DROPPED_RECORDS = metrics.REGISTRY.counter(
+    "leadgen_log_records_dropped_total",
+    "Log records dropped because the log queue was full"
+)
+
+_lock = threading.Lock()
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional["_DroppingQueueHandler"] = None
+_configured_pid: Optional[int] = None
+_loggers: Dict[str, "StructuredLogger"] = {}
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """StreamHandler that writes to whatever sys.stdout is at the time"""
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class _DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: full queue -> record dropped and counted"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The listener is in this process; formatting happens on its thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if _configured_pid != os.getpid():
+            # Forked worker process: the writer thread didn't come along
+            _configure(force=True)
+            _handler.enqueue(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DROPPED_RECORDS.inc()
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, severity, component, message and fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "severity": record.levelname,
+            "component": record.name[len(ROOT_LOGGER) + 1:] or ROOT_LOGGER,
+            "message": record.getMessage().strip(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Console format: the message as written, plus the traceback if any"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = record.getMessage()
+        if record.exc_info:
+            text += "\n" + self.formatException(record.exc_info)
+        return text
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """
+    Logger taking structured fields as keyword arguments
+
+        log.info("Saved lead", business="Acme", city="Pune")
+        log.business("  Processing: %s", name, place_id=place_id)
+    """
+
+    def __init__(self, logger: logging.Logger):
+        super().__init__(logger, {})
+        self._sample_every = max(1, round(1 / config.LOG_BUSINESS_SAMPLE_RATE)) if config.LOG_BUSINESS_SAMPLE_RATE > 0 else 0
+        self._sample_count = 0
+        self._sample_lock = threading.Lock()
+
+    def process(self, msg, kwargs):
+        fields = {
+            name: kwargs.pop(name)
+            for name in list(kwargs)
+            if name not in ("exc_info", "stack_info", "stacklevel", "extra")
+        }
+        kwargs["extra"] = {"fields": fields}
+        return msg, kwargs
+
+    def business(self, msg, *args, level: int = logging.INFO, **fields):
+        """
+        Per-business event, logged for config.LOG_BUSINESS_SAMPLE_RATE of calls below WARNING
+
+        Pass %-style args rather than an f-string so sampled-out events cost nothing to format.
+        """
+        if not self.isEnabledFor(level):
+            return
+        if level < logging.WARNING:
+            if not self._sample_every:
+                return
+            with self._sample_lock:
+                self._sample_count += 1
+                if (self._sample_count - 1) % self._sample_every:
+                    return
+        self.log(level, msg, *args, **fields)
+
+
+def _configure(force: bool = False):
+    """Attach the queue handler and start the writer thread (once per process)"""
+    global _listener, _handler, _configured_pid
+    with _lock:
+        if _configured_pid == os.getpid() and not force:
+            return
+
+        formatter = JsonFormatter() if config.LOG_FORMAT == "json" else TextFormatter()
+        output = _StdoutHandler()
+        output.setFormatter(formatter)
+
+        records: queue.Queue = queue.Queue(maxsize=max(1, config.LOG_QUEUE_SIZE))
+        handler = _DroppingQueueHandler(records)
+
+        root = logging.getLogger(ROOT_LOGGER)
+        if _handler is not None:
+            root.removeHandler(_handler)
+        root.addHandler(handler)
+        root.setLevel(config.LOG_LEVEL.upper())
+        root.propagate = False
+
+        for item in filter(None, (part.strip() for part in config.LOG_LEVELS.split(","))):
+            component, _, level = item.partition("=")
+            logging.getLogger(f"{ROOT_LOGGER}.{component.strip()}").setLevel(level.strip().upper())
+
+        _listener = logging.handlers.QueueListener(records, output)
+        _listener.start()
+        _handler = handler
+        _configured_pid = os.getpid()
+
+
+def get_logger(component: str) -> StructuredLogger:
+    """
+    Logger for a component ("discovery", "places", "api", ...)
+
+    The first call in a process sets up the queue handler and writer thread.
+    """
+    _configure()
+    logger = _loggers.get(component)
+    if logger is None:
+        logger = _loggers.setdefault(component, StructuredLogger(logging.getLogger(f"{ROOT_LOGGER}.{component}")))
+    return logger
+
+
+def flush():
+    """Write out everything queued so far (stops and restarts the writer thread)"""
+    with _lock:
+        if _listener is not None and _configured_pid == os.getpid():
+            _listener.stop()
+            _listener.start()
+
+
+@atexit.register
+def _shutdown():
+    with _lock:
+        if _listener is not None and _configured_pid == os.getpid():
+            _listener.stop()
@@ -0,0 +1,154 @@
+"""
+Geographic tiling for searches past the 60-result cap
+
+One query per city returns at most 60 places (3 pages of 20), so a big city's
+"dental clinic" search misses most of them. In tiling mode
+(config.SEARCH_MODE = "tiles") a city's geocoded viewport is covered with
+location + radius (Nearby Search) queries instead. A tile whose search comes
+back full (config.TILING_RESULT_CAP results) is split into four quadrants and
+each is searched in turn, down to config.TILING_MAX_DEPTH levels.
+
+Once a cell's businesses are stored, its searched tiles are recorded in a SQLite
+file (config.TILE_COVERAGE_PATH); a cell cut short is searched in full again.
+Later runs skip tiles that were searched within config.TILE_REFRESH_DAYS and
+were not full and go straight to the quadrants of full ones, so a repeat run
+only searches stale tiles. A full tile at the last depth stays as found.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import config
+
+
+# (south, west, north, east) in degrees
+Tile = Tuple[float, float, float, float]
+
+EARTH_RADIUS_M = 6371000
+NEARBY_MAX_RADIUS_M = 50000  # Nearby Search radius limit
+
+
+def tile_center(tile: Tile) -> Tuple[float, float]:
+    """(lat, lng) of a tile's centre"""
+    south, west, north, east = tile
+    return (south + north) / 2, (west + east) / 2
+
+
+def distance_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in meters (haversine)"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def tile_radius_m(tile: Tile) -> float:
+    """Radius of the circle through a tile's corners, so the search covers all of it"""
+    lat, lng = tile_center(tile)
+    south, west, north, east = tile
+    return max(distance_m(lat, lng, corner_lat, corner_lng)
+               for corner_lat in (south, north) for corner_lng in (west, east))
+
+
+def split_tile(tile: Tile) -> List[Tile]:
+    """Four quadrants of a tile: south-west, south-east, north-west, north-east"""
+    south, west, north, east = tile
+    lat, lng = tile_center(tile)
+    return [
+        (south, west, lat, lng),
+        (south, lng, lat, east),
+        (lat, west, north, lng),
+        (lat, lng, north, east),
+    ]
+
+
+def tile_key(tile: Tile, depth: int) -> str:
+    """Stable name of a tile (viewports are cached, so the same city splits the same way)"""
+    return f"{depth}:" + ",".join(f"{value:.5f}" for value in tile)
+
+
+class TileCoverage:
+    """SQLite-backed record of which tiles of a (country, city, category) were searched"""
+
+    def __init__(self, path: Optional[str] = None, refresh_days: Optional[float] = None):
+        """
+        Args:
+            path: SQLite file (default: config.TILE_COVERAGE_PATH)
+            refresh_days: How long a search covers its tile (default: config.TILE_REFRESH_DAYS)
+        """
+        self.path = path or config.TILE_COVERAGE_PATH
+        self.refresh_seconds = (config.TILE_REFRESH_DAYS if refresh_days is None else refresh_days) * 86400
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS tile_coverage (
+                    country TEXT NOT NULL,
+                    city TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    tile TEXT NOT NULL,
+                    results INTEGER NOT NULL,
+                    saturated INTEGER NOT NULL,
+                    searched_at REAL NOT NULL,
+                    PRIMARY KEY (country, city, category, tile)
+                )
+            """)
+
+    def get(self, country: str, city: str, category: str, tile: str) -> Optional[Dict]:
+        """A tile's last search while it is fresh (None if never searched or stale)"""
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT results, saturated, searched_at FROM tile_coverage
+                WHERE country = ? AND city = ? AND category = ? AND tile = ? AND searched_at >= ?
+                """,
+                (country, city, category, tile, time.time() - self.refresh_seconds)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def record(self, country: str, city: str, category: str, tile: str, results: int, saturated: bool):
+        """Remember a tile's search: how many results it returned and whether it hit the cap"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO tile_coverage (country, city, category, tile, results, saturated, searched_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (country, city, category, tile, results, int(saturated), time.time())
+            )
+
+    def summary(self, country: str, city: str, category: str) -> Dict:
+        """Fresh tiles of a cell: how many, how many were full, results found"""
+        with self._lock:
+            row = self._conn.execute(
+                """
+                SELECT COUNT(*) AS tiles, COALESCE(SUM(saturated), 0) AS saturated, COALESCE(SUM(results), 0) AS results
+                FROM tile_coverage
+                WHERE country = ? AND city = ? AND category = ? AND searched_at >= ?
+                """,
+                (country, city, category, time.time() - self.refresh_seconds)
+            ).fetchone()
+        return dict(row)
+
+
+_coverage: Optional[TileCoverage] = None
+_coverage_pid: Optional[int] = None
+_coverage_lock = threading.Lock()
+
+
+def get_tile_coverage() -> TileCoverage:
+    """Process-wide coverage store (a forked worker opens its own connection)"""
+    global _coverage, _coverage_pid
+    with _coverage_lock:
+        if _coverage is None or _coverage_pid != os.getpid():
+            _coverage = TileCoverage()
+            _coverage_pid = os.getpid()
+        return _coverage
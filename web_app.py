@@ -484,7 +484,7 @@ with tab4:
         st.write(f"**Total Categories:** {len(config.DEFAULT_CATEGORIES)}")
         st.write(f"**Supported Countries:** {len(list_all_countries())}")
     with col2:
-        st.write(f"**Default Delay:** {config.DEFAULT_DELAY_BETWEEN_REQUESTS}s between requests")
+        st.write(f"**Places Rate Limit:** {config.RATE_LIMITS['place_details']['rate']:g} details requests/s")
         st.write(f"**Max Results per Category:** {config.MAX_RESULTS_PER_CATEGORY}")
 
 # Process lead queue to update UI with new leads (thread-safe)
@@ -6,6 +6,7 @@ import requests
 from typing import Dict, Optional, Tuple
 from urllib.parse import urlparse
 import time
+import http_client
 
 
 class WebsiteAnalyzer:
@@ -13,10 +14,7 @@ class WebsiteAnalyzer:
     
     def __init__(self, timeout: int = 10):
         self.timeout = timeout
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        })
+        self.session = http_client.get_session()
     
     def analyze(self, website_url: str) -> Dict:
         """
@@ -0,0 +1,128 @@
+"""
+Per-cell yield history
+
+Records, for every (country, city, category) cell that has been run, how many
+Places API calls it took, how many businesses it returned and how many of them
+were new leads or duplicates. Expected yield (new leads per API call) is used
+to run the most productive cells first, so time-boxed runs collect more leads
+before their limit.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import config
+from countries import get_cities_by_tier
+
+
+def city_tier(country: str, city: str) -> Optional[str]:
+    """Tier of a city ("Tier 1", "Tier 2", "Tier 3") or None if it isn't in the country list"""
+    for tier, cities in get_cities_by_tier(country).items():
+        if city in cities:
+            return tier
+    return None
+
+
+class YieldHistory:
+    """SQLite-backed yield statistics per (country, city, category)"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or config.YIELD_HISTORY_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS cell_yield (
+                    country TEXT NOT NULL,
+                    city TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    runs INTEGER NOT NULL DEFAULT 0,
+                    api_calls INTEGER NOT NULL DEFAULT 0,
+                    businesses INTEGER NOT NULL DEFAULT 0,
+                    new_leads INTEGER NOT NULL DEFAULT 0,
+                    duplicates INTEGER NOT NULL DEFAULT 0,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (country, city, category)
+                )
+            """)
+
+    def record(
+        self,
+        country: str,
+        city: str,
+        category: str,
+        api_calls: int,
+        businesses: int,
+        new_leads: int,
+        duplicates: int
+    ):
+        """Add the outcome of one completed cell to its history"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO cell_yield (country, city, category, runs, api_calls, businesses, new_leads, duplicates, updated_at)
+                VALUES (?, ?, ?, 1, ?, ?, ?, ?, ?)
+                ON CONFLICT (country, city, category) DO UPDATE SET
+                    runs = runs + 1,
+                    api_calls = api_calls + excluded.api_calls,
+                    businesses = businesses + excluded.businesses,
+                    new_leads = new_leads + excluded.new_leads,
+                    duplicates = duplicates + excluded.duplicates,
+                    updated_at = excluded.updated_at
+                """,
+                (country, city, category, api_calls, businesses, new_leads, duplicates, time.time())
+            )
+
+    def get(self, country: str, city: str, category: str) -> Optional[Dict]:
+        """Raw history for a cell (None if it has never completed)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM cell_yield WHERE country = ? AND city = ? AND category = ?",
+                (country, city, category)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def expected_yield(self, country: str, city: str, category: str) -> float:
+        """
+        Expected new leads per API call for a cell
+
+        The city tier's prior (config.YIELD_TIER_PRIORS) counts as
+        config.YIELD_PRIOR_CALLS calls' worth of history, so untried cells are
+        ranked by tier and a couple of unlucky runs don't bury a good cell.
+        """
+        prior = config.YIELD_TIER_PRIORS.get(city_tier(country, city), config.YIELD_TIER_PRIORS[None])
+        history = self.get(country, city, category)
+        if not history:
+            return prior
+        weight = config.YIELD_PRIOR_CALLS
+        return (history["new_leads"] + prior * weight) / (history["api_calls"] + weight)
+
+    def duplicate_rate(self, country: str, city: str, category: str) -> Optional[float]:
+        """Share of returned businesses that were already in the sheet (None without history)"""
+        history = self.get(country, city, category)
+        if not history or not history["businesses"]:
+            return None
+        return history["duplicates"] / history["businesses"]
+
+    def order_cells(
+        self,
+        country: str,
+        categories: List[str],
+        cities: List[str],
+        cells: List[Tuple[int, int]]
+    ) -> List[Tuple[int, int]]:
+        """
+        Sort cells by expected yield, highest first
+
+        Ties (e.g. cells without history in the same tier) keep their given order.
+        """
+        scores = {
+            cell: self.expected_yield(country, cities[cell[1]], categories[cell[0]])
+            for cell in cells
+        }
+        return sorted(cells, key=lambda cell: -scores[cell])